@@ -0,0 +1,211 @@
+"""
+Caricamento delle domande e delle immagini di una certificazione, con aggiornamento incrementale.
+
+Il nuovo database.xlsx viene confrontato riga per riga (chiave Topic/Numero) con quello presente nello
+storage: vengono riportate le domande aggiunte, rimosse e modificate. Le immagini vengono caricate solo
+se il loro contenuto è cambiato, così il loro ETag (e la voce nella cache condivisa) resta quello di prima.
+
+Dalla pagina di amministrazione (?view=caricamento) il catalogo dell'applicazione viene aggiornato subito
+rileggendo solo la certificazione caricata: le altre restano condivise con la versione precedente e
+l'indice di ricerca viene aggiornato solo per le righe cambiate. Da riga di comando i file vengono solo
+caricati: le applicazioni in esecuzione li vedono al successivo aggiornamento automatico del catalogo,
+se attivato con catalog_refresh_seconds, o al loro riavvio.
+
+Le immagini si caricano da una cartella o da un file zip con la struttura di Domande/
+(sottocartelle Topic1, Topic2, ... con i file <numero>.<estensione>).
+
+Esempio:
+    python admin_upload.py "Microsoft DP-700" --database nuovo_database.xlsx --images immagini.zip
+"""
+import argparse
+import hashlib
+import io
+import os
+import re
+import sys
+import zipfile
+import pandas as pd
+from compile_catalog import REQUIRED_COLUMNS
+from ingest import read_question_bank
+from storage import BlobNotFoundError, parse_image_name
+
+# Nomi ammessi per una certificazione: lettere, cifre, '_', '-' e spazi (niente '/', '\' o '..')
+CERT_NAME = re.compile(r'[\w\- ]+')
+
+
+def is_valid_cert_name(cert):
+    """
+    Verifica che il nome della certificazione sia utilizzabile come cartella in data/
+    senza uscire dalla cartella dei dati.
+    """
+    return bool(CERT_NAME.fullmatch(cert or ''))
+
+
+def _keyed(df):
+    """
+    Indicizza le domande per (Topic, Numero), scartando le righe vuote o con chiave non valida.
+    """
+    df = df.dropna(how='all')
+    topics = pd.to_numeric(df['Topic'], errors='coerce')
+    numbers = pd.to_numeric(df['Numero'], errors='coerce')
+    valid = topics.notna() & numbers.notna()
+    df = df[valid].astype(str).where(df[valid].notna(), None)
+    df.index = pd.MultiIndex.from_arrays([topics[valid].astype(int), numbers[valid].astype(int)], names=['Topic', 'Numero'])
+    return df[~df.index.duplicated(keep='last')]
+
+
+def diff_banks(old, new):
+    """
+    Confronta due database delle domande. Restituisce le chiavi (topic, numero) delle domande
+    aggiunte, rimosse e modificate (in almeno una delle colonne presenti in entrambi).
+    """
+    new = _keyed(new)
+    if old is None or old.empty:
+        return {'added': sorted(new.index), 'removed': [], 'changed': []}
+    old = _keyed(old)
+
+    common = old.index.intersection(new.index)
+    columns = [c for c in new.columns if c in old.columns and c not in REQUIRED_COLUMNS]
+    before = old.loc[common, columns]
+    after = new.loc[common, columns]
+    changed = ~((before == after) | (before.isna() & after.isna())).all(axis=1)
+    return {
+        'added': sorted(new.index.difference(old.index)),
+        'removed': sorted(old.index.difference(new.index)),
+        'changed': sorted(common[changed.to_numpy()])
+    }
+
+
+def iter_image_files(source):
+    """
+    Restituisce le coppie (percorso "Topic<N>/<numero>.<ext>", contenuto) delle immagini contenute in una
+    cartella o in un file zip (percorso o file-like). I file che non seguono la struttura vengono ignorati.
+    """
+    if not isinstance(source, (str, os.PathLike)) or not os.path.isdir(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                relative = _image_path(info.filename)
+                if relative and not info.is_dir():
+                    yield relative, archive.read(info)
+        return
+
+    for root, _, files in os.walk(source):
+        for file_name in sorted(files):
+            path = os.path.join(root, file_name)
+            relative = _image_path(os.path.relpath(path, source))
+            if relative:
+                with open(path, 'rb') as file:
+                    yield relative, file.read()
+
+
+def _image_path(path):
+    parts = path.replace('\\', '/').split('/')
+    if len(parts) < 2:
+        return None
+    relative = '/'.join(parts[-2:])
+    return relative if parse_image_name(f"data/_/Domande/{relative}") else None
+
+
+def _unchanged(storage, blob, content):
+    # Con il Content-MD5 il confronto non richiede il download; altrimenti si confrontano i byte
+    if blob is None:
+        return False
+    if blob.content_md5:
+        return blob.content_md5 == hashlib.md5(content).hexdigest()
+    return blob.size == len(content) and bytes(storage.read(blob.name)) == content
+
+
+def upload_certification(storage, cert, database=None, images=()):
+    """
+    Carica nello storage il database (bytes di un file .xlsx) e le immagini ((percorso, contenuto), come
+    restituite da iter_image_files) della certificazione `cert`. Il database viene scritto per ultimo,
+    quando le immagini delle nuove domande sono già presenti.
+    Restituisce il riepilogo: differenze del database, immagini caricate e immagini invariate.
+    Solleva ValueError se il database non è valido e NotImplementedError se il backend è in sola lettura.
+    """
+    summary = {'diff': None, 'uploaded_images': [], 'unchanged_images': []}
+    database_path = f"data/{cert}/database.xlsx"
+
+    new_df = None
+    if database is not None:
+        new_df = read_question_bank(io.BytesIO(database))
+        missing = [c for c in REQUIRED_COLUMNS if c not in new_df.columns]
+        if missing:
+            raise ValueError(f"Colonne mancanti nel database: {', '.join(missing)}")
+        try:
+            old_df = storage.read_bank(database_path)
+        except BlobNotFoundError:
+            old_df = None
+        summary['diff'] = diff_banks(old_df, new_df)
+
+    images = list(images)
+    if images:
+        existing = {blob.name: blob for blob in storage.list_blobs(f"data/{cert}/Domande/")}
+        for relative, content in images:
+            name = f"data/{cert}/Domande/{relative}"
+            if _unchanged(storage, existing.get(name), content):
+                summary['unchanged_images'].append(name)
+            else:
+                storage.write(name, content)
+                summary['uploaded_images'].append(name)
+
+    if new_df is not None:
+        storage.write(database_path, database)
+    return summary
+
+
+def format_summary(cert, summary):
+    """
+    Restituisce le righe di testo del riepilogo di un caricamento.
+    """
+    lines = [f"{cert}:"]
+    diff = summary['diff']
+    if diff is not None:
+        lines.append(
+            f"  database: {len(diff['added'])} domande aggiunte, {len(diff['removed'])} rimosse, {len(diff['changed'])} modificate"
+        )
+        for label, keys in (('aggiunta', diff['added']), ('rimossa', diff['removed']), ('modificata', diff['changed'])):
+            for topic, number in keys:
+                lines.append(f"    domanda {label}: Topic {topic}, numero {number}")
+    lines.append(
+        f"  immagini: {len(summary['uploaded_images'])} caricate, {len(summary['unchanged_images'])} invariate"
+    )
+    return lines
+
+
+def main():
+    # Import locale: main importa questo modulo per la pagina di amministrazione
+    from main import CertificationQuizApp, config
+
+    parser = argparse.ArgumentParser(description="Carica domande e immagini di una certificazione.")
+    parser.add_argument("cert", help="Nome della certificazione (cartella in data/)")
+    parser.add_argument("--database", help="File database.xlsx da caricare")
+    parser.add_argument("--images", help="Cartella o file zip con le sottocartelle Topic1, Topic2, ...")
+    parser.add_argument("--data-path", default=config['data_path'], help="Origine dei dati (default: data_path di config.json)")
+    args = parser.parse_args()
+    if not args.database and not args.images:
+        parser.error("indicare --database e/o --images")
+    if not is_valid_cert_name(args.cert):
+        parser.error("il nome della certificazione può contenere solo lettere, cifre, '_', '-' e spazi")
+
+    storage = CertificationQuizApp(dict(config, data_path=args.data_path)).storage
+    if storage is None:
+        sys.exit("Origine dei dati non disponibile")
+
+    database = None
+    if args.database:
+        with open(args.database, 'rb') as file:
+            database = file.read()
+    images = iter_image_files(args.images) if args.images else ()
+
+    try:
+        summary = upload_certification(storage, args.cert, database, images)
+    except NotImplementedError:
+        sys.exit("L'origine dei dati è in sola lettura (pacchetto offline)")
+    except ValueError as e:
+        sys.exit(str(e))
+    print('\n'.join(format_summary(args.cert, summary)))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,8 @@ from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 import markdown
 import io
-import re
 from azure.storage.blob import BlobServiceClient, ContainerSasPermissions
+import external_content
 
 
 def resource_path(relative_path):
@@ -54,11 +54,12 @@ def load_markdown_content(file_path):
     return html
 
 
-@st.cache_data(ttl=3600)  # Cache per un'ora
-def extract_external_content(url, selector=".discussion-header-container"):
+def extract_external_content(url, selector=external_content.DEFAULT_SELECTOR):
     """
     Estrae il contenuto di una discussione utilizzando il selettore specificato.
     Rende il contenuto non cliccabile ma scrollabile.
+    Il frammento viene estratto con un parsing mirato e servito da una cache stale-while-revalidate
+    condivisa tra le sessioni; gli stili sono raccolti una sola volta per dominio.
     
     Args:
         url (str): URL della discussione
@@ -68,92 +69,8 @@ def extract_external_content(url, selector=".discussion-header-container"):
         str: Contenuto HTML formattato pronto per essere visualizzato
         None: Se il contenuto non può essere estratto
     """
-    # Se URL non valido o vuoto, ritorna None
-    if not url or not url.startswith('http'):
-        return None
-        
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
     try:
-        # Esegui la richiesta HTTP
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # Parsa il contenuto
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Estrai il contenitore della discussione usando il selettore specificato
-        target_element = soup.select_one(selector)
-        
-        if not target_element:
-            return None
-        
-        # Estrai tutti gli stili CSS dalla pagina
-        style_tags = soup.find_all('style')
-        all_styles = "\n".join([style.string for style in style_tags if style.string])
-        
-        # Estrai i fogli di stile esterni
-        stylesheets = []
-        for link in soup.find_all('link', rel='stylesheet'):
-            if link.get('href'):
-                href = link['href']
-                if href.startswith('/'):
-                    base_url = re.match(r'(https?://[^/]+)', url).group(1)
-                    href = base_url + href
-                stylesheets.append(f'<link rel="stylesheet" href="{href}">')
-        
-        # Prepara l'HTML completo con CSS per rendere il contenuto non cliccabile ma scrollabile
-        full_html = f"""
-        <html>
-        <head>
-            {''.join(stylesheets)}
-            <style>
-            {all_styles}
-            body {{
-                margin: 0;
-                padding: 0;
-                background: transparent;
-            }}
-            {selector} {{
-                padding: 10px;
-                background: white;
-                border-radius: 5px;
-                box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-            }}
-            /* Stile per rendere non cliccabile tutto il contenuto */
-            * {{
-                pointer-events: none !important;
-            }}
-            /* Eccezione per permettere lo scrolling */
-            html, body {{
-                pointer-events: auto !important;
-                overflow: auto !important;
-            }}
-            /* Rimuove qualsiasi evidenziazione o selezione */
-            * {{
-                user-select: none !important;
-                -webkit-user-select: none !important;
-                -moz-user-select: none !important;
-                -ms-user-select: none !important;
-            }}
-            /* Rimuovi stili dei link */
-            a {{
-                color: inherit !important;
-                text-decoration: none !important;
-                cursor: default !important;
-            }}
-            </style>
-        </head>
-        <body>
-            {target_element.prettify()}
-        </body>
-        </html>
-        """
-        
-        return full_html
-    
+        return external_content.get_external_page(url, selector)
     except Exception as e:
         st.error(f"Errore durante l'estrazione del contenuto: {e}")
         return None
@@ -161,6 +78,9 @@ def extract_external_content(url, selector=".discussion-header-container"):
 
 config = load_config()
 
+# Archivio dei frammenti pre-scaricati da prefetch_links.py
+external_content.configure_store(config.get('external_content_cache', "external_content.sqlite"))
+
 
 class CertificationQuizApp:
     def __init__(self, config):
@@ -442,8 +362,7 @@ class CertificationQuizApp:
             return None
             
         # Verifica se è un link della fonte esterna
-        domain = "examtopics.com"
-        if domain in link_url:
+        if external_content.is_supported_link(link_url):
             return extract_external_content(link_url)
             
         return None
@@ -563,8 +482,7 @@ def main():
                 st.markdown("<div style='height: 20px'></div>", unsafe_allow_html=True)
                 
                 # Verifica se c'è un link di fonte esterna valido
-                domain = "examtopics.com"
-                if pd.notna(link_url) and domain in link_url:
+                if pd.notna(link_url) and external_content.is_supported_link(link_url):
                     # Mostra un messaggio durante il caricamento del contenuto
                     with st.spinner("Caricamento contenuto dalla fonte esterna..."):
                         web_content = app.find_question_content(link_url)
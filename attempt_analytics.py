@@ -0,0 +1,116 @@
+"""
+Statistiche sulla difficoltà delle domande calcolate dall'archivio dei tentativi.
+
+Gli aggregati (tentativi e risposte corrette per domanda e per utente) sono mantenuti in memoria
+e aggiornati in modo incrementale: a ogni aggiornamento vengono letti solo i tentativi nuovi,
+aggregati con groupby vettoriali e sommati ai totali esistenti. Lo storico completo non viene mai riletto.
+"""
+import threading
+import pandas as pd
+
+QUESTION_KEYS = ['certification', 'topic', 'question_number']
+USER_KEYS = ['certification', 'user']
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def _aggregate(attempts, keys):
+    return attempts.groupby(keys).agg(attempts=('correct', 'size'), correct=('correct', 'sum'))
+
+
+def _merge(totals, delta):
+    if totals is None:
+        return delta.astype('int64')
+    return totals.add(delta, fill_value=0).astype('int64')
+
+
+def _with_accuracy(stats):
+    stats = stats.copy()
+    stats['errors'] = stats['attempts'] - stats['correct']
+    stats['accuracy'] = stats['correct'] / stats['attempts']
+    return stats
+
+
+class AttemptAnalytics:
+    def __init__(self, store):
+        self.store = store
+        self.last_id = 0
+        self.question_stats = None
+        self.user_stats = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Aggiunge agli aggregati i tentativi registrati dopo l'ultimo aggiornamento.
+        Restituisce il numero di tentativi nuovi.
+        """
+        with self._lock:
+            self.store.flush(timeout=1)
+            new_attempts = self.store.read_since(self.last_id)
+            if new_attempts.empty:
+                return 0
+            self.last_id = int(new_attempts['id'].iloc[-1])
+            self.question_stats = _merge(self.question_stats, _aggregate(new_attempts, QUESTION_KEYS))
+            self.user_stats = _merge(self.user_stats, _aggregate(new_attempts, USER_KEYS))
+            return len(new_attempts)
+
+    def certifications(self):
+        if self.question_stats is None:
+            return []
+        return sorted(self.question_stats.index.get_level_values('certification').unique())
+
+    def question_accuracy(self, cert):
+        """
+        Accuratezza per domanda della certificazione indicata.
+        """
+        if self.question_stats is None or cert not in self.certifications():
+            return pd.DataFrame()
+        return _with_accuracy(self.question_stats.xs(cert, level='certification'))
+
+    def topic_accuracy(self, cert):
+        """
+        Accuratezza per topic della certificazione indicata.
+        """
+        questions = self.question_accuracy(cert)
+        if questions.empty:
+            return questions
+        return _with_accuracy(questions[['attempts', 'correct']].groupby(level='topic').sum())
+
+    def most_missed(self, cert, limit=10, min_attempts=3):
+        """
+        Le domande con la percentuale di errore più alta, tra quelle con almeno `min_attempts` tentativi.
+        """
+        questions = self.question_accuracy(cert)
+        if questions.empty:
+            return questions
+        questions = questions[questions['attempts'] >= min_attempts]
+        return questions.sort_values(['accuracy', 'attempts'], ascending=[True, False]).head(limit)
+
+    def pass_rate_estimates(self, pass_threshold, min_attempts=10):
+        """
+        Stima per certificazione della quota di utenti che supererebbero l'esame: un utente è contato
+        se ha almeno `min_attempts` tentativi e lo considera promosso se la sua accuratezza raggiunge la soglia.
+        """
+        if self.user_stats is None:
+            return pd.DataFrame()
+        users = _with_accuracy(self.user_stats)
+        users = users[users['attempts'] >= min_attempts]
+        if users.empty:
+            return pd.DataFrame()
+        users = users.assign(passed=users['accuracy'] >= pass_threshold)
+        return users.groupby(level='certification').agg(
+            users=('accuracy', 'size'),
+            mean_accuracy=('accuracy', 'mean'),
+            pass_rate=('passed', 'mean')
+        )
+
+
+def get_analytics(store):
+    """
+    Restituisce gli aggregati dell'archivio indicato, condivisi da tutte le sessioni del processo.
+    """
+    with _instances_lock:
+        if store.path not in _instances:
+            _instances[store.path] = AttemptAnalytics(store)
+        return _instances[store.path]
@@ -0,0 +1,146 @@
+"""
+Archivio persistente dei tentativi di risposta.
+
+Ogni risposta viene aggiunta (mai modificata) a una tabella SQLite in modalità WAL.
+La registrazione si limita ad accodare il tentativo in memoria: un thread dedicato
+raccoglie i tentativi in blocchi e li scrive con una sola transazione, così l'interfaccia
+non attende mai il disco anche con molti utenti contemporanei.
+Una domanda è identificata da (certificazione, topic, numero).
+Quando un utente apre una certificazione i suoi tentativi vengono riletti (read_user) per ricostruirne
+punteggio, domande viste e pesi della modalità adattiva anche dopo un aggiornamento della pagina.
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+import pandas as pd
+
+# Numero massimo di tentativi scritti in una transazione
+BATCH_SIZE = 500
+# Attesa massima (in secondi) prima di scrivere un blocco incompleto
+FLUSH_INTERVAL_SECONDS = 1.0
+
+COLUMNS = ['id', 'user', 'certification', 'topic', 'question_number', 'answer', 'correct', 'answered_at']
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class AttemptStore:
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.Queue()
+        self._flushed = threading.Condition()
+        self._pending = 0
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS attempts ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "user TEXT NOT NULL, certification TEXT NOT NULL, topic INTEGER NOT NULL, "
+                "question_number INTEGER NOT NULL, answer TEXT NOT NULL, correct INTEGER NOT NULL, "
+                "answered_at REAL NOT NULL)"
+            )
+            # Per ricostruire lo stato di studio di un utente su una certificazione (read_user)
+            conn.execute("CREATE INDEX IF NOT EXISTS attempts_by_user ON attempts (user, certification, id)")
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="attempt-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Con WAL, synchronous=NORMAL resta durevole ai crash dell'applicazione
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record(self, user, certification, topic, question_number, answer, correct, answered_at=None):
+        """
+        Accoda un tentativo per la scrittura in background. Non blocca il chiamante.
+        """
+        with self._flushed:
+            self._pending += 1
+        self._queue.put((
+            str(user), str(certification), int(topic), int(question_number),
+            str(answer), int(bool(correct)), answered_at or time.time()
+        ))
+
+    def flush(self, timeout=10):
+        """
+        Attende che tutti i tentativi accodati siano stati scritti su disco.
+        """
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+            while len(batch) < BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO attempts (user, certification, topic, question_number, answer, correct, answered_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        batch
+                    )
+            except sqlite3.Error:
+                import traceback
+                traceback.print_exc()
+            finally:
+                with self._flushed:
+                    self._pending -= len(batch)
+                    self._flushed.notify_all()
+
+    def read_since(self, last_id=0):
+        """
+        Restituisce come DataFrame i tentativi con id maggiore di `last_id`, in ordine di inserimento.
+        """
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNS)} FROM attempts WHERE id > ? ORDER BY id",
+                conn,
+                params=(last_id,)
+            )
+        finally:
+            conn.close()
+
+    def read_user(self, user, certification):
+        """
+        Restituisce come DataFrame i tentativi di `user` sulla certificazione, in ordine di risposta.
+        Attende prima la scrittura dei tentativi ancora in coda, così sono inclusi anche gli ultimi.
+        """
+        self.flush()
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNS)} FROM attempts WHERE user = ? AND certification = ? ORDER BY id",
+                conn,
+                params=(str(user), str(certification))
+            )
+        finally:
+            conn.close()
+
+
+def get_attempt_store(path):
+    """
+    Restituisce l'archivio dei tentativi per il file indicato, condiviso da tutte le sessioni del processo.
+    """
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = AttemptStore(path)
+        return _stores[path]
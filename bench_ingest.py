@@ -0,0 +1,82 @@
+"""
+Benchmark della lettura dei database delle domande.
+
+Genera database sintetici con la struttura di database.xlsx (più alcune colonne non usate
+dall'applicazione, come spesso accade nei file reali) e confronta la lettura completa con
+pd.read_excel e la lettura di ingest.py con ciascun lettore disponibile.
+
+Esempio:
+    python bench_ingest.py
+    python bench_ingest.py --rows 100 1000 10000 --repeat 5
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+import pandas as pd
+import ingest
+
+
+def make_bank(rows, seed=0):
+    """
+    Crea un DataFrame sintetico di `rows` domande.
+    """
+    rng = random.Random(seed)
+
+    def text(words):
+        return ' '.join(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(words))
+
+    return pd.DataFrame({
+        'Topic': [1 + i // 60 for i in range(rows)],
+        'Numero': [1 + i % 60 for i in range(rows)],
+        'Risposta Esatta': [''.join(sorted(rng.sample('ABCDE', rng.randint(1, 3)))) for _ in range(rows)],
+        'Commento': [text(40) for _ in range(rows)],
+        'Link': [f"https://www.examtopics.com/discussions/microsoft/view/{100000 + i}/" for i in range(rows)],
+        # Colonne presenti nei file ma non usate dall'applicazione
+        'Autore': [text(2) for _ in range(rows)],
+        'Data inserimento': pd.date_range('2024-01-01', periods=rows, freq='h'),
+        'Note': [text(15) for _ in range(rows)],
+        'Revisione': [rng.randint(1, 5) for _ in range(rows)]
+    })
+
+
+def timed(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark della lettura dei database delle domande.")
+    parser.add_argument("--rows", type=int, nargs='+', default=[100, 1000, 10000], help="Dimensioni dei database")
+    parser.add_argument("--repeat", type=int, default=3, help="Ripetizioni per misura (vale la migliore)")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            path = os.path.join(directory, f"database_{rows}.xlsx")
+            make_bank(rows).to_excel(path, index=False)
+            size = os.path.getsize(path)
+
+            baseline = timed(lambda: pd.read_excel(path), args.repeat)
+            results.append({'righe': rows, 'KB': size // 1024, 'lettore': 'read_excel completo', 'secondi': baseline})
+            for engine in ingest.ENGINES:
+                seconds = timed(lambda: ingest.read_question_bank(path, engine=engine), args.repeat)
+                results.append({'righe': rows, 'KB': size // 1024, 'lettore': f"ingest ({engine})", 'secondi': seconds})
+
+    table = pd.DataFrame(results)
+    table['rispetto a read_excel'] = table['secondi'].rdiv(table.groupby('righe')['secondi'].transform('first'))
+    print(table.to_string(index=False, formatters={
+        'secondi': '{:.3f}'.format,
+        'rispetto a read_excel': '{:.1f}x'.format
+    }))
+
+
+if __name__ == "__main__":
+    main()
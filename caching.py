@@ -0,0 +1,114 @@
+"""
+Primitive di cache condivise da tutte le sessioni del processo.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class NegativeCache:
+    """
+    Ricorda per un tempo limitato le risorse che sappiamo non esistere (immagini, configurazioni),
+    così una richiesta ripetuta non costa ogni volta un elenco o un download a vuoto.
+    Le voci scadono dopo `ttl_seconds` e la cache viene svuotata a ogni aggiornamento del catalogo.
+    """
+
+    def __init__(self, ttl_seconds, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # chiave -> istante di scadenza, in ordine di inserimento
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False
+            return True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = time.monotonic() + self.ttl_seconds
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SingleFlight:
+    """
+    Unisce le richieste contemporanee per la stessa chiave: la prima esegue il caricamento, le altre
+    attendono il suo risultato (o la sua eccezione) invece di ripetere download ed elaborazione.
+    Conclusa l'operazione la chiave viene rimossa: non è una cache, le richieste successive ripartono
+    dalle cache vere e proprie. La funzione non deve richiedere a sua volta la stessa chiave.
+    """
+
+    def __init__(self):
+        self._calls = {}  # chiave -> Future del caricamento in corso
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, function):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = function()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def __len__(self):
+        return len(self._calls)
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight():
+    """
+    Restituisce il registro dei caricamenti in corso condiviso dal processo.
+    """
+    return _single_flight
+
+
+_negative_cache = None
+_negative_cache_lock = threading.Lock()
+
+
+def get_negative_cache(ttl_seconds=300):
+    """
+    Restituisce la cache negativa condivisa dal processo. Il TTL è quello della prima chiamata.
+    """
+    global _negative_cache
+    with _negative_cache_lock:
+        if _negative_cache is None:
+            _negative_cache = NegativeCache(ttl_seconds)
+        return _negative_cache
@@ -0,0 +1,176 @@
+"""
+Catalogo delle certificazioni con versioni e aggiornamento in background.
+
+Il catalogo (elenco dei blob, database, configurazioni, mappa delle immagini) è condiviso da tutte le
+sessioni del processo sotto forma di snapshot numerate e immutabili:
+
+- ogni sessione si aggancia (pin) alla versione più recente al momento dell'avvio e continua a usarla,
+  così il DataFrame di una certificazione non cambia mai sotto una domanda in corso e gli indici in
+  `seen_questions` puntano sempre allo stesso database;
+- se è attivo l'aggiornamento automatico (`refresh_seconds` maggiore di 0), quando la versione più recente
+  è più vecchia di `refresh_seconds` una nuova versione viene costruita in un thread in background
+  (stale-while-revalidate): nessuna sessione la attende;
+- le nuove sessioni ricevono l'ultima versione; una sessione passa alla nuova versione solo nei punti
+  sicuri in cui lo chiede esplicitamente (es. al cambio di certificazione);
+- ogni versione tiene il conto delle sessioni agganciate (tramite weakref.finalize sull'oggetto proprietario)
+  e viene rilasciata appena nessuna sessione la usa più e non è la più recente.
+"""
+import threading
+import time
+import weakref
+
+
+class CatalogDict(dict):
+    """
+    Dizionario del contenuto del catalogo. A differenza di dict ammette riferimenti deboli: memory_stats
+    può misurarlo senza trattenere in memoria le versioni già rilasciate.
+    """
+    __slots__ = ('__weakref__',)
+
+
+class CatalogSnapshot:
+    def __init__(self, version, contents):
+        self.version = version
+        self.contents = contents
+        self.created_at = time.monotonic()
+
+
+class Catalog:
+    def __init__(self, build, refresh_seconds=0):
+        """
+        `build()` costruisce il contenuto di una versione; viene chiamata fuori da qualsiasi sessione,
+        quindi non deve usare st.session_state. Con `refresh_seconds` pari a 0 non ci sono aggiornamenti automatici.
+        """
+        self._build = build
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._latest = None
+        self._versions = {}   # versione -> snapshot ancora in uso
+        self._refcounts = {}  # versione -> sessioni agganciate
+        self._refreshing = False
+
+    @property
+    def latest_version(self):
+        return self._latest.version if self._latest else None
+
+    def latest(self):
+        """
+        Restituisce l'ultima versione senza agganciarla (es. per le viste di amministrazione).
+        """
+        self._ensure_built()
+        return self._latest
+
+    def _install(self, contents):
+        with self._lock:
+            version = (self._latest.version + 1) if self._latest else 1
+            previous = self._latest
+            self._latest = CatalogSnapshot(version, contents)
+            self._versions[version] = self._latest
+            self._refcounts[version] = 0
+            if previous is not None and self._refcounts.get(previous.version) == 0:
+                self._forget(previous.version)
+            return self._latest
+
+    def _forget(self, version):
+        self._versions.pop(version, None)
+        self._refcounts.pop(version, None)
+
+    def _ensure_built(self):
+        # La prima costruzione è bloccante e avviene una sola volta anche con più sessioni in parallelo
+        if self._latest is None:
+            with self._build_lock:
+                if self._latest is None:
+                    self._install(self._build())
+
+    def refresh(self):
+        """
+        Costruisce subito una nuova versione (bloccante) e la restituisce.
+        """
+        with self._build_lock:
+            return self._install(self._build())
+
+    def update(self, change):
+        """
+        Installa una nuova versione ottenuta da `change(contents)` a partire dall'ultima, senza ricostruire
+        l'intero catalogo (es. dopo il caricamento di una sola certificazione), e la restituisce.
+        `change` deve restituire un nuovo contenuto senza modificare quello ricevuto, che le sessioni agganciate stanno usando.
+        """
+        self._ensure_built()
+        with self._build_lock:
+            return self._install(change(self._latest.contents))
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            # La versione corrente resta valida: si riproverà alla prossima richiesta
+            print(f"Aggiornamento del catalogo non riuscito: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _maybe_refresh(self):
+        if not self.refresh_seconds:
+            return
+        with self._lock:
+            if self._refreshing or time.monotonic() - self._latest.created_at < self.refresh_seconds:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, name="catalog-refresh", daemon=True).start()
+
+    def pin(self, owner, previous=None):
+        """
+        Aggancia `owner` (es. l'oggetto dell'applicazione della sessione) all'ultima versione.
+        Restituisce la snapshot e il finalizer che la rilascia: viene eseguito automaticamente quando
+        `owner` viene distrutto, oppure passandolo come `previous` alla chiamata successiva.
+        """
+        self._ensure_built()
+        self._maybe_refresh()
+        if previous is not None:
+            previous()
+        with self._lock:
+            snapshot = self._latest
+            self._refcounts[snapshot.version] += 1
+        finalizer = weakref.finalize(owner, self._release, snapshot.version)
+        finalizer.atexit = False
+        return snapshot, finalizer
+
+    def has_newer(self, version):
+        self._ensure_built()
+        self._maybe_refresh()
+        return self._latest.version != version
+
+    def _release(self, version):
+        with self._lock:
+            if version not in self._refcounts:
+                return
+            self._refcounts[version] -= 1
+            if self._refcounts[version] <= 0 and version != self._latest.version:
+                self._forget(version)
+
+    def stats(self):
+        """
+        Versioni ancora in memoria con il numero di sessioni agganciate.
+        """
+        with self._lock:
+            return {version: self._refcounts[version] for version in sorted(self._versions)}
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(name, build, refresh_seconds=0):
+    """
+    Restituisce il catalogo `name` (es. l'origine dei dati) condiviso dal processo, creandolo con `build` se serve.
+    """
+    with _catalogs_lock:
+        if name not in _catalogs:
+            _catalogs[name] = Catalog(build, refresh_seconds)
+        return _catalogs[name]
+
+
+def all_catalogs():
+    with _catalogs_lock:
+        return dict(_catalogs)
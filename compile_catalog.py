@@ -0,0 +1,162 @@
+"""
+Compilazione del catalogo delle domande.
+
+Verifica ogni database.xlsx rispetto alle immagini presenti in Domande/Topic*/ e produce la mappa
+precalcolata (topic, numero) -> immagine usata dall'interfaccia, che così non interroga mai lo storage
+per un'immagine che non esiste. Vengono segnalati:
+
+- righe con Topic o Numero mancanti o non numerici (l'applicazione li tratterebbe come 0);
+- domande duplicate (stessa coppia Topic/Numero);
+- domande senza immagine;
+- immagini orfane, senza una domanda corrispondente;
+- immagini duplicate (stesso topic e numero con estensioni diverse).
+
+Esempio:
+    python compile_catalog.py
+    python compile_catalog.py --data-path data
+"""
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+from storage import PackStorage, iter_certifications, parse_image_name
+
+REQUIRED_COLUMNS = ['Topic', 'Numero']
+
+
+def index_images(blob_names, cert):
+    """
+    Organizza le immagini della certificazione per topic e numero.
+    Restituisce l'indice topic -> numero -> nome del blob e l'elenco delle immagini duplicate scartate.
+    """
+    images = {}
+    duplicates = []
+    for name in blob_names:
+        parsed = parse_image_name(name)
+        if not parsed or parsed[0] != cert:
+            continue
+        _, topic, number = parsed
+        numbers = images.setdefault(topic, {})
+        if number in numbers:
+            duplicates.append(numbers[number])
+        numbers[number] = name
+    return images, duplicates
+
+
+def _as_float(values):
+    numeric = pd.to_numeric(values, errors='coerce')
+    return pd.Series(numeric.to_numpy(dtype=float, na_value=np.nan), index=values.index)
+
+
+def compile_certification(df, images, duplicate_images=()):
+    """
+    Confronta le domande del DataFrame con l'indice delle immagini.
+    Restituisce la mappa (topic, numero) -> nome del blob e il report dei problemi trovati.
+    """
+    report = {
+        'questions': 0,
+        'images': sum(len(numbers) for numbers in images.values()),
+        'missing_columns': [c for c in REQUIRED_COLUMNS if c not in df.columns],
+        'invalid_rows': [],
+        'duplicate_questions': [],
+        'missing_images': [],
+        'orphan_images': [],
+        'duplicate_images': sorted(duplicate_images)
+    }
+    if report['missing_columns']:
+        return {}, report
+
+    df = df.dropna(how='all')
+    report['questions'] = len(df)
+    # Float NumPy anche per i database con colonne Arrow (l'operatore % non è implementato per double[pyarrow])
+    topics = _as_float(df['Topic'])
+    numbers = _as_float(df['Numero'])
+    invalid = topics.isna() | numbers.isna() | (topics % 1 != 0) | (numbers % 1 != 0)
+    # Numero di riga come appare in Excel (la riga 1 è l'intestazione)
+    report['invalid_rows'] = [int(label) + 2 if pd.api.types.is_integer(label) else label for label in df.index[invalid]]
+
+    keys = pd.DataFrame({'Topic': topics[~invalid].astype(int), 'Numero': numbers[~invalid].astype(int)})
+    duplicated = keys[keys.duplicated(keep=False)]
+    report['duplicate_questions'] = sorted(set(zip(duplicated['Topic'], duplicated['Numero'])))
+
+    question_images = {}
+    for topic, number in sorted(set(zip(keys['Topic'], keys['Numero']))):
+        name = images.get(str(topic), {}).get(number)
+        if name:
+            question_images[(int(topic), int(number))] = name
+        else:
+            report['missing_images'].append((int(topic), int(number)))
+
+    linked = set(question_images.values())
+    report['orphan_images'] = sorted(
+        name for numbers_by_topic in images.values() for name in numbers_by_topic.values() if name not in linked
+    )
+    return question_images, report
+
+
+def has_problems(report):
+    return any(report[key] for key in (
+        'missing_columns', 'invalid_rows', 'duplicate_questions', 'missing_images', 'orphan_images', 'duplicate_images'
+    ))
+
+
+def format_report(cert, report):
+    """
+    Restituisce le righe di testo del report di una certificazione.
+    """
+    lines = [f"{cert}: {report['questions']} domande, {report['images']} immagini"]
+    if report['missing_columns']:
+        lines.append(f"  colonne mancanti: {', '.join(report['missing_columns'])}")
+    if report['invalid_rows']:
+        lines.append(f"  righe con Topic/Numero non validi: {', '.join(str(r) for r in report['invalid_rows'])}")
+    for topic, number in report['duplicate_questions']:
+        lines.append(f"  domanda duplicata: Topic {topic}, numero {number}")
+    for topic, number in report['missing_images']:
+        lines.append(f"  immagine mancante: Topic {topic}, numero {number}")
+    for name in report['orphan_images']:
+        lines.append(f"  immagine orfana: {name}")
+    for name in report['duplicate_images']:
+        lines.append(f"  immagine duplicata (ignorata): {name}")
+    return lines
+
+
+def compile_storage(storage):
+    """
+    Compila tutte le certificazioni del backend. Restituisce il dizionario certificazione -> report.
+    """
+    reports = {}
+    for cert, cert_blobs in iter_certifications(storage):
+        names = [blob.name for blob in cert_blobs]
+        database_path = f"data/{cert}/database.xlsx"
+        if database_path not in names:
+            continue
+        if isinstance(storage, PackStorage):
+            images, duplicates = storage.image_index(cert), []
+        else:
+            images, duplicates = index_images(names, cert)
+        _, reports[cert] = compile_certification(storage.read_bank(database_path), images, duplicates)
+    return reports
+
+
+def main():
+    # Importato qui: main.py usa questo modulo all'inizializzazione della cache
+    from main import CertificationQuizApp, config
+
+    parser = argparse.ArgumentParser(description="Verifica i database delle domande rispetto alle immagini.")
+    parser.add_argument("--data-path", default=config['data_path'],
+                        help="URL SAS del container, pacchetto .pack o cartella locale con le certificazioni (default: config.json)")
+    args = parser.parse_args()
+
+    app = CertificationQuizApp(dict(config, data_path=args.data_path))
+    if not app.storage:
+        raise SystemExit("Impossibile accedere ai dati a partire da data_path")
+
+    reports = compile_storage(app.storage)
+    for cert in sorted(reports):
+        print('\n'.join(format_report(cert, reports[cert])))
+    # Codice di uscita non nullo se ci sono problemi, per l'uso in pipeline
+    sys.exit(1 if any(has_problems(report) for report in reports.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
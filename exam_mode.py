@@ -0,0 +1,93 @@
+"""
+Simulazione d'esame: un insieme fisso di domande estratto all'inizio, con tempo limite e voto finale.
+All'avvio le immagini di tutte le domande vengono scaricate in parallelo (con un numero massimo
+di download contemporanei), così lo spostamento tra le domande non passa mai dalla rete.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ExamSimulation:
+    def __init__(self, cert, questions, duration_seconds, pass_threshold):
+        """
+        `questions` è il DataFrame delle domande estratte, nell'ordine in cui verranno proposte.
+        """
+        self.cert = cert
+        self.questions = questions.reset_index(drop=False)
+        self.duration_seconds = duration_seconds
+        self.pass_threshold = pass_threshold
+        self.started_at = time.time()
+        self.current = 0
+        self.answers = {}
+        self.image_futures = {}
+        self.results = None
+        self.recorded = False  # Esiti già salvati nell'archivio dei tentativi
+
+    def __len__(self):
+        return len(self.questions)
+
+    def question(self, position=None):
+        """
+        Restituisce la domanda nella posizione indicata (di default quella corrente).
+        """
+        return self.questions.iloc[self.current if position is None else position]
+
+    def prefetch_images(self, fetch_image, max_workers=4):
+        """
+        Avvia in background il download delle immagini di tutte le domande.
+        `fetch_image(question)` deve restituire i byte dell'immagine o None e non deve usare st.session_state.
+        """
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="exam-prefetch")
+        for position in range(len(self.questions)):
+            self.image_futures[position] = executor.submit(fetch_image, self.question(position))
+        # I download proseguono; il pool si chiude da solo al termine
+        executor.shutdown(wait=False)
+
+    def image(self, position=None):
+        """
+        Restituisce i byte dell'immagine della domanda, attendendo il download se non è ancora concluso.
+        """
+        future = self.image_futures.get(self.current if position is None else position)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def remaining_seconds(self):
+        return max(0.0, self.started_at + self.duration_seconds - time.time())
+
+    def is_finished(self):
+        return self.results is not None
+
+    def finish(self, check_answer):
+        """
+        Chiude l'esame e calcola l'esito di ogni domanda con `check_answer(risposta, risposta_esatta)`.
+        """
+        if self.results is not None:
+            return self.results
+
+        rows = []
+        for position in range(len(self.questions)):
+            question = self.question(position)
+            answer = self.answers.get(position, "")
+            rows.append({
+                'Domanda': position + 1,
+                'Topic': question['Topic'],
+                'Numero': question['Numero'],
+                'Risposta data': answer,
+                'Risposta Esatta': question['Risposta Esatta'],
+                'Corretta': bool(answer) and check_answer(answer, str(question['Risposta Esatta']))
+            })
+        correct = sum(row['Corretta'] for row in rows)
+        score = correct / len(rows) if rows else 0.0
+        self.results = {
+            'rows': rows,
+            'correct': correct,
+            'total': len(rows),
+            'score': score,
+            'passed': score >= self.pass_threshold,
+            'elapsed_seconds': min(time.time() - self.started_at, self.duration_seconds)
+        }
+        return self.results
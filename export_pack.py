@@ -0,0 +1,78 @@
+"""
+Esporta tutte le certificazioni in un unico pacchetto offline (.pack).
+
+Il pacchetto contiene i database in formato colonnare (Arrow IPC), le configurazioni, le immagini
+e l'indice topic/numero delle immagini. L'applicazione lo legge con mmap senza copiare i byte:
+basta impostare `data_path` al file .pack in config.json (anche incluso nell'eseguibile PyInstaller).
+
+Esempio:
+    python export_pack.py --output materiale-certificazioni.pack
+    python export_pack.py --data-path data --output materiale-certificazioni.pack
+"""
+import argparse
+import json
+from main import CertificationQuizApp, config
+from shared_cache import prepare_for_feather
+from compile_catalog import index_images, compile_certification, format_report
+from storage import PackStorage, PackWriter, iter_certifications
+
+
+def export_pack(storage, output_path, source):
+    """
+    Scrive in `output_path` il pacchetto con tutte le certificazioni del backend indicato.
+    Restituisce il numero di certificazioni e di immagini esportate.
+    """
+    writer = PackWriter(output_path, source)
+    exported_certs = 0
+    exported_images = 0
+    for cert, cert_blobs in iter_certifications(storage):
+        blob_map = {blob.name: blob for blob in cert_blobs}
+        database_path = f"data/{cert}/database.xlsx"
+        if database_path not in blob_map:
+            continue
+
+        config_path = f"data/{cert}/config.json"
+        cert_config = None
+        if config_path in blob_map:
+            content = bytes(storage.read(config_path))
+            writer.add_blob(blob_map[config_path], content)
+            cert_config = json.loads(content.decode('utf-8'))
+
+        images, duplicate_images = index_images(blob_map, cert)
+        for numbers in images.values():
+            for name in numbers.values():
+                writer.add_blob(blob_map[name], storage.read(name))
+                exported_images += 1
+
+        df = prepare_for_feather(storage.read_bank(database_path))
+        writer.add_certification(cert, blob_map[database_path], df, cert_config, images)
+        exported_certs += 1
+
+        _, report = compile_certification(df, images, duplicate_images)
+        print('\n'.join(format_report(cert, report)))
+
+    writer.close()
+    return exported_certs, exported_images
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Esporta le certificazioni in un pacchetto offline.")
+    parser.add_argument("--data-path", default=config['data_path'],
+                        help="URL SAS del container o cartella locale con le certificazioni (default: config.json)")
+    parser.add_argument("--output", default="materiale-certificazioni.pack", help="File del pacchetto da creare")
+    args = parser.parse_args()
+
+    app = CertificationQuizApp(dict(config, data_path=args.data_path))
+    if not app.storage:
+        raise SystemExit("Impossibile accedere ai dati a partire da data_path")
+    if isinstance(app.storage, PackStorage):
+        raise SystemExit("data_path è già un pacchetto offline")
+
+    # L'URL SAS non viene salvato nel pacchetto
+    source = args.data_path.split('?')[0]
+    certs, images = export_pack(app.storage, args.output, source)
+    print(f"Pacchetto {args.output}: {certs} certificazioni, {images} immagini")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import re
+import sqlite3
+import threading
+import time
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from caching import get_single_flight
+
+# lxml è molto più veloce di html.parser, ma è facoltativo
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+
+# Dominio della fonte esterna supportata per l'estrazione delle discussioni
+SUPPORTED_DOMAIN = "examtopics.com"
+
+DEFAULT_SELECTOR = ".discussion-header-container"
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Entro FRESH_SECONDS il contenuto viene servito così com'è; oltre viene servito comunque
+# (stale) e rivalidato in background, finché non supera STALE_SECONDS
+FRESH_SECONDS = 3600
+STALE_SECONDS = 7 * 24 * 3600
+
+# Stili che rendono il contenuto non cliccabile ma scrollabile
+PAGE_STYLE = """
+            body {{
+                margin: 0;
+                padding: 0;
+                background: transparent;
+            }}
+            {selector} {{
+                padding: 10px;
+                background: white;
+                border-radius: 5px;
+                box-shadow: 0 1px 3px rgba(0,0,0,0.1);
+            }}
+            /* Stile per rendere non cliccabile tutto il contenuto */
+            * {{
+                pointer-events: none !important;
+            }}
+            /* Eccezione per permettere lo scrolling */
+            html, body {{
+                pointer-events: auto !important;
+                overflow: auto !important;
+            }}
+            /* Rimuove qualsiasi evidenziazione o selezione */
+            * {{
+                user-select: none !important;
+                -webkit-user-select: none !important;
+                -moz-user-select: none !important;
+                -ms-user-select: none !important;
+            }}
+            /* Rimuovi stili dei link */
+            a {{
+                color: inherit !important;
+                text-decoration: none !important;
+                cursor: default !important;
+            }}
+"""
+
+_SIMPLE_SELECTOR = re.compile(r'^([A-Za-z][\w-]*)?(?:([.#])([\w-]+))?$')
+
+_lock = threading.Lock()
+# (url, selector) -> (frammento HTML o None, istante di scaricamento)
+_fragments = {}
+# dominio -> fogli di stile e blocchi <style> condivisi da tutte le pagine del dominio
+_domain_styles = {}
+_revalidating = set()
+# Archivio persistente opzionale (vedi configure_store)
+_persistent_store = None
+
+
+class FragmentStore:
+    """
+    Archivio persistente (SQLite) dei frammenti estratti, indicizzato per URL e selettore
+    e corredato dall'istante di scaricamento. Conserva anche gli stili condivisi di ogni dominio.
+    Viene popolato dal job di pre-scaricamento (prefetch_links.py) e letto dall'applicazione.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fragments ("
+                "url TEXT NOT NULL, selector TEXT NOT NULL, fragment TEXT, fetched_at REAL NOT NULL, "
+                "PRIMARY KEY (url, selector))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS domain_styles ("
+                "domain TEXT PRIMARY KEY, links TEXT NOT NULL, styles TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def _connection(self):
+        # Una connessione per thread: i worker del prefetch e le sessioni scrivono in parallelo
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url, selector):
+        """
+        Restituisce (frammento, istante di scaricamento) oppure None se l'URL non è in archivio.
+        """
+        row = self._connection().execute(
+            "SELECT fragment, fetched_at FROM fragments WHERE url = ? AND selector = ?", (url, selector)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put(self, url, selector, fragment, fetched_at):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO fragments (url, selector, fragment, fetched_at) VALUES (?, ?, ?, ?)",
+                (url, selector, fragment, fetched_at)
+            )
+
+    def fetched_at_by_url(self, selector):
+        """
+        Restituisce un dizionario URL -> istante di scaricamento per il selettore indicato.
+        """
+        rows = self._connection().execute(
+            "SELECT url, fetched_at FROM fragments WHERE selector = ?", (selector,)
+        ).fetchall()
+        return dict(rows)
+
+    def get_styles(self, domain):
+        row = self._connection().execute(
+            "SELECT links, styles FROM domain_styles WHERE domain = ?", (domain,)
+        ).fetchone()
+        return {'links': row[0], 'styles': row[1]} if row else None
+
+    def put_styles(self, domain, styles):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO domain_styles (domain, links, styles, fetched_at) VALUES (?, ?, ?, ?)",
+                (domain, styles['links'], styles['styles'], time.time())
+            )
+
+
+def configure_store(path):
+    """
+    Attiva l'archivio persistente dei frammenti nel file indicato (None per disattivarlo).
+    Può essere richiamata a ogni esecuzione dello script: l'archivio viene riaperto solo se il percorso cambia.
+    """
+    global _persistent_store
+    with _lock:
+        if path is None:
+            _persistent_store = None
+        elif _persistent_store is None or _persistent_store.path != path:
+            _persistent_store = FragmentStore(path)
+    return _persistent_store
+
+
+def get_domain(url):
+    """
+    Restituisce schema e host di un URL (es. 'https://www.examtopics.com').
+    """
+    match = re.match(r'(https?://[^/]+)', url)
+    return match.group(1) if match else None
+
+
+def is_supported_link(url):
+    """
+    Verifica se il link punta alla fonte esterna supportata.
+    """
+    return isinstance(url, str) and url.startswith('http') and SUPPORTED_DOMAIN in url
+
+
+def _strainer_for_selector(selector):
+    """
+    Converte un selettore CSS semplice ('tag', '.classe', '#id', 'tag.classe') in un SoupStrainer,
+    così da costruire l'albero solo per l'elemento cercato.
+    Restituisce None per selettori più complessi, che richiedono il parsing completo.
+    """
+    match = _SIMPLE_SELECTOR.match(selector.strip())
+    if not match or not (match.group(1) or match.group(3)):
+        return None
+    tag, kind, value = match.groups()
+    attrs = {}
+    if kind == '.':
+        attrs['class'] = value
+    elif kind == '#':
+        attrs['id'] = value
+    return SoupStrainer(tag or True, attrs=attrs)
+
+
+def _extract_styles(html, url):
+    """
+    Estrae dalla pagina i blocchi <style> e i fogli di stile esterni.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=SoupStrainer(['style', 'link']))
+
+    all_styles = "\n".join([style.string for style in soup.find_all('style') if style.string])
+
+    stylesheets = []
+    for link in soup.find_all('link', rel='stylesheet'):
+        if link.get('href'):
+            href = link['href']
+            if href.startswith('/'):
+                href = get_domain(url) + href
+            stylesheets.append(f'<link rel="stylesheet" href="{href}">')
+
+    return {'links': ''.join(stylesheets), 'styles': all_styles}
+
+
+def fetch_fragment(url, selector=DEFAULT_SELECTOR, session=None, timeout=10):
+    """
+    Scarica la pagina ed estrae in forma compatta solo l'elemento indicato dal selettore.
+    Alla prima pagina di ogni dominio raccoglie anche gli stili, che vengono poi riutilizzati.
+
+    Returns:
+        str: HTML del frammento
+        None: Se il selettore non trova nulla
+    """
+    response = (session or requests).get(url, headers=REQUEST_HEADERS, timeout=timeout)
+    response.raise_for_status()
+    html = response.text
+
+    strainer = _strainer_for_selector(selector)
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=strainer) if strainer else BeautifulSoup(html, HTML_PARSER)
+    target_element = soup.select_one(selector)
+
+    domain = get_domain(url)
+    if _get_domain_styles(domain) is None:
+        styles = _extract_styles(html, url)
+        with _lock:
+            _domain_styles.setdefault(domain, styles)
+            store = _persistent_store
+        if store:
+            store.put_styles(domain, styles)
+
+    return str(target_element) if target_element else None
+
+
+def _get_domain_styles(domain):
+    with _lock:
+        styles = _domain_styles.get(domain)
+        store = _persistent_store
+    if styles is None and store:
+        styles = store.get_styles(domain)
+        if styles is not None:
+            with _lock:
+                _domain_styles.setdefault(domain, styles)
+    return styles
+
+
+def build_page(url, fragment, selector=DEFAULT_SELECTOR):
+    """
+    Compone la pagina da visualizzare a partire dal frammento e dagli stili condivisi del dominio.
+    """
+    styles = _get_domain_styles(get_domain(url)) or {'links': '', 'styles': ''}
+    return (
+        f"<html><head>{styles['links']}<style>{styles['styles']}"
+        f"{PAGE_STYLE.format(selector=selector)}</style></head>"
+        f"<body>{fragment}</body></html>"
+    )
+
+
+def _store(url, selector, fragment, fetched_at=None):
+    fetched_at = fetched_at or time.time()
+    with _lock:
+        _fragments[(url, selector)] = (fragment, fetched_at)
+        store = _persistent_store
+    if store:
+        store.put(url, selector, fragment, fetched_at)
+
+
+def _download(url, selector):
+    """
+    Scarica e memorizza il frammento. I download contemporanei dello stesso frammento
+    (es. molte sessioni sulla stessa domanda) sono uniti in una sola richiesta.
+    """
+    def download():
+        fragment = fetch_fragment(url, selector)
+        _store(url, selector, fragment)
+        return fragment
+
+    return get_single_flight().do(('fragment', url, selector), download)
+
+
+def _revalidate(url, selector):
+    try:
+        _download(url, selector)
+    except Exception:
+        # La copia scaduta resta valida finché la fonte non torna disponibile
+        pass
+    finally:
+        with _lock:
+            _revalidating.discard((url, selector))
+
+
+def _schedule_revalidation(url, selector):
+    with _lock:
+        if (url, selector) in _revalidating:
+            return
+        _revalidating.add((url, selector))
+    threading.Thread(target=_revalidate, args=(url, selector), daemon=True).start()
+
+
+def get_fragment(url, selector=DEFAULT_SELECTOR):
+    """
+    Restituisce il frammento della discussione applicando la politica stale-while-revalidate.
+    Quando la copia in memoria non è più fresca viene riletto l'archivio del prefetch, che può contenerne
+    una più recente; si usa poi la copia più recente tra le due:
+    - entro FRESH_SECONDS viene servita così com'è;
+    - entro STALE_SECONDS viene servita e rinnovata in background;
+    - oltre, o se non esiste alcuna copia, il frammento viene scaricato in modo sincrono
+      (un solo download per le sessioni che lo chiedono contemporaneamente).
+    Se il download sincrono fallisce viene servita la copia scaduta, se esiste;
+    altrimenti l'eccezione di rete viene propagata.
+    """
+    with _lock:
+        entry = _fragments.get((url, selector))
+        store = _persistent_store
+
+    if store and (entry is None or time.time() - entry[1] >= FRESH_SECONDS):
+        # Copia pre-scaricata dal job di prefetch, forse più recente di quella in memoria
+        stored = store.get(url, selector)
+        if stored and (entry is None or stored[1] > entry[1]):
+            entry = stored
+            with _lock:
+                current = _fragments.get((url, selector))
+                if current is None or current[1] < entry[1]:
+                    _fragments[(url, selector)] = entry
+
+    if entry:
+        fragment, fetched_at = entry
+        age = time.time() - fetched_at
+        if age < FRESH_SECONDS:
+            return fragment
+        if age < STALE_SECONDS:
+            _schedule_revalidation(url, selector)
+            return fragment
+
+    try:
+        return _download(url, selector)
+    except Exception:
+        if entry:
+            return entry[0]
+        raise
+
+
+def get_external_page(url, selector=DEFAULT_SELECTOR):
+    """
+    Restituisce la pagina HTML pronta per essere visualizzata, o None se il contenuto non è disponibile.
+    """
+    if not url or not url.startswith('http'):
+        return None
+    fragment = get_fragment(url, selector)
+    if fragment is None:
+        return None
+    return build_page(url, fragment, selector)
@@ -0,0 +1,48 @@
+"""
+Preriscaldamento delle immagini del topic selezionato.
+
+Quando l'utente sceglie un topic le domande che vedrà sono note: un job in background scarica le loro
+immagini nella cache condivisa (su disco, oppure la cache delle immagini del catalogo) nell'ordine in cui
+le domande verranno proposte, con un numero massimo di download contemporanei. Così le prime domande
+dopo il cambio di topic trovano l'immagine già pronta.
+
+Il job viene annullato al cambio di topic o di certificazione: i download non ancora iniziati vengono
+scartati, quelli in corso terminano normalmente (e restano comunque in cache).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ImageWarmup:
+    def __init__(self, questions, fetch_image, max_workers=4):
+        """
+        `questions` è l'elenco delle coppie (topic, numero) nell'ordine di estrazione.
+        `fetch_image(topic, number)` porta l'immagine in cache e non deve usare st.session_state.
+        """
+        self.total = len(questions)
+        self.completed = 0
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-warmup")
+        for topic, number in questions:
+            self._executor.submit(self._warm, fetch_image, topic, number)
+        # I download proseguono; il pool si chiude da solo al termine
+        self._executor.shutdown(wait=False)
+
+    def _warm(self, fetch_image, topic, number):
+        if self._cancelled.is_set():
+            return
+        fetch_image(topic, number)
+        with self._lock:
+            self.completed += 1
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """
+        Annulla i download non ancora iniziati.
+        """
+        self._cancelled.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
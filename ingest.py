@@ -0,0 +1,76 @@
+"""
+Lettura dei database delle domande (database.xlsx).
+
+Vengono lette solo le colonne usate dall'applicazione (più quelle con il testo della domanda, indicizzate
+dalla ricerca), con tipi dichiarati per le colonne di testo: le altre colonne del foglio non vengono
+convertite né tenute in memoria. Il lettore Excel è intercambiabile: di default si usa calamine
+(pacchetto facoltativo python-calamine, scritto in Rust e molto più veloce) se installato, altrimenti openpyxl.
+
+Topic e Numero non hanno un tipo dichiarato: i valori non numerici devono arrivare intatti alla
+verifica del catalogo (compile_catalog.py), che li segnala.
+"""
+import importlib.util
+import pandas as pd
+from search_index import QUESTION_COLUMN_HINTS
+
+USED_COLUMNS = ['Topic', 'Numero', 'Risposta Esatta', 'Commento', 'Link']
+TEXT_DTYPES = {'Risposta Esatta': str, 'Commento': str, 'Link': str}
+
+# Lettori disponibili in ordine di preferenza: nome -> funzione (source, usecols, dtype) -> DataFrame
+ENGINES = {}
+_default_engine = None
+
+
+def register_engine(name, reader):
+    """
+    Registra un lettore Excel. I lettori registrati prima hanno la precedenza nella scelta automatica.
+    """
+    ENGINES[name] = reader
+
+
+def _pandas_engine(engine):
+    def read(source, usecols, dtype):
+        return pd.read_excel(source, engine=engine, usecols=usecols, dtype=dtype)
+    return read
+
+
+if importlib.util.find_spec('python_calamine') is not None:
+    register_engine('calamine', _pandas_engine('calamine'))
+register_engine('openpyxl', _pandas_engine('openpyxl'))
+
+
+def is_used_column(column):
+    """
+    Indica se la colonna del foglio serve all'applicazione.
+    """
+    return column in USED_COLUMNS or any(hint in str(column).lower() for hint in QUESTION_COLUMN_HINTS)
+
+
+def configure(engine="auto"):
+    """
+    Imposta il lettore predefinito ("auto" sceglie il più veloce installato).
+    """
+    global _default_engine
+    if engine not in (None, "auto") and engine not in ENGINES:
+        raise ValueError(f"Lettore Excel non disponibile: {engine} (disponibili: {', '.join(ENGINES)})")
+    _default_engine = None if engine == "auto" else engine
+
+
+def default_engine():
+    return _default_engine or next(iter(ENGINES))
+
+
+def read_question_bank(source, engine=None):
+    """
+    Legge un database delle domande da un percorso o da un file-like (es. BytesIO).
+    Se il lettore scelto non riesce a interpretare il file si riprova con openpyxl.
+    """
+    engine = engine or default_engine()
+    try:
+        return ENGINES[engine](source, is_used_column, TEXT_DTYPES)
+    except Exception:
+        if engine == 'openpyxl':
+            raise
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return ENGINES['openpyxl'](source, is_used_column, TEXT_DTYPES)
@@ -1,13 +1,37 @@
 import streamlit as st
 import pandas as pd
-from PIL import Image
 import os
 import sys
 import json
 import requests
 import markdown
 import io
+import hmac
+import html
+import threading
+import time
+import random
+import heapq
+import hashlib
+import uuid
 from azure.storage.blob import BlobServiceClient
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import memory_stats
+import ingest
+from question_scheduler import AdaptiveScheduler
+from exam_mode import ExamSimulation
+from attempt_store import get_attempt_store
+from attempt_analytics import get_analytics
+from search_index import get_search_index
+from shared_cache import get_shared_cache
+from caching import get_negative_cache, get_single_flight
+from storage import AzureBlobStorage, PackStorage, BlobNotFoundError, open_local_storage, iter_certifications
+from resilience import ResilientStorage, StorageUnavailableError, get_storage_health
+from compile_catalog import index_images, compile_certification, has_problems, format_report
+from catalog import CatalogDict, get_catalog, all_catalogs
+from image_warmup import ImageWarmup
+from mixed_pool import MixedPool
+from admin_upload import upload_certification, iter_image_files, format_summary, is_valid_cert_name
 
 
 def resource_path(relative_path):
@@ -33,113 +57,286 @@ def load_config():
         return json.load(file)
 
 
+# Intervallo minimo (in secondi) tra due rivalidazioni HTTP della guida remota
+GUIDE_REVALIDATE_SECONDS = 60
+
+
+@st.cache_resource
+def _get_guide_cache():
+    """
+    Restituisce la cache di processo dell'HTML della guida, condivisa tra tutte le sessioni.
+    Ogni voce conserva l'HTML renderizzato e i metadati per la rivalidazione (mtime, ETag, Last-Modified).
+    """
+    return {'lock': threading.Lock(), 'entries': {}}
+
+
+def _render_markdown(content):
+    """
+    Converte il markdown in HTML con i tag <br> per le nuove righe e l'indice generato da 'toc'.
+    """
+    return markdown.markdown(content, extensions=['nl2br', 'toc'])
+
+
 def load_markdown_content(file_path):
     """
     Carica e converte il contenuto di un file markdown in HTML.
     Utilizza l'estensione 'nl2br' per preservare le interruzioni di riga e 'toc' per generare un indice.
+    L'HTML viene mantenuto in una cache di processo e rigenerato solo quando la sorgente cambia:
+    per i file locali si confronta l'mtime, per gli URL si usa una richiesta condizionale (ETag/Last-Modified).
+    Il lock della cache protegge solo il dizionario delle voci: le richieste HTTP avvengono fuori dal lock
+    e quelle contemporanee per la stessa guida sono unite, così una guida lenta non blocca le altre.
     """
+    cache = _get_guide_cache()
+    with cache['lock']:
+        entry = cache['entries'].get(file_path)
+
     if file_path.startswith(('http://', 'https://')):
-        response = requests.get(file_path)
-        response.raise_for_status()
-        content = response.text
-    else:
-        with open(resource_path(file_path), 'r', encoding='utf-8') as file:
-            content = file.read()
-    # Converti il markdown in HTML con i tag <br> per le nuove righe
-    html = markdown.markdown(content, extensions=['nl2br', 'toc'])
+        if entry and time.monotonic() - entry['checked_at'] < GUIDE_REVALIDATE_SECONDS:
+            return entry['html']
+        return get_single_flight().do(('guide', file_path), lambda: _fetch_remote_guide(cache, file_path))
+
+    local_path = resource_path(file_path)
+    mtime = os.stat(local_path).st_mtime_ns
+    if entry and entry['mtime'] == mtime:
+        return entry['html']
+
+    with open(local_path, 'r', encoding='utf-8') as file:
+        html = _render_markdown(file.read())
+    with cache['lock']:
+        cache['entries'][file_path] = {'html': html, 'mtime': mtime}
     return html
 
 
+def _fetch_remote_guide(cache, file_path):
+    """
+    Rivalida la guida remota con una richiesta condizionale e aggiorna la sua voce nella cache.
+    """
+    with cache['lock']:
+        entry = cache['entries'].get(file_path)
+    now = time.monotonic()
+    if entry and now - entry['checked_at'] < GUIDE_REVALIDATE_SECONDS:
+        return entry['html']
+
+    headers = {}
+    if entry and entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry and entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+
+    try:
+        response = requests.get(file_path, headers=headers, timeout=10)
+        if response.status_code == 304 and entry:
+            updated = dict(entry, checked_at=now)
+        else:
+            response.raise_for_status()
+            updated = {
+                'html': _render_markdown(response.text),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'checked_at': now
+            }
+    except requests.RequestException:
+        # Se la sorgente non è raggiungibile, meglio servire l'ultima versione nota
+        if not entry:
+            raise
+        updated = dict(entry, checked_at=now)
+
+    with cache['lock']:
+        cache['entries'][file_path] = updated
+    return updated['html']
+
+
+def get_missing_blobs():
+    """
+    Restituisce la cache negativa del processo: immagini e configurazioni che sappiamo non esistere.
+    """
+    return get_negative_cache(config.get('negative_cache_ttl', 300))
+
+
+def normalize_bank(df):
+    """
+    Rimuove le righe vuote e converte Topic e Numero in interi (i valori non validi diventano 0).
+    Restituisce un nuovo DataFrame, senza modificare quello ricevuto.
+    """
+    if df.empty:
+        return df
+    df = df.dropna(how='all')
+    return df.assign(
+        Topic=pd.to_numeric(df['Topic'], errors='coerce').astype('float64').fillna(0).astype(int),
+        Numero=pd.to_numeric(df['Numero'], errors='coerce').astype('float64').fillna(0).astype(int)
+    )
+
+
+def load_catalog_certification(storage, cert, cert_blobs, blob_map, shared_cache):
+    """
+    Carica una certificazione del catalogo a partire dai suoi blob, che vengono aggiunti a `blob_map`.
+    Restituisce None se la certificazione non ha il database, altrimenti un dizionario con configurazione,
+    database normalizzato, immagini, mappa domanda -> immagine e report dei problemi.
+    """
+    # Ogni blob viene visto una sola volta e finisce subito nella mappa e nell'indice delle immagini
+    def stream_names():
+        for blob in cert_blobs:
+            blob_map[blob.name] = blob
+            yield blob.name
+
+    if isinstance(storage, PackStorage):
+        # Il pacchetto offline ha già l'indice delle immagini
+        for blob in cert_blobs:
+            blob_map[blob.name] = blob
+        images, duplicate_images = storage.image_index(cert), []
+    else:
+        images, duplicate_images = index_images(stream_names(), cert)
+
+    # Verifica se esiste il database della certificazione
+    database_path = f"data/{cert}/database.xlsx"
+    if database_path not in blob_map:
+        return None
+
+    # Carica la configurazione (se esiste)
+    cert_config = None
+    config_path = f"data/{cert}/config.json"
+    if config_path in blob_map:
+        content = bytes(storage.read(config_path))
+        cert_config = json.loads(content.decode('utf-8'))
+
+    # Carica il database
+    def download_database():
+        return storage.read_bank(database_path)
+
+    # Con la cache condivisa il database viene scaricato ed elaborato una sola volta per host
+    if shared_cache:
+        try:
+            df = shared_cache.load_bank(database_path, blob_map[database_path].etag, download_database)
+        except StorageUnavailableError:
+            # Storage degradato: si usa l'ultima versione salvata del database, se c'è
+            df = shared_cache.load_stale_bank(database_path)
+            if df is None:
+                raise
+    else:
+        df = download_database()
+
+    # Aggiorna l'indice di ricerca (solo le righe nuove o modificate)
+    get_search_index().index_certification(cert, df)
+
+    # Collega ogni domanda alla sua immagine e segnala i problemi del database
+    question_images, report = compile_certification(df, images, duplicate_images)
+    if has_problems(report):
+        print('\n'.join(format_report(cert, report)))
+
+    return {
+        'config': cert_config,
+        # Il database condiviso è già normalizzato: le sessioni lo usano senza copiarlo
+        'database': normalize_bank(df),
+        'images': images,
+        'question_images': question_images,
+        'report': report
+    }
+
+
+def _add_certification(contents, cert, entry):
+    contents['valid_certifications'].append(cert)
+    if entry['config'] is not None:
+        contents['cert_configs'][cert] = entry['config']
+    contents['cert_databases'][cert] = entry['database']
+    contents['cert_images'][cert] = entry['images']
+    contents['question_images'][cert] = entry['question_images']
+    contents['cert_reports'][cert] = entry['report']
+
+
+def build_catalog(storage):
+    """
+    Costruisce una versione del catalogo: elenca i blob e carica configurazioni, database e mappa delle immagini.
+    Viene eseguita anche in background per gli aggiornamenti, quindi non usa st.session_state.
+    """
+    # Il catalogo sta per essere riletto: le assenze ricordate finora non sono più affidabili
+    get_missing_blobs().clear()
+    
+    # I backend locali (cartella o pacchetto offline) non passano dalla cache su disco
+    shared_cache = get_shared_cache(config.get('shared_cache_dir')) if storage.remote else None
+
+    # I dizionari misurati dalla vista ?view=memoria sono CatalogDict (ammettono riferimenti deboli)
+    contents = CatalogDict({
+        'valid_certifications': [],
+        'cert_configs': {},
+        'cert_databases': CatalogDict(),
+        'cert_images': {},
+        'question_images': {},
+        'cert_reports': {},
+        # Mappa dei blob per un accesso più efficiente
+        'blob_map': CatalogDict(),
+        # Cache delle immagini già scaricate (chiave della domanda -> byte) e contenuti distinti (MD5 -> byte)
+        'image_content_cache': CatalogDict(),
+        'image_contents': {}
+    })
+
+    # Un elenco per certificazione (le cartelle di data/ sono ottenute con un elenco gerarchico)
+    for cert, cert_blobs in iter_certifications(storage):
+        entry = load_catalog_certification(storage, cert, cert_blobs, contents['blob_map'], shared_cache)
+        if entry is not None:
+            _add_certification(contents, cert, entry)
+
+    return contents
+
+
+def update_catalog_certification(contents, storage, cert):
+    """
+    Restituisce il contenuto di una nuova versione del catalogo in cui solo `cert` viene riletta dallo storage.
+    Le altre certificazioni (database, immagini, configurazioni) sono condivise con la versione di partenza,
+    che non viene modificata; l'indice di ricerca viene aggiornato solo per le righe cambiate.
+    """
+    get_missing_blobs().clear()
+    shared_cache = get_shared_cache(config.get('shared_cache_dir')) if storage.remote else None
+
+    prefix = f"data/{cert}/"
+    updated = CatalogDict({
+        'valid_certifications': [c for c in contents['valid_certifications'] if c != cert],
+        'blob_map': CatalogDict(
+            (name, blob) for name, blob in contents['blob_map'].items() if not name.startswith(prefix)
+        ),
+        # Le chiavi sono del tipo "<certificazione>_<topic>_<numero>"
+        'image_content_cache': CatalogDict(
+            (key, value) for key, value in contents['image_content_cache'].items() if key.rsplit('_', 2)[0] != cert
+        ),
+        # Indicizzati per contenuto: restano validi e si possono condividere con la versione di partenza
+        'image_contents': contents['image_contents']
+    })
+    for key in ('cert_configs', 'cert_databases', 'cert_images', 'question_images', 'cert_reports'):
+        updated[key] = {c: value for c, value in contents[key].items() if c != cert}
+    # Misurato dalla vista ?view=memoria
+    updated['cert_databases'] = CatalogDict(updated['cert_databases'])
+
+    entry = load_catalog_certification(storage, cert, storage.list_blobs(prefix), updated['blob_map'], shared_cache)
+    if entry is None:
+        get_search_index().remove_certification(cert)
+    else:
+        _add_certification(updated, cert, entry)
+        updated['valid_certifications'].sort()
+    return updated
+
+
+def get_app_catalog(app):
+    """
+    Restituisce il catalogo condiviso dalle sessioni che leggono la stessa origine dei dati.
+    """
+    # La funzione di costruzione non deve riferirsi all'app, altrimenti la sessione non verrebbe mai rilasciata
+    storage = app.storage
+    return get_catalog(
+        app.data_path.split('?')[0],
+        lambda: build_catalog(storage),
+        config.get('catalog_refresh_seconds', 0)
+    )
+
+
 def initialize_blob_cache(app):
     """
-    Inizializza la cache dei blob scaricando tutti i blob necessari una sola volta.
+    Inizializza la cache dei blob agganciando la sessione all'ultima versione del catalogo condiviso.
+    Il catalogo viene costruito una sola volta per processo; le sessioni successive lo trovano già pronto.
     """
     if 'blob_cache' not in st.session_state:
         try:
-            # Ottieni il client del container
-            container_client = app.blob_service_client.get_container_client(app.container_name)
-            
-            # Elenca tutti i blob nel container
-            st.session_state.all_blobs = list(container_client.list_blobs())
-            
-            # Crea una mappa dei blob per un accesso più efficiente
-            blob_map = {}
-            certifications = set()
-            
-            for blob in st.session_state.all_blobs:
-                blob_map[blob.name] = blob
-                
-                # Estrai le certificazioni
-                parts = blob.name.split('/')
-                if len(parts) > 1 and parts[0] == "data":
-                    certifications.add(parts[1])
-            
-            # Crea un dizionario per le certificazioni valide
-            valid_certifications = []
-            cert_configs = {}
-            cert_databases = {}
-            cert_images = {}
-            
-            for cert in certifications:
-                database_path = f"data/{cert}/database.xlsx"
-                
-                # Verifica se esiste il database della certificazione
-                if database_path in blob_map:
-                    valid_certifications.append(cert)
-                    
-                    # Carica la configurazione (se esiste)
-                    config_path = f"data/{cert}/config.json"
-                    if config_path in blob_map:
-                        blob_client = container_client.get_blob_client(config_path)
-                        download_stream = blob_client.download_blob()
-                        content = download_stream.readall()
-                        cert_configs[cert] = json.loads(content.decode('utf-8'))
-                    
-                    # Carica il database
-                    blob_client = container_client.get_blob_client(database_path)
-                    download_stream = blob_client.download_blob()
-                    content = download_stream.readall()
-                    df = pd.read_excel(io.BytesIO(content))
-                    cert_databases[cert] = df
-                    
-                    # Organizza le immagini per topic e numero
-                    cert_images[cert] = {}
-                    img_prefix = f"data/{cert}/Domande/"
-                    for blob in st.session_state.all_blobs:
-                        if blob.name.startswith(img_prefix):
-                            # Estrai topic e numero dall'immagine
-                            path_parts = blob.name.split('/')
-                            if len(path_parts) > 4 and path_parts[3].startswith("Topic"):
-                                topic = path_parts[3].replace("Topic", "")
-                                file_name = path_parts[4]
-                                
-                                # Estrai il numero dall'inizio del nome del file
-                                number_parts = file_name.split('.')
-                                if len(number_parts) >= 2:
-                                    try:
-                                        number = int(number_parts[0])
-                                        
-                                        # Aggiungi alla struttura delle immagini
-                                        if topic not in cert_images[cert]:
-                                            cert_images[cert][topic] = {}
-                                        
-                                        cert_images[cert][topic][number] = blob.name
-                                    except ValueError:
-                                        pass
-            
-            # Crea anche una cache delle immagini già scaricate
-            image_content_cache = {}
-            
-            # Salva tutto nella session_state
-            st.session_state.blob_cache = {
-                'valid_certifications': valid_certifications,
-                'cert_configs': cert_configs,
-                'cert_databases': cert_databases,
-                'cert_images': cert_images,
-                'blob_map': blob_map,
-                'image_content_cache': image_content_cache
-            }
-            
+            snapshot, app.catalog_pin = get_app_catalog(app).pin(app, previous=app.catalog_pin)
+            app.catalog_version = snapshot.version
+            st.session_state.blob_cache = snapshot.contents
             return True
         except Exception as e:
             import traceback
@@ -149,8 +346,52 @@ def initialize_blob_cache(app):
     return True
 
 
+def repin_catalog(app):
+    """
+    Passa la sessione all'ultima versione del catalogo, se ne esiste una più recente.
+    Va chiamata solo quando la sessione non ha una domanda in corso (es. al cambio di certificazione).
+    """
+    if 'blob_cache' not in st.session_state or app.catalog_pin is None:
+        return
+    catalog = get_app_catalog(app)
+    if catalog.has_newer(app.catalog_version):
+        snapshot, app.catalog_pin = catalog.pin(app, previous=app.catalog_pin)
+        app.catalog_version = snapshot.version
+        st.session_state.blob_cache = snapshot.contents
+
+
 # Carica la configurazione una sola volta all'inizio
 config = load_config()
+ingest.configure(config.get('ingest_engine', "auto"))
+
+
+# Modalità di studio disponibili
+STUDY_MODE_RANDOM = "Casuale"
+STUDY_MODE_ADAPTIVE = "Adattiva"
+
+# Voce del selettore delle certificazioni per la modalità mista (domande di più certificazioni)
+MIXED_CERT = "🔀 Domande miste"
+
+
+class CertificationProgress:
+    """
+    Stato di studio di una certificazione conservato nella sessione quando si passa a un'altra.
+    Contiene solo contatori e indici di riga: i DataFrame restano quelli condivisi del catalogo.
+    """
+    __slots__ = (
+        'correct_answers', 'total_questions', 'seen_questions', 'question_weights',
+        'topic', 'question_label', 'catalog_version'
+    )
+
+    def __init__(self, correct_answers, total_questions, seen_questions, question_weights,
+                 topic, question_label, catalog_version):
+        self.correct_answers = correct_answers
+        self.total_questions = total_questions
+        self.seen_questions = seen_questions
+        self.question_weights = question_weights
+        self.topic = topic
+        self.question_label = question_label
+        self.catalog_version = catalog_version
 
 
 class CertificationQuizApp:
@@ -163,15 +404,43 @@ class CertificationQuizApp:
         self.correct_answers = 0
         self.total_questions = 0
         self.seen_questions = set()
+        self.study_mode = STUDY_MODE_RANDOM
+        self.question_weights = {}  # Pesi della modalità adattiva (indice domanda -> peso)
+        self.scheduler = None
+        self.question_order = None  # Ordine di estrazione della modalità casuale (la prossima domanda è in fondo)
+        self.image_warmup = None  # Preriscaldamento delle immagini del topic corrente
+        self.mixed_pool = None  # Domande della modalità mista
+        self.progress = {}  # Stato di studio delle certificazioni lasciate (certificazione -> CertificationProgress)
+        self.catalog_version = None  # Versione del catalogo a cui è agganciata la sessione
+        self.catalog_pin = None
         self.data_path = config['data_path']
         self.container_name = config.get('container_name')  # Ottieni il container_name dalla config
         
-        # Inizializza il client Azure se necessario
+        # Inizializza il backend dei dati: Azure se data_path è un URL SAS, altrimenti
+        # un pacchetto offline (.pack, anche incluso nell'eseguibile PyInstaller) o una cartella locale
         if self.data_path.startswith(('http://', 'https://')):
             self.blob_service_client = self._create_blob_service_client()
+            self.storage = None
+            if self.blob_service_client:
+                # Scadenze, nuovi tentativi e circuit breaker condivisi da tutte le sessioni
+                health = get_storage_health(self.data_path.split('?')[0], config.get('resilience'))
+                self.storage = ResilientStorage(
+                    AzureBlobStorage(
+                        self.blob_service_client.get_container_client(self.container_name),
+                        account_key=config.get('storage_account_key'),
+                        url_seconds=config.get('image_url_seconds', 3600)
+                    ),
+                    health
+                )
         else:
             self.blob_service_client = None
             self.container_name = None
+            try:
+                self.storage = open_local_storage(resource_path(self.data_path), static_dir=resource_path("static"))
+            except (OSError, ValueError):
+                import traceback
+                traceback.print_exc()
+                self.storage = None
 
     def _create_blob_service_client(self):
         """
@@ -204,7 +473,7 @@ class CertificationQuizApp:
             "ai_agent_url": config.get('default_ai_agent_url', "")  # Usa quello globale come fallback
         }
         
-        if self.blob_service_client and self.container_name:
+        if self.storage:
             if 'blob_cache' in st.session_state and cert_name in st.session_state.blob_cache['cert_configs']:
                 default_config.update(st.session_state.blob_cache['cert_configs'][cert_name])
             else:
@@ -212,25 +481,26 @@ class CertificationQuizApp:
                     # Percorso del file di configurazione nel blob storage
                     config_path = f"data/{cert_name}/config.json"
                     
-                    # Ottieni il client del container
-                    container_client = self.blob_service_client.get_container_client(self.container_name)
-                    blob_client = container_client.get_blob_client(config_path)
+                    # Configurazione già cercata di recente e non trovata
+                    if config_path in get_missing_blobs():
+                        return default_config
                     
                     try:
-                        # Verifica se il blob esiste
-                        blob_client.get_blob_properties()
-                        
-                        # Scarica il contenuto del blob
-                        download_stream = blob_client.download_blob()
-                        content = download_stream.readall()
+                        # Scarica il contenuto del blob (solleva un'eccezione se non esiste);
+                        # le sessioni che lo chiedono nello stesso momento condividono un solo download
+                        content = get_single_flight().do(
+                            ('config', config_path), lambda: bytes(self.storage.read(config_path))
+                        )
                         
                         # Carica il JSON
                         cert_config = json.loads(content.decode('utf-8'))
                         
                         # Aggiorna il dizionario di default con i valori trovati
                         default_config.update(cert_config)
-                    except Exception:
-                        pass
+                    except BlobNotFoundError:
+                        get_missing_blobs().add(config_path)
+                    except Exception as e:
+                        print(f"Errore nel caricamento della configurazione di {cert_name}: {e}")
                 except Exception:
                     pass
         
@@ -240,7 +510,7 @@ class CertificationQuizApp:
         """
         Recupera l'elenco delle certificazioni disponibili dalla cache.
         """
-        if not self.blob_service_client or not self.container_name:
+        if not self.storage:
             return []
             
         if 'blob_cache' in st.session_state:
@@ -255,24 +525,19 @@ class CertificationQuizApp:
         """
         Carica i dati per la certificazione selezionata dalla cache o dal file Excel.
         """
-        if self.blob_service_client and self.container_name:
+        if self.storage:
             if 'blob_cache' in st.session_state and selected_cert in st.session_state.blob_cache['cert_databases']:
-                self.df = st.session_state.blob_cache['cert_databases'][selected_cert].copy()
+                # Database condiviso e immutabile della versione del catalogo agganciata: nessuna copia
+                self.df = st.session_state.blob_cache['cert_databases'][selected_cert]
             else:
                 try:
                     # Percorso del file nel blob storage
                     blob_path = f"data/{selected_cert}/database.xlsx"
                     
-                    # Ottieni il client del blob
-                    container_client = self.blob_service_client.get_container_client(self.container_name)
-                    blob_client = container_client.get_blob_client(blob_path)
-                    
-                    # Scarica il contenuto del blob
-                    download_stream = blob_client.download_blob()
-                    content = download_stream.readall()
-                    
-                    # Leggi il dataframe dal contenuto scaricato
-                    self.df = pd.read_excel(io.BytesIO(content))
+                    # Leggi il dataframe dal backend (una sola lettura anche con più sessioni in parallelo)
+                    self.df = get_single_flight().do(
+                        ('bank', blob_path), lambda: normalize_bank(self.storage.read_bank(blob_path))
+                    )
                 except Exception as e:
                     import traceback
                     traceback.print_exc()
@@ -280,11 +545,6 @@ class CertificationQuizApp:
         else:
             self.df = pd.DataFrame()
         
-        if not self.df.empty:
-            self.df = self.df.dropna(how='all')
-            self.df['Topic'] = pd.to_numeric(self.df['Topic'], errors='coerce').fillna(0).astype(int)
-            self.df['Numero'] = pd.to_numeric(self.df['Numero'], errors='coerce').fillna(0).astype(int)
-        
         return sorted(self.df['Topic'].unique())
 
     def filter_questions(self, selected_topic):
@@ -296,60 +556,85 @@ class CertificationQuizApp:
         else:
             topic_number = int(selected_topic.split()[-1])
             self.filtered_df = self.df[self.df['Topic'] == topic_number]
-        self.seen_questions.clear()
+        # Le domande già viste (anche quelle ricostruite dai tentativi) non vengono riproposte subito
+        self.scheduler = None  # Verrà ricostruito sul nuovo filtro alla prossima estrazione adattiva
+        self.question_order = None
+        self.cancel_image_warmup()
+
+    def set_study_mode(self, mode):
+        """
+        Imposta la modalità di studio (casuale o adattiva).
+        """
+        self.study_mode = mode
 
     def find_image_file(self, selected_cert, topic, number):
         """
         Trova il file immagine associato a una domanda specifica.
         """
-        if not self.blob_service_client or not self.container_name:
+        content = self.get_image_bytes(st.session_state.get('blob_cache'), selected_cert, topic, number)
+        return io.BytesIO(content) if content is not None else None
+
+    def get_image_url(self, blob_cache, selected_cert, topic, number):
+        """
+        Restituisce l'URL da cui il browser scarica direttamente l'immagine (con image_delivery = "direct"),
+        o None se la modalità diretta non è attiva o il backend non la supporta: in quel caso i byte passano dal server.
+        """
+        if not self.storage or not blob_cache or config.get('image_delivery', "proxy") != "direct":
+            return None
+        blob_name = blob_cache['question_images'].get(selected_cert, {}).get((int(topic), int(number)))
+        if blob_name is None:
+            return None
+        return self.storage.image_url(blob_name)
+
+    def get_image_bytes(self, blob_cache, selected_cert, topic, number):
+        """
+        Restituisce i byte dell'immagine di una domanda usando la cache dei blob indicata, o None se non esiste.
+        Non accede a st.session_state, quindi può essere usata anche dai thread di prefetch.
+        """
+        if not self.storage:
             return None
             
         # Crea una chiave univoca per questa immagine
         image_key = f"{selected_cert}_{topic}_{number}"
         
         # Verifica se l'immagine è già nella cache delle immagini
-        if ('blob_cache' in st.session_state and 
-            image_key in st.session_state.blob_cache['image_content_cache']):
+        if blob_cache and image_key in blob_cache['image_content_cache']:
             # Restituisci l'immagine dalla cache
-            return io.BytesIO(st.session_state.blob_cache['image_content_cache'][image_key])
+            return blob_cache['image_content_cache'][image_key]
         
-        # Verifica se abbiamo la mappa delle immagini in cache
-        if ('blob_cache' in st.session_state and 
-            selected_cert in st.session_state.blob_cache['cert_images'] and
-            str(topic) in st.session_state.blob_cache['cert_images'][selected_cert] and
-            int(number) in st.session_state.blob_cache['cert_images'][selected_cert][str(topic)]):
-            
-            # Ottieni il nome del blob dalla cache
-            blob_name = st.session_state.blob_cache['cert_images'][selected_cert][str(topic)][int(number)]
+        # Verifica se abbiamo la mappa compilata domanda -> immagine
+        if blob_cache and selected_cert in blob_cache['question_images']:
+            # Ottieni il nome del blob dalla mappa: se manca, l'immagine non esiste e lo storage non viene interrogato
+            blob_name = blob_cache['question_images'][selected_cert].get((int(topic), int(number)))
+            if blob_name is None or blob_name in get_missing_blobs():
+                return None
             
             try:
-                # Scarica il blob
-                container_client = self.blob_service_client.get_container_client(self.container_name)
-                blob_client = container_client.get_blob_client(blob_name)
-                download_stream = blob_client.download_blob()
-                content = download_stream.readall()
-                
-                # Salva nella cache delle immagini
-                if 'blob_cache' in st.session_state:
-                    st.session_state.blob_cache['image_content_cache'][image_key] = content
-                
-                return io.BytesIO(content)
+                blob = blob_cache['blob_map'].get(blob_name)
+                return self._download_image(
+                    blob_cache, image_key, blob_name, blob.etag if blob else None, blob.content_md5 if blob else None
+                )
+            except BlobNotFoundError:
+                # Rimosso dopo l'elenco del catalogo
+                get_missing_blobs().add(blob_name)
+                return None
             except Exception:
                 import traceback
                 traceback.print_exc()
                 return None
         else:
-            # Se non abbiamo la cache o l'immagine non è in cache, usa il metodo originale
+            # Se non abbiamo la cache, usa il metodo originale
             try:
                 # Definisci il prefisso per la ricerca del blob
                 prefix = f"data/{selected_cert}/Domande/Topic{topic}/"
                 
-                # Ottieni il client del container
-                container_client = self.blob_service_client.get_container_client(self.container_name)
+                # Immagine già cercata di recente e non trovata: evita un nuovo elenco
+                missing_key = f"{prefix}{int(number)}.*"
+                if missing_key in get_missing_blobs():
+                    return None
                 
                 # Lista tutti i blob con il prefisso dato
-                blobs = list(container_client.list_blobs(name_starts_with=prefix))
+                blobs = list(self.storage.list_blobs(prefix))
                 
                 # Cerca un blob che corrisponda al numero della domanda
                 matching_blob = None
@@ -360,48 +645,277 @@ class CertificationQuizApp:
                         break
                 
                 if matching_blob:
-                    # Scarica il blob
-                    blob_client = container_client.get_blob_client(matching_blob.name)
-                    download_stream = blob_client.download_blob()
-                    content = download_stream.readall()
-                    
-                    # Salva nella cache delle immagini
-                    if 'blob_cache' in st.session_state:
-                        st.session_state.blob_cache['image_content_cache'][image_key] = content
-                    
-                    return io.BytesIO(content)
+                    return self._download_image(
+                        blob_cache, image_key, matching_blob.name, matching_blob.etag, matching_blob.content_md5
+                    )
                 else:
+                    get_missing_blobs().add(missing_key)
                     return None
-            except Exception:
+            except Exception as e:
+                print(f"Errore nella ricerca dell'immagine {selected_cert} {topic}/{number}: {e}")
                 return None
 
+    def _download_image(self, blob_cache, image_key, blob_name, etag, content_md5=None):
+        """
+        Scarica un'immagine passando dalla cache su disco condivisa tra i processi, se disponibile:
+        in quel caso i byte non vengono tenuti in memoria dalla sessione.
+        Altrimenti l'immagine viene conservata nella cache delle immagini della sessione.
+        I backend locali vengono letti direttamente: per il pacchetto offline i byte sono
+        una memoryview sul file mappato in memoria, senza copie.
+        Le richieste contemporanee della stessa immagine (es. tutta una classe sulla prima domanda)
+        attendono un unico download. In tutte le cache le immagini sono conservate una sola volta per
+        contenuto: con il Content-MD5 del blob (`content_md5`) un contenuto già scaricato con un altro
+        nome (es. la stessa schermata in due certificazioni) non viene scaricato di nuovo.
+        """
+        if not self.storage.remote:
+            return self.storage.read(blob_name)
+        flight_key = ('image-md5', content_md5) if content_md5 else ('image', blob_name, etag)
+        return get_single_flight().do(
+            flight_key, lambda: self._fetch_image(blob_cache, image_key, blob_name, etag, content_md5)
+        )
+
+    def _fetch_image(self, blob_cache, image_key, blob_name, etag, content_md5):
+        def download():
+            return self.storage.read(blob_name)
+
+        shared_cache = get_shared_cache(config.get('shared_cache_dir'))
+        if shared_cache:
+            try:
+                return shared_cache.get_image(blob_name, etag, download, content_md5)
+            except StorageUnavailableError:
+                # Storage degradato: meglio l'ultima versione salvata dell'immagine che nessuna immagine
+                stale = shared_cache.get_stale_image(blob_name)
+                if stale is None:
+                    raise
+                return stale
+
+        if not blob_cache:
+            return download()
+        # I byte sono conservati una volta per contenuto: le domande con la stessa immagine condividono lo stesso oggetto
+        contents = blob_cache['image_contents']
+        content = contents.get(content_md5) if content_md5 else None
+        if content is None:
+            content = download()
+            content = contents.setdefault(content_md5 or hashlib.md5(content).hexdigest(), content)
+        blob_cache['image_content_cache'][image_key] = content
+        return content
+
     def get_random_question(self):
         """
         Seleziona una domanda casuale tra quelle non ancora viste.
         """
         if self.filtered_df is None or self.filtered_df.empty:
             return None
-        unseen_questions = self.filtered_df[~self.filtered_df.index.isin(self.seen_questions)]
-        if unseen_questions.empty:
-            self.seen_questions.clear()
-            unseen_questions = self.filtered_df
-        question = unseen_questions.sample().iloc[0]
-        self.seen_questions.add(question.name)
+        if self.study_mode == STUDY_MODE_ADAPTIVE:
+            return self._get_adaptive_question()
+        # Le domande seguono una permutazione casuale del set filtrato: stessa distribuzione dell'estrazione
+        # tra le domande non viste, ma l'ordine è noto in anticipo (serve al preriscaldamento delle immagini)
+        if self.question_order is None:
+            self._shuffle_questions()
+        while self.question_order and self.question_order[-1] in self.seen_questions:
+            self.question_order.pop()
+        if not self.question_order:
+            # Viste tutte le domande del filtro: si ricomincia solo da queste
+            self.seen_questions.difference_update(self.filtered_df.index)
+            self._shuffle_questions()
+        label = self.question_order.pop()
+        self.seen_questions.add(label)
+        return self.filtered_df.loc[label]
+
+    def _shuffle_questions(self):
+        self.question_order = list(self.filtered_df.index)
+        random.shuffle(self.question_order)
+
+    def upcoming_questions(self, limit):
+        """
+        Restituisce gli indici delle prossime `limit` domande nell'ordine in cui verranno proposte.
+        In modalità adattiva l'ordine dipende dalle risposte: si usano le domande con peso maggiore, le più probabili.
+        """
+        if self.filtered_df is None or self.filtered_df.empty:
+            return []
+        if self.study_mode == STUDY_MODE_ADAPTIVE:
+            return heapq.nlargest(
+                limit, self.filtered_df.index,
+                key=lambda label: self.question_weights.get(label, AdaptiveScheduler.DEFAULT_WEIGHT)
+            )
+        if self.question_order is None:
+            self._shuffle_questions()
+        upcoming = []
+        for label in reversed(self.question_order):
+            if len(upcoming) >= limit:
+                break
+            if label not in self.seen_questions:
+                upcoming.append(label)
+        return upcoming
+
+    def start_image_warmup(self, blob_cache, selected_cert):
+        """
+        Avvia in background il download delle immagini del topic corrente nell'ordine di estrazione,
+        annullando quello precedente. Non serve per i backend locali né con la consegna diretta delle immagini.
+        """
+        self.cancel_image_warmup()
+        limit = config.get('image_warmup_limit', 100)
+        if (not limit or not self.storage or not self.storage.remote or not blob_cache
+                or config.get('image_delivery', "proxy") == "direct"):
+            return
+        images = blob_cache['question_images'].get(selected_cert, {})
+        labels = self.upcoming_questions(limit)
+        if not labels:
+            return
+        rows = self.filtered_df.loc[labels, ['Topic', 'Numero']]
+        questions = [
+            (int(topic), int(number)) for topic, number in zip(rows['Topic'], rows['Numero'])
+            if (int(topic), int(number)) in images
+        ]
+
+        # I thread non possono leggere st.session_state: la cache viene passata esplicitamente
+        def fetch_image(topic, number):
+            self.get_image_bytes(blob_cache, selected_cert, topic, number)
+
+        self.image_warmup = ImageWarmup(questions, fetch_image, max_workers=config.get('image_warmup_workers', 4))
+
+    def cancel_image_warmup(self):
+        if self.image_warmup is not None:
+            self.image_warmup.cancel()
+            self.image_warmup = None
+
+    def _get_adaptive_question(self):
+        """
+        Seleziona una domanda con probabilità proporzionale al suo peso: le domande sbagliate
+        tornano più spesso. Estrazione e aggiornamento dei pesi costano O(log n).
+        """
+        if self.scheduler is None:
+            self.scheduler = AdaptiveScheduler(self.filtered_df.index, self.question_weights)
+        label = self.scheduler.pick()
+        question = self.filtered_df.loc[label]
+        self.seen_questions.add(label)
         return question
 
+    def start_exam(self, selected_cert, num_questions, duration_minutes):
+        """
+        Avvia una simulazione d'esame con `num_questions` domande estratte dal set filtrato corrente.
+        Le immagini di tutte le domande vengono scaricate subito in parallelo.
+        """
+        if self.filtered_df is None or self.filtered_df.empty:
+            return None
+
+        questions = self.filtered_df.sample(min(num_questions, len(self.filtered_df)))
+        exam = ExamSimulation(
+            selected_cert,
+            questions,
+            duration_minutes * 60,
+            config.get('exam_pass_threshold', 0.7)
+        )
+
+        # I thread di prefetch non possono leggere st.session_state: la cache viene passata esplicitamente
+        blob_cache = st.session_state.get('blob_cache')
+
+        def fetch_image(question):
+            # Con la consegna diretta basta l'URL: l'immagine la scarica il browser
+            url = self.get_image_url(blob_cache, selected_cert, question['Topic'], question['Numero'])
+            return url or self.get_image_bytes(blob_cache, selected_cert, question['Topic'], question['Numero'])
+
+        exam.prefetch_images(
+            fetch_image,
+            max_workers=config.get('exam_prefetch_workers', 4)
+        )
+        return exam
+
     def check_answer(self, user_answer, correct_answer):
         """
         Verifica se la risposta dell'utente è corretta.
         """
         return user_answer.strip().upper() == correct_answer.strip().upper()
 
+    def record_answer(self, question, is_correct):
+        """
+        Registra l'esito di una risposta: aggiorna il punteggio e il peso della domanda per la modalità adattiva.
+        """
+        if is_correct:
+            self.correct_answers += 1
+        self.total_questions += 1
+
+        if self.scheduler is not None:
+            self.scheduler.record(question.name, is_correct)
+        else:
+            AdaptiveScheduler.record_weight(self.question_weights, question.name, is_correct)
+
     def reset_score(self):
         """
-        Reimposta il punteggio e le domande viste.
+        Reimposta il punteggio, le domande viste e i pesi della modalità adattiva.
         """
         self.correct_answers = 0
         self.total_questions = 0
         self.seen_questions.clear()
+        self.question_weights = {}
+        self.scheduler = None
+
+    def save_progress(self, cert, topic, question):
+        """
+        Conserva lo stato di studio della certificazione lasciata (punteggio, domande viste, pesi,
+        topic e domanda corrente), per ritrovarlo quando l'utente ci torna.
+        """
+        self.progress[cert] = CertificationProgress(
+            self.correct_answers,
+            self.total_questions,
+            self.seen_questions,
+            self.question_weights,
+            topic,
+            question.name if question is not None else None,
+            self.catalog_version
+        )
+        self.seen_questions = set()
+        self.question_weights = {}
+
+    def restore_progress(self, cert):
+        """
+        Ripristina lo stato di studio salvato della certificazione (già caricata con load_certification),
+        o riparte da zero se non c'è. Domande viste, pesi e domanda corrente vengono ripristinati solo se
+        il database è della stessa versione del catalogo, altrimenti gli indici potrebbero non corrispondere.
+        Restituisce lo stato ripristinato o None.
+        """
+        self.reset_score()
+        self.filtered_df = None
+        self.question_order = None
+        progress = self.progress.pop(cert, None)
+        if progress is None:
+            return None
+
+        self.correct_answers = progress.correct_answers
+        self.total_questions = progress.total_questions
+        if progress.topic is not None:
+            self.filter_questions(progress.topic)
+        if progress.catalog_version != self.catalog_version:
+            progress.question_label = None
+            return progress
+        self.seen_questions = progress.seen_questions
+        self.question_weights = progress.question_weights
+        return progress
+
+    def restore_attempts(self, attempts):
+        """
+        Ricostruisce punteggio, domande viste e pesi della modalità adattiva della certificazione caricata
+        a partire dai tentativi registrati (DataFrame di AttemptStore.read_user, in ordine di risposta).
+        I tentativi di domande non più presenti nel database contano solo nel punteggio.
+        """
+        if attempts.empty or self.df is None or self.df.empty:
+            return
+        self.correct_answers = int(attempts['correct'].sum())
+        self.total_questions = len(attempts)
+        labels = dict(zip(zip(self.df['Topic'].astype(int), self.df['Numero'].astype(int)), self.df.index))
+        for topic, number, correct in attempts[['topic', 'question_number', 'correct']].itertuples(index=False):
+            label = labels.get((topic, number))
+            if label is not None:
+                self.seen_questions.add(label)
+                AdaptiveScheduler.record_weight(self.question_weights, label, bool(correct))
+
+    def question_by_label(self, label):
+        """
+        Restituisce la domanda con l'indice indicato, o None se non esiste.
+        """
+        if label is None or self.df is None or label not in self.df.index:
+            return None
+        return self.df.loc[label]
 
     def get_available_questions_count(self):
         """
@@ -412,6 +926,646 @@ class CertificationQuizApp:
         return 0
 
 
+def get_session_id():
+    """
+    Restituisce l'identificativo della sessione Streamlit corrente.
+    """
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "locale"
+
+
+# Parametro dell'URL con l'identificativo degli utenti non autenticati
+USER_PARAM = "utente"
+
+
+def get_user_id():
+    """
+    Restituisce l'utente corrente: il principal dell'autenticazione di App Service se presente,
+    altrimenti un identificativo anonimo conservato nel parametro ?utente= dell'URL, che (a differenza
+    della sessione Streamlit) resta lo stesso quando la pagina viene aggiornata.
+    """
+    try:
+        principal = st.context.headers.get('X-Ms-Client-Principal-Name')
+    except Exception:
+        principal = None
+    if principal:
+        return principal
+    try:
+        user = st.query_params.get(USER_PARAM)
+        if not user:
+            user = uuid.uuid4().hex
+            st.query_params[USER_PARAM] = user
+    except Exception:
+        return f"sessione:{get_session_id()}"
+    return f"anonimo:{user}"
+
+
+def get_attempts():
+    """
+    Restituisce l'archivio dei tentativi condiviso dal processo.
+    """
+    return get_attempt_store(config.get('attempts_db_path', "attempts.sqlite"))
+
+
+def record_attempt(cert, question, answer, is_correct):
+    """
+    Registra un tentativo nell'archivio persistente. La scrittura avviene in background.
+    """
+    get_attempts().record(
+        get_user_id(), cert, question['Topic'], question['Numero'], answer, is_correct
+    )
+
+
+def check_admin_access():
+    """
+    Verifica l'accesso alle viste di amministrazione tramite la chiave 'admin_key' della configurazione.
+    Se la chiave non è configurata le viste di amministrazione restano disabilitate.
+    """
+    admin_key = config.get('admin_key')
+    if not admin_key:
+        st.error("Viste di amministrazione disabilitate: configurare 'admin_key' in config.json.")
+        return False
+    if st.session_state.get('admin_authenticated'):
+        return True
+
+    key = st.text_input("Chiave di amministrazione:", type="password", key="admin_key_input")
+    if key and hmac.compare_digest(key, admin_key):
+        st.session_state.admin_authenticated = True
+        return True
+    if key:
+        st.error("Chiave di amministrazione non valida.")
+    return False
+
+
+def memory_view():
+    """
+    Vista di amministrazione con l'occupazione di memoria per sessione e dell'intero processo.
+    Si apre con il parametro ?view=memoria nell'URL.
+    """
+    st.title("Occupazione di memoria")
+    if not check_admin_access():
+        return
+
+    megabyte = 1024 * 1024
+    report = memory_stats.process_report()
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("RSS del processo", memory_stats.format_bytes(report['rss']))
+    col2.metric("Sessioni attive", report['sessions'])
+    col3.metric("Cache dei blob (oggetti distinti)", memory_stats.format_bytes(report['distinct'].get('blob_cache', 0)))
+
+    st.markdown("### Totali di processo (MB)")
+    st.caption("Gli oggetti condivisi tra più sessioni sono contati una sola volta in 'oggetti distinti'.")
+    totals = pd.DataFrame({
+        'oggetti distinti': pd.Series(report['distinct']),
+        'somma per sessione': pd.Series(report['summed'])
+    }) / megabyte
+    st.dataframe(totals.round(2), use_container_width=True)
+    if report['skipped']:
+        st.caption(f"Oggetti non misurati perché modificati durante la misura: {report['skipped']}")
+
+    st.markdown("### Dettaglio per sessione (MB)")
+    sessions = memory_stats.session_report()
+    if not sessions.empty:
+        byte_columns = [c for c in sessions.columns if c not in ('sessione', 'ultima attività')]
+        sessions[byte_columns] = (sessions[byte_columns] / megabyte).round(2)
+    st.dataframe(sessions, use_container_width=True, hide_index=True)
+
+    flights = get_single_flight()
+    st.caption(f"Caricamenti in corso: {len(flights)}; richieste unite a un caricamento già in corso: {flights.coalesced}")
+
+    st.markdown("### Versioni del catalogo")
+    st.caption("Sessioni agganciate a ciascuna versione; le versioni non più usate vengono rilasciate.")
+    for catalog in all_catalogs().values():
+        st.write(f"Ultima versione: {catalog.latest_version}")
+        st.dataframe(
+            pd.DataFrame(list(catalog.stats().items()), columns=['versione', 'sessioni']),
+            use_container_width=True, hide_index=True
+        )
+
+    st.markdown("### Andamento nel tempo (MB)")
+    samples = memory_stats.history()
+    if samples.empty:
+        st.info("Nessun campione ancora disponibile.")
+    else:
+        st.line_chart(samples.drop(columns=['sessioni']) / megabyte)
+        st.line_chart(samples[['sessioni']])
+
+
+def analytics_view():
+    """
+    Vista con le statistiche di difficoltà delle domande: accuratezza per topic e per domanda,
+    domande più sbagliate e stima della percentuale di promossi per certificazione.
+    Si apre con il parametro ?view=statistiche nell'URL.
+    """
+    st.title("Statistiche delle domande")
+    if not check_admin_access():
+        return
+
+    analytics = get_analytics(get_attempts())
+    analytics.refresh()
+
+    certifications = analytics.certifications()
+    if not certifications:
+        st.info("Nessun tentativo registrato.")
+        return
+
+    pass_threshold = config.get('exam_pass_threshold', 0.7)
+    st.markdown("### Stima dei promossi per certificazione")
+    st.caption(f"Utenti con almeno 10 tentativi; promosso se l'accuratezza raggiunge il {pass_threshold * 100:.0f}%.")
+    estimates = analytics.pass_rate_estimates(pass_threshold)
+    if estimates.empty:
+        st.write("Dati insufficienti.")
+    else:
+        st.dataframe(
+            estimates.rename(columns={'users': 'Utenti', 'mean_accuracy': 'Accuratezza media', 'pass_rate': 'Promossi'}),
+            use_container_width=True
+        )
+
+    cert = st.selectbox("Certificazione:", certifications)
+
+    st.markdown("### Accuratezza per topic")
+    topics = analytics.topic_accuracy(cert)
+    st.bar_chart(topics['accuracy'])
+
+    st.markdown("### Domande più sbagliate")
+    st.dataframe(analytics.most_missed(cert), use_container_width=True)
+
+    st.markdown("### Tutte le domande")
+    st.dataframe(analytics.question_accuracy(cert), use_container_width=True)
+
+
+def upload_view():
+    """
+    Vista di amministrazione per caricare il database e le immagini di una certificazione.
+    Il catalogo viene aggiornato rileggendo solo la certificazione caricata; le sessioni aperte
+    passano alla nuova versione al prossimo cambio di certificazione.
+    Si apre con il parametro ?view=caricamento nell'URL.
+    """
+    st.title("Caricamento domande")
+    if not check_admin_access():
+        return
+
+    if 'app' not in st.session_state:
+        st.session_state.app = CertificationQuizApp(config)
+    storage = st.session_state.app.storage
+    if not storage:
+        st.error("Origine dei dati non disponibile.")
+        return
+    catalog = get_app_catalog(st.session_state.app)
+
+    new_cert = "Nuova certificazione..."
+    cert = st.selectbox("Certificazione:", catalog.latest().contents['valid_certifications'] + [new_cert])
+    if cert == new_cert:
+        cert = st.text_input("Nome della nuova certificazione:").strip()
+        if cert and not is_valid_cert_name(cert):
+            st.error("Il nome della certificazione può contenere solo lettere, cifre, '_', '-' e spazi.")
+            return
+    database = st.file_uploader("Database (database.xlsx):", type=['xlsx'])
+    images = st.file_uploader("Immagini (zip con le cartelle Topic1, Topic2, ...):", type=['zip'])
+
+    if not st.button("Carica", disabled=not cert or (database is None and images is None)):
+        return
+    try:
+        with st.spinner("Caricamento in corso..."):
+            summary = upload_certification(
+                storage, cert,
+                database.getvalue() if database is not None else None,
+                iter_image_files(images) if images is not None else ()
+            )
+            snapshot = catalog.update(lambda contents: update_catalog_certification(contents, storage, cert))
+    except NotImplementedError:
+        st.error("L'origine dei dati è in sola lettura (pacchetto offline).")
+        return
+    except ValueError as e:
+        st.error(str(e))
+        return
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        st.error(f"Caricamento non riuscito: {e}")
+        return
+
+    st.success(f"Caricamento completato: catalogo aggiornato alla versione {snapshot.version}.")
+    st.code('\n'.join(format_summary(cert, summary)))
+    report = snapshot.contents['cert_reports'].get(cert)
+    if report is not None and has_problems(report):
+        st.warning("Problemi trovati nel catalogo della certificazione:")
+        st.code('\n'.join(format_report(cert, report)))
+
+
+def show_image_url(url):
+    """
+    Mostra un'immagine scaricata direttamente dal browser (URL firmato dello storage o percorso statico).
+    """
+    st.markdown(f"<img src='{html.escape(url, quote=True)}' style='width: 100%;'>", unsafe_allow_html=True)
+
+
+@st.fragment(run_every=1)
+def exam_countdown(exam):
+    """
+    Conto alla rovescia della simulazione d'esame, aggiornato ogni secondo senza rieseguire l'intera pagina.
+    Allo scadere del tempo riesegue l'applicazione per mostrare il voto.
+    """
+    remaining = exam.remaining_seconds()
+    if remaining <= 0:
+        st.rerun()
+    minutes, seconds = divmod(int(remaining), 60)
+    st.metric(label="Tempo rimanente", value=f"{minutes:02d}:{seconds:02d}")
+
+
+def exam_panel(app, cert):
+    """
+    Interfaccia della simulazione d'esame: configurazione, svolgimento con conto alla rovescia e voto finale.
+    """
+    exam = st.session_state.exam
+
+    if exam is None or exam.cert != cert:
+        st.markdown("### Simulazione d'esame")
+        available = app.get_available_questions_count()
+        if available == 0:
+            st.warning("Nessuna domanda disponibile per il topic selezionato.")
+            return
+
+        col1, col2 = st.columns(2)
+        with col1:
+            num_questions = st.number_input(
+                "Numero di domande:", min_value=1, max_value=available,
+                value=min(config.get('exam_questions', 50), available)
+            )
+        with col2:
+            duration = st.number_input("Durata (minuti):", min_value=1, max_value=600, value=config.get('exam_minutes', 60))
+
+        if st.button("Inizia esame", key="start_exam_button"):
+            st.session_state.exam = app.start_exam(cert, int(num_questions), int(duration))
+            st.rerun()
+        return
+
+    if not exam.is_finished() and exam.remaining_seconds() <= 0:
+        exam.finish(app.check_answer)
+
+    if exam.is_finished():
+        results = exam.results
+        if not exam.recorded:
+            for position, row in enumerate(results['rows']):
+                record_attempt(cert, exam.question(position), row['Risposta data'], row['Corretta'])
+            exam.recorded = True
+        st.markdown("### Esito della simulazione")
+        col1, col2, col3 = st.columns(3)
+        col1.metric(label="Punteggio", value=f"{results['correct']}/{results['total']}")
+        col2.metric(label="Percentuale", value=f"{results['score'] * 100:.2f}%")
+        minutes, seconds = divmod(int(results['elapsed_seconds']), 60)
+        col3.metric(label="Tempo impiegato", value=f"{minutes:02d}:{seconds:02d}")
+
+        if results['passed']:
+            st.success(f"Esame superato! (soglia {exam.pass_threshold * 100:.0f}%)")
+        else:
+            st.error(f"Esame non superato. (soglia {exam.pass_threshold * 100:.0f}%)")
+
+        st.dataframe(pd.DataFrame(results['rows']), use_container_width=True, hide_index=True)
+
+        if st.button("Nuova simulazione", key="new_exam_button"):
+            st.session_state.exam = None
+            st.rerun()
+        return
+
+    exam_question_panel(app, exam)
+
+
+@st.fragment
+def exam_question_panel(app, exam):
+    """
+    Domanda corrente della simulazione d'esame. È un fragment: lo spostamento tra le domande
+    riesegue solo questo pannello, e le immagini sono già state scaricate all'avvio dell'esame.
+    """
+    col1, col2 = st.columns([3,1], gap="large")
+
+    with col1:
+        content = exam.image()
+        if isinstance(content, str):
+            show_image_url(content)
+        elif content:
+            st.image(io.BytesIO(content), use_container_width=True)
+        else:
+            st.warning("Immagine non trovata per questa domanda")
+
+    with col2:
+        exam_countdown(exam)
+        st.markdown(f"### Domanda {exam.current + 1} di {len(exam)}")
+        answered = sum(1 for answer in exam.answers.values() if answer)
+        st.progress(answered / len(exam), text=f"Risposte date: {answered}/{len(exam)}")
+
+        exam.answers[exam.current] = st.text_input(
+            "Risposta:",
+            value=exam.answers.get(exam.current, ""),
+            key=f"exam_answer_{exam.started_at}_{exam.current}"
+        )
+
+        col2a, col2b = st.columns(2)
+        with col2a:
+            if st.button("Precedente", use_container_width=True, key="exam_prev_button", disabled=exam.current == 0):
+                exam.current -= 1
+                st.rerun(scope="fragment")
+        with col2b:
+            if st.button("Successiva", use_container_width=True, key="exam_next_button", disabled=exam.current == len(exam) - 1):
+                exam.current += 1
+                st.rerun(scope="fragment")
+
+        if st.button("Termina esame", use_container_width=True, key="exam_finish_button"):
+            exam.finish(app.check_answer)
+            st.rerun()
+
+
+@st.fragment
+def search_sidebar():
+    """
+    Ricerca testuale nelle domande di tutte le certificazioni, nella barra laterale.
+    È un fragment: la digitazione non riesegue la pagina; solo "Vai" la riesegue per aprire la domanda.
+    Va chiamata dentro `with st.sidebar:` (un fragment non può aprire la barra laterale al suo interno).
+    """
+    st.markdown("### Cerca nelle domande")
+    query = st.text_input("Testo da cercare:", key="search_query", placeholder="es. lakehouse shortcut")
+    if not query:
+        return
+
+    results = get_search_index().search(query, limit=config.get('search_results', 20))
+    if not results:
+        st.info("Nessun risultato.")
+        return
+
+    for position, result in enumerate(results):
+        st.markdown(f"**{result['cert']}** - Topic {result['topic']}, domanda {result['numero']}")
+        if result['snippet']:
+            st.caption(result['snippet'])
+        if st.button("Vai alla domanda", key=f"search_result_{position}"):
+            st.session_state.jump_to = (result['cert'], result['label'], result['topic'], result['numero'])
+            st.session_state.show_guide = False
+            st.rerun()
+
+
+def resolve_search_hit(bank, label, topic, number):
+    """
+    Restituisce l'indice nel database `bank` della domanda trovata dalla ricerca, o None se non c'è.
+    L'indice di ricerca è del processo e può riferirsi a un'altra versione del catalogo: la riga `label`
+    vale solo se ha lo stesso Topic e Numero, altrimenti la domanda viene cercata per Topic e Numero.
+    """
+    if bank is None or bank.empty:
+        return None
+    if label in bank.index and (int(bank.at[label, 'Topic']), int(bank.at[label, 'Numero'])) == (topic, number):
+        return label
+    matches = bank.index[((bank['Topic'] == topic) & (bank['Numero'] == number)).to_numpy()]
+    return matches[0] if len(matches) else None
+
+
+@st.fragment
+def quiz_panel(app, cert):
+    """
+    Pannello della domanda: immagine, statistiche, risposta e spiegazione.
+    È un fragment, quindi "Invia" e "Prossima" rieseguono solo questo pannello e non l'intera pagina
+    (elenco delle certificazioni, caricamento del database, selettori, pulsanti in alto).
+    """
+    col1, col2 = st.columns([3,1], gap="large")
+    
+    with col1:
+        if st.session_state.current_question is not None:
+            question_image(app, cert, st.session_state.current_question)
+
+    with col2:
+        st.markdown("### Statistiche Quiz")
+        
+        stats_col1, stats_col2 = st.columns(2)
+        
+        with stats_col1:
+            percentage = (app.correct_answers / app.total_questions) * 100 if app.total_questions > 0 else 0
+            st.metric(label="Punteggio", value=f"{app.correct_answers}/{app.total_questions}")
+            st.write(f"Domande disponibili: {app.get_available_questions_count()}")
+
+        with stats_col2:
+            st.metric(label="Percentuale", value=f"{percentage:.2f}%") 
+
+        st.markdown("---")  # Linea di separazione
+
+        user_answer = st.text_input("Risposta:", value=st.session_state.user_answer, key="answer_input")
+        
+        col2a, col2b = st.columns(2)
+        with col2a:
+            submit_button = st.button("Invia", use_container_width=True, key="submit_button", disabled=st.session_state.show_explanation)
+            if submit_button:
+                is_correct = app.check_answer(user_answer, str(st.session_state.current_question['Risposta Esatta']))
+                app.record_answer(st.session_state.current_question, is_correct)
+                record_attempt(cert, st.session_state.current_question, user_answer, is_correct)
+                st.session_state.user_answer = user_answer
+                st.session_state.show_explanation = True
+                st.rerun(scope="fragment")
+
+        with col2b:
+            next_button = st.button("Prossima", use_container_width=True, key="next_button", disabled=not st.session_state.show_explanation)
+            if next_button:
+                st.session_state.current_question = app.get_random_question()
+                st.session_state.user_answer = ""
+                st.session_state.show_explanation = False
+                st.rerun(scope="fragment")
+
+        if st.session_state.show_explanation:
+            question_explanation(app, st.session_state.current_question, st.session_state.cert_config)
+
+
+def question_image(app, cert, question):
+    """
+    Mostra l'immagine della domanda di `cert`: tramite URL diretto se disponibile, altrimenti con i byte scaricati dal server.
+    """
+    image_url = app.get_image_url(st.session_state.get('blob_cache'), cert, question['Topic'], question['Numero'])
+    if image_url:
+        # Il browser scarica l'immagine direttamente dallo storage, senza passare dal server
+        show_image_url(image_url)
+        return
+
+    # Mostra un messaggio durante il caricamento dell'immagine
+    with st.spinner("Caricamento immagine..."):
+        image_path = app.find_image_file(cert, question['Topic'], question['Numero'])
+
+    if image_path:
+        try:
+            # I byte vengono passati senza decodificarli con PIL: a parità di contenuto Streamlit
+            # riusa lo stesso URL del media, quindi il browser non riscarica l'immagine
+            with st.container():
+                st.image(image_path, use_container_width=True)
+        except Exception as e:
+            st.error(f"Errore nel caricamento dell'immagine: {e}")
+    else:
+        st.warning("Immagine non trovata per questa domanda")
+
+
+def question_explanation(app, question, cert_config):
+    """
+    Mostra l'esito della risposta data, la spiegazione e i link all'Agent AI e alla domanda.
+    """
+    if app.check_answer(st.session_state.user_answer, str(question['Risposta Esatta'])):
+        st.success("Risposta corretta!")
+    else:
+        st.error(f"Risposta errata. La risposta corretta era {question['Risposta Esatta']}")
+
+    st.write(f"**Spiegazione**: {question['Commento']}")
+
+    # Usa l'URL specifico della certificazione per il link nella spiegazione
+    agent_url = cert_config.get('ai_agent_url', config.get('default_ai_agent_url', ""))
+    # Modificato per usare st.markdown invece di st.write per garantire la compatibilità
+    st.markdown(f"Ancora dubbi? <a href='{agent_url}' target='_blank'>Chiedi all'Agent AI</a>", unsafe_allow_html=True)
+
+    if pd.notna(question['Link']):
+        st.markdown(f"<a href='{question['Link']}' target='_blank'>Link alla domanda</a>", unsafe_allow_html=True)
+
+
+def enter_mixed_mode(app):
+    """
+    Passa alla modalità mista conservando lo stato di studio della certificazione lasciata.
+    """
+    previous = st.session_state.current_cert
+    if previous and previous != MIXED_CERT:
+        app.save_progress(previous, st.session_state.current_topic, st.session_state.current_question)
+    app.cancel_image_warmup()
+    repin_catalog(app)
+
+    st.session_state.current_cert = MIXED_CERT
+    st.session_state.current_topic = None
+    st.session_state.current_question = None
+    st.session_state.show_explanation = False
+    st.session_state.user_answer = ""
+    st.session_state.exam = None
+    st.session_state.cert_config = {}
+    app.mixed_pool = None
+
+
+def mixed_selector(app, available_certs):
+    """
+    Scelta delle certificazioni e dei topic della modalità mista. Ricostruisce l'insieme delle domande
+    solo quando la scelta cambia.
+    """
+    certs = st.multiselect("Certificazioni:", available_certs, key="mixed_certs")
+    banks = st.session_state.blob_cache['cert_databases'] if 'blob_cache' in st.session_state else {}
+    topic_options = {}
+    for cert in certs:
+        if cert in banks:
+            for topic in sorted(banks[cert]['Topic'].unique()):
+                if topic != 0:
+                    topic_options[f"{cert} - Topic {topic}"] = (cert, int(topic))
+    chosen = st.multiselect(
+        "Topic:", list(topic_options), key="mixed_topics",
+        help="Se non scegli nessun topic di una certificazione vengono usate tutte le sue domande."
+    )
+
+    selections = {cert: [] for cert in certs if cert in banks}
+    for option in chosen:
+        cert, topic = topic_options[option]
+        selections[cert].append(topic)
+
+    pool = app.mixed_pool
+    normalized = {cert: tuple(sorted(topics)) for cert, topics in selections.items()}
+    if pool is None or pool.banks is not banks or pool.selections != normalized:
+        app.mixed_pool = MixedPool(banks, selections)
+        app.mixed_pool.next_question()
+        st.session_state.show_explanation = False
+        st.session_state.user_answer = ""
+
+
+@st.fragment
+def mixed_panel(app):
+    """
+    Pannello della modalità mista: come quello del quiz, ma ogni domanda porta con sé la sua certificazione.
+    """
+    pool = app.mixed_pool
+    if pool is None or not len(pool):
+        st.info("👆 Seleziona una o più certificazioni (e, se vuoi, alcuni topic) per esercitarti su domande miste.")
+        return
+    cert, question = pool.question()
+
+    col1, col2 = st.columns([3,1], gap="large")
+
+    with col1:
+        st.caption(cert)
+        question_image(app, cert, question)
+
+    with col2:
+        st.markdown("### Statistiche Quiz")
+
+        stats_col1, stats_col2 = st.columns(2)
+
+        with stats_col1:
+            percentage = (pool.correct_answers / pool.total_questions) * 100 if pool.total_questions > 0 else 0
+            st.metric(label="Punteggio", value=f"{pool.correct_answers}/{pool.total_questions}")
+            st.write(f"Domande disponibili: {len(pool)}")
+
+        with stats_col2:
+            st.metric(label="Percentuale", value=f"{percentage:.2f}%")
+
+        st.caption(" · ".join(f"{name}: {count}" for name, count in pool.counts.items()))
+        st.markdown("---")  # Linea di separazione
+
+        user_answer = st.text_input("Risposta:", value=st.session_state.user_answer, key="mixed_answer_input")
+
+        col2a, col2b = st.columns(2)
+        with col2a:
+            if st.button("Invia", use_container_width=True, key="mixed_submit_button", disabled=st.session_state.show_explanation):
+                is_correct = app.check_answer(user_answer, str(question['Risposta Esatta']))
+                pool.record_answer(is_correct)
+                record_attempt(cert, question, user_answer, is_correct)
+                st.session_state.user_answer = user_answer
+                st.session_state.show_explanation = True
+                st.rerun(scope="fragment")
+
+        with col2b:
+            if st.button("Prossima", use_container_width=True, key="mixed_next_button", disabled=not st.session_state.show_explanation):
+                pool.next_question()
+                st.session_state.user_answer = ""
+                st.session_state.show_explanation = False
+                st.rerun(scope="fragment")
+
+        if st.session_state.show_explanation:
+            question_explanation(app, question, app.load_cert_config(cert))
+
+
+def switch_certification(app, cert):
+    """
+    Passa a un'altra certificazione conservando lo stato di studio di quella lasciata
+    e ripristinando quello di `cert`, se l'utente l'aveva già aperta nella sessione.
+    """
+    previous = st.session_state.current_cert
+    if previous and previous != MIXED_CERT:
+        app.save_progress(previous, st.session_state.current_topic, st.session_state.current_question)
+
+    # Le immagini del topic della certificazione lasciata non servono più
+    app.cancel_image_warmup()
+
+    # Nessuna domanda in corso: la sessione può passare all'ultima versione del catalogo
+    repin_catalog(app)
+
+    st.session_state.current_cert = cert
+    st.session_state.current_topic = None
+    st.session_state.current_question = None
+    st.session_state.show_explanation = False
+    st.session_state.user_answer = ""
+    st.session_state.exam = None
+    
+    # Carica la configurazione specifica della certificazione
+    st.session_state.cert_config = app.load_cert_config(cert)
+
+    app.load_certification(cert)
+    progress = app.restore_progress(cert)
+    if progress is None:
+        # Prima apertura nella sessione (anche dopo un aggiornamento della pagina): stato ricostruito dai tentativi
+        try:
+            app.restore_attempts(get_attempts().read_user(get_user_id(), cert))
+        except Exception as e:
+            print(f"Impossibile rileggere i tentativi di {cert}: {e}")
+    else:
+        st.session_state.current_topic = progress.topic
+        st.session_state.current_question = app.question_by_label(progress.question_label)
+        if progress.topic is not None and st.session_state.current_question is None:
+            st.session_state.current_question = app.get_random_question()
+        if progress.topic is not None:
+            app.start_image_warmup(st.session_state.get('blob_cache'), cert)
+
+
 def main():
     """
     Funzione principale che gestisce l'interfaccia utente e il flusso dell'applicazione.
@@ -420,13 +1574,24 @@ def main():
     st.set_page_config(page_title="TRR Tool Certificazioni", layout="wide", page_icon=resource_path("static/icon.ico"))
     
     # Non richiamare load_config() qui, usa la variabile globale config
+
+    view = st.query_params.get("view")
+    if view == "memoria":
+        memory_view()
+        return
+    if view == "statistiche":
+        analytics_view()
+        return
+    if view == "caricamento":
+        upload_view()
+        return
     
     if 'app' not in st.session_state:
         st.session_state.app = CertificationQuizApp(config)
     app = st.session_state.app
     
     # Inizializza la cache dei blob all'avvio
-    if app.blob_service_client and app.container_name and 'blob_cache' not in st.session_state:
+    if app.storage and 'blob_cache' not in st.session_state:
         with st.spinner("Inizializzazione della cache dei blob... Questo potrebbe richiedere qualche minuto."):
             cache_initialized = initialize_blob_cache(app)
             if not cache_initialized:
@@ -446,9 +1611,43 @@ def main():
         st.session_state.show_guide = False
     if 'cert_config' not in st.session_state:
         st.session_state.cert_config = {}
+    if 'exam' not in st.session_state:
+        st.session_state.exam = None
+    if 'jump_to' not in st.session_state:
+        st.session_state.jump_to = None
+
+    # Registra gli oggetti in memoria della sessione per la vista ?view=memoria
+    blob_cache = st.session_state.get('blob_cache') or {}
+    memory_stats.register_session(get_session_id(), {
+        'blob_cache': blob_cache,
+        'blob_map': blob_cache.get('blob_map'),
+        'cert_databases': blob_cache.get('cert_databases'),
+        'image_content_cache': blob_cache.get('image_content_cache'),
+        'current_question': st.session_state.current_question,
+        'app': app
+    })
 
     st.title("TRR Tool Certificazioni")
 
+    with st.sidebar:
+        search_sidebar()
+
+    # Apertura di una domanda dai risultati della ricerca: esce dalla simulazione d'esame
+    # e seleziona la certificazione della domanda. La richiesta viene consumata subito, anche se non è valida
+    jump_to = st.session_state.jump_to
+    st.session_state.jump_to = None
+    if jump_to:
+        jump_cert = jump_to[0]
+        # L'indice di ricerca è del processo: la domanda può mancare nella versione del catalogo della sessione
+        pinned_bank = (st.session_state.get('blob_cache') or {}).get('cert_databases', {}).get(jump_cert)
+        if resolve_search_hit(pinned_bank, *jump_to[1:]) is None:
+            st.warning("La domanda scelta non è disponibile nella versione del catalogo in uso.")
+            jump_to = None
+        else:
+            st.session_state.exam_mode = False
+            if jump_cert != st.session_state.current_cert:
+                switch_certification(app, jump_cert)
+
     col1, col2 = st.columns([3,1], gap="large")
 
     with col1:
@@ -461,10 +1660,13 @@ def main():
             else:
                 # Aggiungiamo un'opzione vuota all'inizio della lista
                 cert_options = [""] + available_certs
+                # Con più certificazioni si possono mescolare le loro domande
+                if len(available_certs) > 1:
+                    cert_options.append(MIXED_CERT)
                 selected_index = 0  # Imposta l'indice di default a 0 (opzione vuota)
                 
                 # Se già c'è una selezione esistente, trova il suo indice
-                if st.session_state.current_cert in available_certs:
+                if st.session_state.current_cert in cert_options[1:]:
                     selected_index = cert_options.index(st.session_state.current_cert)
                 
                 cert = st.selectbox(
@@ -476,29 +1678,52 @@ def main():
         
         # Visualizza i topic solo se c'è una certificazione selezionata
         topic = None
-        if cert:
+        if cert == MIXED_CERT:
+            if st.session_state.current_cert != MIXED_CERT:
+                enter_mixed_mode(app)
+            with col1b:
+                mixed_selector(app, available_certs)
+        elif cert:
             if cert != st.session_state.current_cert:
-                app.reset_score()
-                st.session_state.current_cert = cert
-                st.session_state.current_topic = None
-                st.session_state.current_question = None  # Reset della domanda corrente
-                
-                # Carica la configurazione specifica della certificazione
-                st.session_state.cert_config = app.load_cert_config(cert)
+                switch_certification(app, cert)
             
             # Mostra un messaggio durante il caricamento
             with st.spinner(f"Caricamento della certificazione {cert}..."):
                 topics = app.load_certification(cert)
             
             with col1b:
-                topic = st.selectbox("Seleziona Topic:", ["Tutti"] + [f"Topic {t}" for t in topics if t != 0])
+                topic_options = ["Tutti"] + [f"Topic {t}" for t in topics if t != 0]
+                # Tornando a una certificazione già studiata viene riproposto il topic che si stava usando
+                topic_index = topic_options.index(st.session_state.current_topic) if st.session_state.current_topic in topic_options else 0
+                topic = st.selectbox("Seleziona Topic:", topic_options, index=topic_index)
             
+            study_mode = st.radio(
+                "Modalità di studio:",
+                [STUDY_MODE_RANDOM, STUDY_MODE_ADAPTIVE],
+                index=[STUDY_MODE_RANDOM, STUDY_MODE_ADAPTIVE].index(app.study_mode),
+                horizontal=True,
+                help="In modalità adattiva le domande sbagliate vengono riproposte più spesso."
+            )
+            app.set_study_mode(study_mode)
+            st.toggle("Simulazione d'esame", key="exam_mode", help="Un insieme fisso di domande con tempo limite e voto finale.")
+
             if topic != st.session_state.current_topic:
                 app.filter_questions(topic)
                 st.session_state.current_topic = topic
                 st.session_state.current_question = app.get_random_question()
                 st.session_state.show_explanation = False
                 st.session_state.user_answer = ""
+                # Le immagini delle prossime domande del topic vengono scaricate in background
+                app.start_image_warmup(st.session_state.get('blob_cache'), cert)
+
+            # Mostra la domanda scelta dai risultati della ricerca
+            if jump_to and jump_to[0] == cert:
+                # Il cambio di certificazione può aver agganciato una versione più recente del catalogo
+                label = resolve_search_hit(app.df, *jump_to[1:])
+                if label is not None:
+                    st.session_state.current_question = app.df.loc[label]
+                    st.session_state.show_explanation = False
+                    st.session_state.user_answer = ""
 
     with col2:
         col2a, col2b = st.columns(2)
@@ -557,82 +1782,12 @@ def main():
         
         Per informazioni più dettagliate, clicca su "Guida all'utilizzo" in alto a destra.
         """)
+    elif cert == MIXED_CERT:
+        mixed_panel(app)
+    elif st.session_state.get('exam_mode'):
+        exam_panel(app, cert)
     else:
-        col1, col2 = st.columns([3,1], gap="large")
-        
-        with col1:
-            if st.session_state.current_question is not None:
-                # Mostra un messaggio durante il caricamento dell'immagine
-                with st.spinner("Caricamento immagine..."):
-                    image_path = app.find_image_file(cert, st.session_state.current_question['Topic'], st.session_state.current_question['Numero'])
-                
-                if image_path:
-                    try:
-                        if isinstance(image_path, io.BytesIO):
-                            image = Image.open(image_path)
-                        else:
-                            image = Image.open(image_path)
-                        
-                        # Centra l'immagine usando le colonne di Streamlit
-                        with st.container():
-                            st.image(image, use_container_width=True)
-                    except Exception as e:
-                        st.error(f"Errore nel caricamento dell'immagine: {e}")
-                else:
-                    st.warning("Immagine non trovata per questa domanda")
-
-        with col2:
-            st.markdown("### Statistiche Quiz")
-            
-            stats_col1, stats_col2 = st.columns(2)
-            
-            with stats_col1:
-                percentage = (app.correct_answers / app.total_questions) * 100 if app.total_questions > 0 else 0
-                st.metric(label="Punteggio", value=f"{app.correct_answers}/{app.total_questions}")
-                st.write(f"Domande disponibili: {app.get_available_questions_count()}")
-
-            with stats_col2:
-                st.metric(label="Percentuale", value=f"{percentage:.2f}%") 
-
-            st.markdown("---")  # Linea di separazione
-
-            user_answer = st.text_input("Risposta:", value=st.session_state.user_answer, key="answer_input")
-            
-            col2a, col2b = st.columns(2)
-            with col2a:
-                submit_button = st.button("Invia", use_container_width=True, key="submit_button", disabled=st.session_state.show_explanation)
-                if submit_button:
-                    is_correct = app.check_answer(user_answer, str(st.session_state.current_question['Risposta Esatta']))
-                    if is_correct:
-                        app.correct_answers += 1
-                    app.total_questions += 1
-                    st.session_state.user_answer = user_answer
-                    st.session_state.show_explanation = True
-                    st.rerun()
-
-            with col2b:
-                next_button = st.button("Prossima", use_container_width=True, key="next_button", disabled=not st.session_state.show_explanation)
-                if next_button:
-                    st.session_state.current_question = app.get_random_question()
-                    st.session_state.user_answer = ""
-                    st.session_state.show_explanation = False
-                    st.rerun()
-
-            if st.session_state.show_explanation:
-                if app.check_answer(st.session_state.user_answer, str(st.session_state.current_question['Risposta Esatta'])):
-                    st.success("Risposta corretta!")
-                else:
-                    st.error(f"Risposta errata. La risposta corretta era {st.session_state.current_question['Risposta Esatta']}")
-                
-                st.write(f"**Spiegazione**: {st.session_state.current_question['Commento']}")
-                
-                # Usa l'URL specifico della certificazione per il link nella spiegazione
-                agent_url = st.session_state.cert_config.get('ai_agent_url', config.get('default_ai_agent_url', ""))
-                # Modificato per usare st.markdown invece di st.write per garantire la compatibilità
-                st.markdown(f"Ancora dubbi? <a href='{agent_url}' target='_blank'>Chiedi all'Agent AI</a>", unsafe_allow_html=True)
-
-                if pd.notna(st.session_state.current_question['Link']):
-                    st.markdown(f"<a href='{st.session_state.current_question['Link']}' target='_blank'>Link alla domanda</a>", unsafe_allow_html=True)
+        quiz_panel(app, cert)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
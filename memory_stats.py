@@ -0,0 +1,237 @@
+"""
+Misura dell'occupazione di memoria delle sessioni Streamlit e del processo.
+
+Ogni sessione registra a ogni esecuzione i riferimenti agli oggetti che mantiene in memoria
+(cache dei blob, DataFrame, immagini, domanda corrente); la pagina di amministrazione li misura
+su richiesta. Un campionamento periodico in background conserva l'andamento nel tempo.
+
+Gli oggetti sono tenuti con riferimenti deboli: la misura non deve allungare la vita dell'applicazione
+della sessione (il cui rilascio sgancia la versione del catalogo) né delle versioni del catalogo già rilasciate.
+"""
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+import pandas as pd
+
+# Intervallo minimo tra due campioni della serie storica
+SAMPLE_INTERVAL_SECONDS = 60
+# Numero massimo di campioni conservati (24 ore con l'intervallo di default)
+MAX_SAMPLES = 24 * 60
+# Profondità massima esplorata da deep_sizeof
+MAX_DEPTH = 12
+
+_lock = threading.Lock()
+# session_id -> {'objects': {nome: riferimento}, 'last_seen': timestamp}
+_sessions = {}
+_samples = deque(maxlen=MAX_SAMPLES)
+_last_sample_at = 0.0
+_sampling = False
+
+
+def deep_sizeof(obj, seen=None, max_depth=MAX_DEPTH, skipped=None):
+    """
+    Stima i byte occupati da un oggetto e da tutto ciò che contiene, fino a `max_depth` livelli.
+    Gli oggetti già contati in `seen` non vengono contati di nuovo, così gli oggetti condivisi pesano una volta sola.
+    La visita è iterativa: strutture profonde o cicliche non esauriscono lo stack.
+    I contenitori sono letti da una copia, perché altri thread (preriscaldamento, prefetch, sessioni) possono
+    modificarli durante la misura; quelli che cambiano proprio mentre vengono copiati non sono contati
+    e, se è indicata la lista `skipped`, vi vengono aggiunti.
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    pending = [(obj, 0)]
+    while pending:
+        obj, depth = pending.pop()
+        if obj is None or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+
+        try:
+            if isinstance(obj, pd.DataFrame):
+                size += int(obj.memory_usage(index=True, deep=True).sum())
+                continue
+            if isinstance(obj, pd.Series):
+                size += int(obj.memory_usage(index=True, deep=True))
+                continue
+            # Le viste non possiedono i byte a cui puntano
+            if isinstance(obj, memoryview) or depth >= max_depth:
+                size += sys.getsizeof(obj)
+                continue
+
+            if isinstance(obj, dict):
+                children = [item for pair in list(obj.items()) for item in pair]
+            elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+                children = list(obj)
+            elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+                children = [vars(obj)]
+            else:
+                children = []
+            size += sys.getsizeof(obj)
+        except RuntimeError:
+            # "dictionary/set changed size during iteration": l'oggetto viene saltato, la misura prosegue
+            if skipped is not None:
+                skipped.append(obj)
+            continue
+        pending.extend((child, depth + 1) for child in children)
+    return size
+
+
+def _reference(obj):
+    # Gli oggetti che non ammettono riferimenti deboli (es. dict vuoti, numeri) sono tenuti così come sono
+    if obj is None:
+        return None
+    try:
+        return weakref.ref(obj)
+    except TypeError:
+        return lambda: obj
+
+
+def _resolve(references):
+    """
+    Restituisce gli oggetti ancora in vita tra quelli registrati.
+    """
+    objects = {}
+    for name, reference in references.items():
+        obj = reference() if reference is not None else None
+        if obj is not None:
+            objects[name] = obj
+    return objects
+
+
+def get_rss_bytes():
+    """
+    Restituisce la memoria residente (RSS) del processo, o None se non è misurabile.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/status', 'r') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # Su Linux ru_maxrss è in KB ed è il picco, non il valore corrente
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+
+def _is_active_session(session_id):
+    try:
+        from streamlit.runtime import Runtime
+        return Runtime.instance().is_active_session(session_id)
+    except Exception:
+        return True
+
+
+def register_session(session_id, objects):
+    """
+    Registra (o aggiorna) gli oggetti mantenuti in memoria da una sessione.
+    `objects` è un dizionario nome -> oggetto; gli oggetti sono solo letti, mai modificati,
+    e vengono tenuti con riferimenti deboli quando possibile.
+    Rimuove le sessioni terminate e, se è passato abbastanza tempo, avvia un nuovo campionamento.
+    """
+    global _sampling
+    now = time.time()
+    with _lock:
+        _sessions[session_id] = {
+            'objects': {name: _reference(obj) for name, obj in objects.items()},
+            'last_seen': now
+        }
+        for other_id in list(_sessions):
+            if other_id != session_id and not _is_active_session(other_id):
+                del _sessions[other_id]
+        start_sampling = not _sampling and now - _last_sample_at >= SAMPLE_INTERVAL_SECONDS
+        if start_sampling:
+            _sampling = True
+    if start_sampling:
+        threading.Thread(target=_take_sample, daemon=True).start()
+
+
+def session_report():
+    """
+    Restituisce un DataFrame con i byte occupati da ogni categoria di oggetti, per sessione.
+    """
+    with _lock:
+        sessions = {session_id: dict(info) for session_id, info in _sessions.items()}
+
+    rows = []
+    for session_id, info in sessions.items():
+        row = {'sessione': session_id[:8], 'ultima attività': pd.Timestamp(info['last_seen'], unit='s')}
+        for name, obj in _resolve(info['objects']).items():
+            row[name] = deep_sizeof(obj)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def process_report():
+    """
+    Restituisce i totali di processo: per ogni categoria i byte degli oggetti distinti
+    (un oggetto condiviso da più sessioni è contato una volta) e la somma per sessione,
+    oltre al numero di oggetti saltati perché modificati durante la misura.
+    """
+    with _lock:
+        sessions = [_resolve(info['objects']) for info in _sessions.values()]
+
+    distinct, summed = {}, {}
+    seen_by_name = {}
+    skipped = []
+    for objects in sessions:
+        for name, obj in objects.items():
+            seen = seen_by_name.setdefault(name, set())
+            distinct[name] = distinct.get(name, 0) + deep_sizeof(obj, seen, skipped=skipped)
+            summed[name] = summed.get(name, 0) + deep_sizeof(obj)
+
+    return {
+        'rss': get_rss_bytes(),
+        'sessions': len(sessions),
+        'distinct': distinct,
+        'summed': summed,
+        'skipped': len(skipped)
+    }
+
+
+def _take_sample():
+    global _last_sample_at, _sampling
+    try:
+        report = process_report()
+        sample = {'istante': pd.Timestamp.now(), 'rss': report['rss'], 'sessioni': report['sessions']}
+        sample.update(report['distinct'])
+        with _lock:
+            _samples.append(sample)
+    finally:
+        with _lock:
+            _last_sample_at = time.time()
+            _sampling = False
+
+
+def history():
+    """
+    Restituisce la serie storica dei campioni come DataFrame indicizzato per istante.
+    """
+    with _lock:
+        samples = list(_samples)
+    if not samples:
+        return pd.DataFrame()
+    return pd.DataFrame(samples).set_index('istante')
+
+
+def format_bytes(size):
+    """
+    Formatta un numero di byte in forma leggibile (KB, MB, GB).
+    """
+    if size is None:
+        return "n/d"
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{int(size)} B"
+        size /= 1024
@@ -0,0 +1,81 @@
+"""
+Insieme di domande di più certificazioni per la modalità mista.
+
+Le domande non vengono copiate in un unico DataFrame (pd.concat): l'insieme è un indice composto
+di coppie (certificazione, posizione della riga) sui database condivisi del catalogo, tenuto in due
+liste parallele. Estrazione, conteggi e ricerca dell'immagine costano O(1) per domanda qualunque sia
+il numero di certificazioni mescolate; la memoria occupata è di due interi per domanda.
+
+Le domande sono proposte seguendo una permutazione casuale dell'insieme, come nella modalità casuale:
+ogni domanda torna solo dopo che sono state viste tutte le altre.
+"""
+import random
+
+
+class MixedPool:
+    def __init__(self, banks, selections):
+        """
+        `banks` associa a ogni certificazione il suo database; `selections` associa a ogni certificazione
+        scelta l'elenco dei topic da includere (vuoto o None per tutti).
+        """
+        self.banks = banks
+        self.selections = {cert: tuple(sorted(topics or ())) for cert, topics in selections.items()}
+        self.certs = []       # codice -> certificazione
+        self._codes = []      # per ogni voce, il codice della certificazione
+        self._positions = []  # per ogni voce, la posizione della riga nel database della certificazione
+        self.counts = {}
+        for cert, topics in self.selections.items():
+            df = banks.get(cert)
+            if df is None or df.empty:
+                continue
+            mask = df['Topic'].isin(topics) if topics else df['Topic'].notna()
+            positions = mask.to_numpy().nonzero()[0].tolist()
+            if not positions:
+                continue
+            code = len(self.certs)
+            self.certs.append(cert)
+            self._codes.extend([code] * len(positions))
+            self._positions.extend(positions)
+            self.counts[cert] = len(positions)
+
+        self._order = []
+        self.current = None
+        self.correct_answers = 0
+        self.total_questions = 0
+
+    def __len__(self):
+        return len(self._positions)
+
+    def entry(self, index):
+        """
+        Restituisce la coppia (certificazione, posizione della riga) della voce `index`.
+        """
+        return self.certs[self._codes[index]], self._positions[index]
+
+    def question(self, index=None):
+        """
+        Restituisce la certificazione e la domanda della voce indicata (di default quella corrente).
+        """
+        index = self.current if index is None else index
+        if index is None:
+            return None, None
+        cert, position = self.entry(index)
+        return cert, self.banks[cert].iloc[position]
+
+    def next_question(self, rng=random):
+        """
+        Passa alla prossima domanda della permutazione, rimescolando quando sono state viste tutte.
+        """
+        if not self._positions:
+            self.current = None
+        else:
+            if not self._order:
+                self._order = list(range(len(self._positions)))
+                rng.shuffle(self._order)
+            self.current = self._order.pop()
+        return self.question()
+
+    def record_answer(self, is_correct):
+        if is_correct:
+            self.correct_answers += 1
+        self.total_questions += 1
@@ -0,0 +1,124 @@
+"""
+Pre-scarica le discussioni esterne collegate a tutte le domande di tutte le certificazioni.
+
+Percorre la colonna 'Link' di ogni database.xlsx (dal container Azure, da un pacchetto offline
+o da una cartella locale con la stessa struttura di data/), scarica le pagine della fonte esterna con un pool di worker
+a frequenza limitata e salva i frammenti estratti nell'archivio persistente letto dall'applicazione.
+In questo modo la visualizzazione della spiegazione non attende mai il sito esterno.
+
+Esempio:
+    python prefetch_links.py --workers 4 --rate 2
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+import external_content
+from main import CertificationQuizApp, config
+
+
+class RateLimiter:
+    """
+    Limita il numero di richieste al secondo condiviso tra tutti i worker.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def iter_question_banks(data_path):
+    """
+    Restituisce le coppie (certificazione, DataFrame) di tutte le certificazioni disponibili.
+    """
+    app = CertificationQuizApp(dict(config, data_path=data_path))
+    if not app.storage:
+        raise RuntimeError("Impossibile accedere ai dati a partire da data_path")
+    for blob in app.storage.list_blobs("data/"):
+        parts = blob.name.split('/')
+        if len(parts) == 3 and parts[2] == "database.xlsx":
+            yield parts[1], app.storage.read_bank(blob.name)
+
+
+def collect_links(data_path):
+    """
+    Raccoglie gli URL distinti della fonte esterna presenti nella colonna 'Link'.
+    """
+    links = set()
+    for cert, df in iter_question_banks(data_path):
+        if 'Link' not in df.columns:
+            continue
+        cert_links = {link.strip() for link in df['Link'].dropna().astype(str)}
+        cert_links = {link for link in cert_links if external_content.is_supported_link(link)}
+        print(f"{cert}: {len(cert_links)} link")
+        links.update(cert_links)
+    return sorted(links)
+
+
+def prefetch(links, store, selector, workers, rate):
+    """
+    Scarica i link con al massimo `workers` richieste in parallelo e `rate` richieste al secondo.
+    Restituisce il numero di link salvati e quello dei link falliti.
+    """
+    limiter = RateLimiter(rate)
+    local = threading.local()
+
+    def fetch(url):
+        # Ogni worker riusa la propria sessione HTTP (connessioni keep-alive)
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        limiter.wait()
+        fragment = external_content.fetch_fragment(url, selector, session=local.session)
+        store.put(url, selector, fragment, time.time())
+
+    saved, failed = 0, 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch, url): url for url in links}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                saved += 1
+            except Exception as e:
+                failed += 1
+                print(f"Errore per {futures[future]}: {e}")
+    return saved, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-scarica le discussioni esterne collegate alle domande.")
+    parser.add_argument("--data-path", default=config['data_path'],
+                        help="URL SAS del container, pacchetto .pack o cartella locale con le certificazioni (default: config.json)")
+    parser.add_argument("--cache", default=config.get('external_content_cache', "external_content.sqlite"),
+                        help="File SQLite dell'archivio dei frammenti")
+    parser.add_argument("--selector", default=external_content.DEFAULT_SELECTOR,
+                        help="Selettore CSS del contenuto da estrarre")
+    parser.add_argument("--workers", type=int, default=4, help="Numero di download in parallelo")
+    parser.add_argument("--rate", type=float, default=2.0, help="Richieste al secondo (0 = nessun limite)")
+    parser.add_argument("--max-age", type=float, default=external_content.FRESH_SECONDS,
+                        help="Riscarica solo i link salvati da più di questi secondi")
+    args = parser.parse_args()
+
+    store = external_content.configure_store(args.cache)
+    links = collect_links(args.data_path)
+
+    fetched_at = store.fetched_at_by_url(args.selector)
+    now = time.time()
+    to_fetch = [url for url in links if now - fetched_at.get(url, 0) >= args.max_age]
+    print(f"Link totali: {len(links)}, da scaricare: {len(to_fetch)}")
+
+    saved, failed = prefetch(to_fetch, store, args.selector, args.workers, args.rate)
+    print(f"Salvati: {saved}, falliti: {failed}")
+
+
+if __name__ == "__main__":
+    main()
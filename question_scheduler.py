@@ -0,0 +1,136 @@
+"""
+Estrazione pesata delle domande per la modalità di studio adattiva.
+
+Le domande sbagliate tornano più spesso: ogni domanda ha un peso che cresce a ogni errore e cala
+a ogni risposta corretta. I pesi sono mantenuti in un albero di Fenwick, così sia l'estrazione
+sia l'aggiornamento di un peso costano O(log n) anche con banche da migliaia di domande.
+"""
+import random
+
+
+class FenwickSampler:
+    """
+    Campionamento pesato su un albero di Fenwick (binary indexed tree).
+    Gli elementi sono identificati dalla loro posizione 0..n-1.
+    """
+
+    def __init__(self, weights):
+        self.n = len(weights)
+        self.weights = [float(w) for w in weights]
+        self.tree = [0.0] * (self.n + 1)
+        # Costruzione in O(n): ogni nodo propaga la sua somma al genitore
+        for i in range(1, self.n + 1):
+            self.tree[i] += self.weights[i - 1]
+            parent = i + (i & -i)
+            if parent <= self.n:
+                self.tree[parent] += self.tree[i]
+        self.top_bit = 1 << (self.n.bit_length() - 1) if self.n else 0
+
+    def total(self):
+        """
+        Restituisce la somma di tutti i pesi in O(log n).
+        """
+        total, i = 0.0, self.n
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def update(self, position, weight):
+        """
+        Imposta il peso dell'elemento in `position` in O(log n).
+        """
+        delta = float(weight) - self.weights[position]
+        self.weights[position] = float(weight)
+        i = position + 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def sample(self, rng=random):
+        """
+        Estrae la posizione di un elemento con probabilità proporzionale al suo peso, in O(log n).
+        Restituisce None se tutti i pesi sono nulli.
+        """
+        total = self.total()
+        if total <= 0:
+            return None
+        target = rng.random() * total
+        position, mask = 0, self.top_bit
+        while mask:
+            candidate = position + mask
+            if candidate <= self.n and self.tree[candidate] <= target:
+                position = candidate
+                target -= self.tree[candidate]
+            mask >>= 1
+        # Arrotondamenti: non restituire mai un elemento con peso nullo
+        position = min(position, self.n - 1)
+        while self.weights[position] <= 0 and position > 0:
+            position -= 1
+        return position
+
+
+class AdaptiveScheduler:
+    """
+    Propone le domande con probabilità proporzionale al loro peso.
+    Il peso raddoppia a ogni risposta errata e si dimezza a ogni risposta corretta, entro
+    MIN_WEIGHT e MAX_WEIGHT. La domanda appena proposta non viene ripetuta subito.
+    """
+
+    DEFAULT_WEIGHT = 1.0
+    MIN_WEIGHT = 0.125
+    MAX_WEIGHT = 16.0
+
+    def __init__(self, labels, weights):
+        """
+        `labels` sono gli indici delle domande estraibili (es. filtered_df.index);
+        `weights` è il dizionario indice -> peso condiviso tra i filtri della stessa certificazione.
+        """
+        self.labels = list(labels)
+        self.positions = {label: i for i, label in enumerate(self.labels)}
+        self.weights = weights
+        self.sampler = FenwickSampler([weights.get(label, self.DEFAULT_WEIGHT) for label in self.labels])
+        self.last_label = None
+
+    def pick(self):
+        """
+        Estrae l'indice della prossima domanda, o None se non ci sono domande.
+        """
+        if not self.labels:
+            return None
+
+        excluded = self.positions.get(self.last_label) if len(self.labels) > 1 else None
+        if excluded is not None:
+            self.sampler.update(excluded, 0.0)
+        try:
+            position = self.sampler.sample()
+        finally:
+            if excluded is not None:
+                self.sampler.update(excluded, self.weights.get(self.last_label, self.DEFAULT_WEIGHT))
+
+        if position is None:
+            position = random.randrange(len(self.labels))
+        self.last_label = self.labels[position]
+        return self.last_label
+
+    @classmethod
+    def record_weight(cls, weights, label, is_correct):
+        """
+        Aggiorna nel dizionario `weights` il peso di una domanda in base all'esito della risposta.
+        Restituisce il nuovo peso.
+        """
+        weight = weights.get(label, cls.DEFAULT_WEIGHT)
+        if is_correct:
+            weight = max(weight / 2, cls.MIN_WEIGHT)
+        else:
+            weight = min(weight * 2, cls.MAX_WEIGHT)
+        weights[label] = weight
+        return weight
+
+    def record(self, label, is_correct):
+        """
+        Aggiorna il peso di una domanda in base all'esito della risposta, anche nell'albero di estrazione.
+        """
+        weight = self.record_weight(self.weights, label, is_correct)
+        if label in self.positions:
+            self.sampler.update(self.positions[label], weight)
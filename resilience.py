@@ -0,0 +1,289 @@
+"""
+Controllo della latenza di coda per le chiamate allo storage remoto.
+
+ResilientStorage avvolge un backend (di norma AzureBlobStorage) e applica a ogni operazione:
+
+- una scadenza: oltre il tempo massimo l'operazione è considerata fallita (il thread che la esegue
+  termina per conto suo, ma la pagina non resta bloccata);
+- nuovi tentativi con attesa esponenziale e jitter casuale, solo per gli errori transitori
+  (un blob inesistente non viene mai ritentato);
+- per le immagini, una seconda richiesta "di copertura" se la prima supera il 95° percentile
+  delle latenze osservate: vale la risposta che arriva prima;
+- un circuit breaker: dopo troppe chiamate fallite consecutive (esauriti i tentativi) lo storage viene
+  considerato degradato e le chiamate falliscono subito con StorageUnavailableError, così l'applicazione
+  serve le copie in cache (anche se non aggiornate) invece di attendere. Dopo un intervallo una chiamata
+  di prova verifica il ripristino.
+
+Lo stato (breaker, latenze, ultimi elenchi riusciti) è condiviso da tutte le sessioni del processo.
+Tutti i parametri sono configurabili con la chiave `resilience` di config.json (vedi DEFAULT_SETTINGS).
+"""
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+from storage import Storage, BlobNotFoundError, parse_image_name
+
+# Blob letti per ogni richiesta di elenco (come la pagina massima di Azure Blob Storage)
+LIST_PAGE_SIZE = 5000
+
+DEFAULT_SETTINGS = {
+    'list_timeout': 30.0,          # secondi per l'elenco dei blob
+    'read_timeout': 15.0,          # secondi per il download di un database o di una configurazione
+    'image_timeout': 5.0,          # secondi per il download di un'immagine
+    'retries': 2,                  # tentativi aggiuntivi dopo il primo
+    'backoff_base': 0.2,           # attesa base tra i tentativi (raddoppia a ogni tentativo)
+    'backoff_max': 2.0,            # attesa massima tra i tentativi
+    'hedge_images': True,          # seconda richiesta per le immagini lente
+    'hedge_percentile': 0.95,      # soglia di latenza oltre la quale parte la seconda richiesta
+    'hedge_min_samples': 20,       # latenze da osservare prima di attivare le richieste di copertura
+    'breaker_failures': 5,         # chiamate fallite consecutive che aprono il circuito
+    'breaker_reset_seconds': 30.0, # durata dell'apertura prima della chiamata di prova
+    'max_workers': 16              # thread per le operazioni con scadenza
+}
+
+
+class StorageUnavailableError(Exception):
+    """
+    Lo storage non ha risposto entro i limiti (scadenza, tentativi) o il circuito è aperto.
+    """
+
+
+class CircuitBreaker:
+    CLOSED = "chiuso"
+    OPEN = "aperto"
+    HALF_OPEN = "semiaperto"
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Indica se una chiamata può partire. Con il circuito aperto, trascorso l'intervallo
+        di reset, lascia passare una sola chiamata di prova.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class LatencyTracker:
+    """
+    Latenze delle ultime `window` operazioni riuscite, per stimarne i percentili.
+    """
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class StorageHealth:
+    """
+    Stato condiviso di uno storage: circuit breaker, latenze, ultimi elenchi riusciti e pool di thread.
+    """
+
+    def __init__(self, settings):
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        self.breaker = CircuitBreaker(self.settings['breaker_failures'], self.settings['breaker_reset_seconds'])
+        self.image_latency = LatencyTracker()
+        self.listings = {}  # prefisso -> ultimo elenco riuscito
+        self.executor = ThreadPoolExecutor(max_workers=self.settings['max_workers'], thread_name_prefix="storage")
+        self.hedged_requests = 0
+
+
+_health = {}
+_health_lock = threading.Lock()
+
+
+def get_storage_health(name, settings=None):
+    """
+    Restituisce lo stato condiviso dello storage `name` (es. l'URL dell'account senza token).
+    """
+    with _health_lock:
+        if name not in _health:
+            _health[name] = StorageHealth(settings)
+        return _health[name]
+
+
+class ResilientStorage(Storage):
+    def __init__(self, storage, health):
+        self.storage = storage
+        self.health = health
+        self.settings = health.settings
+        self.remote = storage.remote
+
+    def _backoff(self, attempt):
+        # Full jitter: attesa casuale tra 0 e il limite esponenziale
+        limit = min(self.settings['backoff_max'], self.settings['backoff_base'] * (2 ** attempt))
+        time.sleep(random.uniform(0, limit))
+
+    def _call(self, operation, timeout, hedge=False):
+        """
+        Esegue `operation()` con scadenza, nuovi tentativi e circuit breaker.
+        Il breaker conta una chiamata fallita solo quando sono falliti tutti i tentativi.
+        """
+        breaker = self.health.breaker
+        if not breaker.allow():
+            raise StorageUnavailableError("Storage temporaneamente non disponibile (circuito aperto)")
+        last_error = None
+        for attempt in range(self.settings['retries'] + 1):
+            started = time.monotonic()
+            try:
+                if hedge:
+                    result = self._hedged(operation, timeout)
+                else:
+                    result = self.health.executor.submit(operation).result(timeout=timeout)
+            except BlobNotFoundError:
+                # Risposta valida dello storage: non è un guasto e non va ritentata
+                breaker.record_success()
+                raise
+            except Exception as e:
+                last_error = e
+                if attempt < self.settings['retries']:
+                    self._backoff(attempt)
+                continue
+            breaker.record_success()
+            if hedge:
+                self.health.image_latency.add(time.monotonic() - started)
+            return result
+        breaker.record_failure()
+        raise StorageUnavailableError(f"Storage non raggiungibile: {last_error!r}")
+
+    def _hedged(self, operation, timeout):
+        """
+        Avvia l'operazione e, se non termina entro il percentile configurato delle latenze
+        osservate, ne avvia una seconda copia. Restituisce il primo risultato riuscito.
+        """
+        executor = self.health.executor
+        deadline = time.monotonic() + timeout
+        futures = [executor.submit(operation)]
+
+        threshold = None
+        if self.settings['hedge_images'] and len(self.health.image_latency) >= self.settings['hedge_min_samples']:
+            threshold = self.health.image_latency.percentile(self.settings['hedge_percentile'])
+        if threshold is not None and threshold < timeout:
+            done, _ = wait(futures, timeout=threshold)
+            if not done:
+                self.health.hedged_requests += 1
+                futures.append(executor.submit(operation))
+
+        pending = set(futures)
+        error = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except BlobNotFoundError:
+                    raise
+                except Exception as e:
+                    error = e
+        if error is not None:
+            raise error
+        raise FutureTimeoutError()
+
+    def _next_page(self, blobs):
+        return list(itertools.islice(blobs, LIST_PAGE_SIZE))
+
+    def list_blobs(self, prefix=""):
+        """
+        Elenca i blob come flusso, a pagine di LIST_PAGE_SIZE lette ciascuna entro la scadenza.
+        Se lo storage non è disponibile alla prima pagina restituisce l'ultimo elenco completo riuscito, se esiste.
+        """
+        def first_page():
+            blobs = iter(self.storage.list_blobs(prefix))
+            return blobs, self._next_page(blobs)
+
+        try:
+            blobs, page = self._call(first_page, self.settings['list_timeout'])
+        except StorageUnavailableError:
+            if prefix in self.health.listings:
+                print("Storage non disponibile: uso l'ultimo elenco dei blob riuscito")
+                return iter(self.health.listings[prefix])
+            raise
+        return self._stream(prefix, blobs, page)
+
+    def _stream(self, prefix, blobs, page):
+        listing = []
+        while page:
+            listing.extend(page)
+            yield from page
+            if len(page) < LIST_PAGE_SIZE:
+                break
+            # Le pagine successive non si possono ritentare senza ripartire dall'inizio: un solo tentativo
+            try:
+                page = self.health.executor.submit(self._next_page, blobs).result(timeout=self.settings['list_timeout'])
+            except Exception as e:
+                self.health.breaker.record_failure()
+                raise StorageUnavailableError(f"Elenco dei blob interrotto: {e!r}")
+        # Per ogni prefisso si conserva solo l'ultimo elenco completo, per i periodi di interruzione
+        self.health.listings[prefix] = listing
+
+    def list_prefixes(self, prefix=""):
+        key = ('prefixes', prefix)
+        try:
+            prefixes = self._call(lambda: list(self.storage.list_prefixes(prefix)), self.settings['list_timeout'])
+        except StorageUnavailableError:
+            if key in self.health.listings:
+                return self.health.listings[key]
+            raise
+        self.health.listings[key] = prefixes
+        return prefixes
+
+    def read(self, name):
+        is_image = parse_image_name(name) is not None
+        timeout = self.settings['image_timeout'] if is_image else self.settings['read_timeout']
+        return self._call(lambda: self.storage.read(name), timeout, hedge=is_image)
+
+    def write(self, name, content):
+        # La sostituzione di un blob è idempotente: si può ritentare
+        return self._call(lambda: self.storage.write(name, content), self.settings['read_timeout'])
+
+    def image_url(self, name):
+        # Nessuna chiamata allo storage: l'URL viene firmato localmente
+        return self.storage.image_url(name)
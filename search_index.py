@@ -0,0 +1,199 @@
+"""
+Indice invertito per la ricerca testuale nelle domande di tutte le certificazioni.
+
+L'indice viene costruito al caricamento dei database e aggiornato in modo incrementale:
+per ogni certificazione vengono reindicizzate solo le righe il cui testo è cambiato.
+Le ricerche usano il punteggio BM25 sulle liste di occorrenze, senza mai scorrere i DataFrame.
+L'ultima parola della ricerca vale anche come prefisso (es. "lakeh" trova "lakehouse").
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+import pandas as pd
+
+# Colonne sempre indicizzate, se presenti
+TEXT_COLUMNS = ['Commento', 'Risposta Esatta']
+# Sono indicizzate anche le colonne con il testo della domanda, riconosciute dal nome
+QUESTION_COLUMN_HINTS = ('domanda', 'testo', 'question', 'text')
+
+# Parametri BM25
+K1 = 1.2
+B = 0.75
+MIN_PREFIX_LENGTH = 3
+SNIPPET_LENGTH = 160
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """
+    Divide il testo in parole minuscole e senza accenti.
+    """
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return [token for token in _TOKEN.findall(text) if len(token) > 1 or token.isdigit()]
+
+
+def text_columns(df):
+    """
+    Restituisce le colonne del DataFrame da indicizzare.
+    """
+    columns = [c for c in TEXT_COLUMNS if c in df.columns]
+    columns += [
+        c for c in df.columns
+        if c not in columns and any(hint in str(c).lower() for hint in QUESTION_COLUMN_HINTS)
+    ]
+    return columns
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._next_id = 0
+        self._docs = {}           # doc_id -> metadati della domanda
+        self._doc_lengths = {}    # doc_id -> numero di parole
+        self._postings = {}       # parola -> {doc_id: occorrenze}
+        self._keys = {}           # (certificazione, indice riga) -> (doc_id, testo)
+        self._total_length = 0
+        self._vocabulary = []     # parole ordinate, per la ricerca per prefisso
+        self._vocabulary_dirty = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _add(self, key, text, meta):
+        tokens = tokenize(text)
+        doc_id = self._next_id
+        self._next_id += 1
+
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._vocabulary_dirty = True
+            postings[doc_id] = count
+
+        self._docs[doc_id] = meta
+        self._doc_lengths[doc_id] = len(tokens)
+        self._total_length += len(tokens)
+        self._keys[key] = (doc_id, text)
+
+    def _remove(self, key):
+        doc_id, text = self._keys.pop(key)
+        for token in set(tokenize(text)):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[token]
+                    self._vocabulary_dirty = True
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        del self._docs[doc_id]
+
+    def index_certification(self, cert, df):
+        """
+        Allinea l'indice al DataFrame della certificazione: aggiunge le righe nuove,
+        reindicizza quelle modificate e rimuove quelle sparite. Restituisce il numero di righe toccate.
+        """
+        columns = text_columns(df)
+        df = df.dropna(how='all')
+        topics = pd.to_numeric(df['Topic'], errors='coerce').astype('float64').fillna(0).astype(int) if 'Topic' in df.columns else None
+        numbers = pd.to_numeric(df['Numero'], errors='coerce').astype('float64').fillna(0).astype(int) if 'Numero' in df.columns else None
+        texts = df[columns].fillna('').astype(str).agg(' '.join, axis=1) if columns else pd.Series('', index=df.index)
+        comments = df['Commento'].fillna('').astype(str) if 'Commento' in df.columns else texts
+
+        changed = 0
+        with self._lock:
+            current = {key for key in self._keys if key[0] == cert}
+            for label, text in texts.items():
+                key = (cert, label)
+                current.discard(key)
+                meta = {
+                    'cert': cert,
+                    'label': label,
+                    'topic': int(topics[label]) if topics is not None else 0,
+                    'numero': int(numbers[label]) if numbers is not None else 0,
+                    'snippet': comments[label][:SNIPPET_LENGTH]
+                }
+                existing = self._keys.get(key)
+                if existing is not None and existing[1] == text:
+                    # Stesso testo: le occorrenze restano valide, ma topic e numero possono essere cambiati
+                    if self._docs[existing[0]] != meta:
+                        self._docs[existing[0]] = meta
+                        changed += 1
+                    continue
+                if existing is not None:
+                    self._remove(key)
+                self._add(key, text, meta)
+                changed += 1
+            for key in current:
+                self._remove(key)
+                changed += 1
+        return changed
+
+    def remove_certification(self, cert):
+        with self._lock:
+            for key in [key for key in self._keys if key[0] == cert]:
+                self._remove(key)
+
+    def _expand_prefix(self, prefix):
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\uffff')
+        return self._vocabulary[start:end]
+
+    def search(self, query, limit=20, cert=None):
+        """
+        Restituisce i risultati ordinati per rilevanza come lista di dizionari
+        (cert, label, topic, numero, snippet, score). Se `cert` è indicato cerca solo in quella certificazione.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            if not self._docs:
+                return []
+            total_docs = len(self._docs)
+            average_length = self._total_length / total_docs or 1.0
+
+            # L'ultima parola, se abbastanza lunga, vale anche come prefisso
+            terms = [[token] for token in tokens[:-1]]
+            last = tokens[-1]
+            expanded = self._expand_prefix(last) if len(last) >= MIN_PREFIX_LENGTH else []
+            terms.append(expanded or [last])
+
+            scores = {}
+            for alternatives in terms:
+                for token in alternatives:
+                    postings = self._postings.get(token)
+                    if not postings:
+                        continue
+                    idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, tf in postings.items():
+                        length_norm = K1 * (1 - B + B * self._doc_lengths[doc_id] / average_length)
+                        scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + length_norm)
+
+            if cert is not None:
+                scores = {doc_id: score for doc_id, score in scores.items() if self._docs[doc_id]['cert'] == cert}
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [dict(self._docs[doc_id], score=score) for doc_id, score in best]
+
+
+_index = SearchIndex()
+
+
+def get_search_index():
+    """
+    Restituisce l'indice di ricerca condiviso da tutte le sessioni del processo.
+    """
+    return _index
@@ -0,0 +1,275 @@
+"""
+Cache su disco condivisa tra i processi Streamlit dello stesso host.
+
+- I database delle domande sono salvati in formato Feather (Arrow IPC, non compresso) e riletti
+  con memory map: le colonne di testo restano nei buffer Arrow mappati, quindi le pagine sono
+  condivise dal sistema operativo tra tutti i processi e tra tutte le sessioni.
+- Le immagini sono salvate come file e rilette su richiesta, senza tenerne copie in memoria per sessione.
+  Ogni contenuto è salvato una sola volta (file indicizzato per MD5): la stessa schermata usata in più
+  certificazioni occupa spazio una volta sola, e ogni coppia nome/ETag rimanda al suo contenuto con un piccolo file .ref.
+
+Ogni voce è identificata dal nome del blob e dal suo ETag, quindi un blob aggiornato produce una
+nuova voce. Se lo storage non è raggiungibile si può ripiegare sull'ultima versione salvata (load_stale_bank,
+get_stale_image). La prima scrittura di ogni voce avviene sotto lock su file: se più processi chiedono la
+stessa voce, uno solo scarica ed elabora il blob, gli altri attendono e la leggono dal disco.
+All'interno del processo le richieste contemporanee della stessa voce sono unite (caching.SingleFlight):
+i thread in attesa ricevono lo stesso risultato senza rileggere e riconvertire il file.
+"""
+import glob
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from caching import get_single_flight
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "trr-certificazioni-cache")
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Lock esclusivo tra processi basato su file (fcntl su Linux/macOS, msvcrt su Windows).
+    """
+    with open(path, 'a+b') as handle:
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK rinuncia dopo circa 10 secondi: riprova
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _key(*parts):
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+
+def _clean_etag(etag):
+    return re.sub(r'[^A-Za-z0-9]', '', str(etag or 'noetag'))
+
+
+def _write_atomic(path, write):
+    """
+    Scrive un file tramite un file temporaneo nella stessa cartella e un rename atomico,
+    così nessun processo legge mai un file scritto a metà.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def arrow_strings(arrow_type):
+    # Le stringhe restano nei buffer Arrow (memory-mapped); i numeri vengono convertiti in NumPy
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def prepare_for_feather(df):
+    """
+    Rende il DataFrame scrivibile in Feather: nomi di colonna testuali, indice di default
+    e colonne miste (es. numeri e testo nella stessa colonna) convertite in testo.
+    """
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    df = df.reset_index(drop=True)
+    for column in df.columns:
+        if df[column].dtype == object:
+            values = df[column]
+            df[column] = values.where(values.isna(), values.astype(str))
+    return df
+
+
+class SharedCache:
+    def __init__(self, root):
+        self.root = root
+        self.banks_dir = os.path.join(root, "banks")
+        self.images_dir = os.path.join(root, "images")
+        self.locks_dir = os.path.join(root, "locks")
+        for directory in (self.banks_dir, self.images_dir, self.locks_dir):
+            os.makedirs(directory, exist_ok=True)
+        # Database già aperti in questo processo, condivisi da tutte le sessioni
+        self._banks = {}
+        self._lock = threading.Lock()
+
+    def _lock_path(self, key):
+        return os.path.join(self.locks_dir, f"{key}.lock")
+
+    def _bank_path(self, blob_name, etag):
+        return os.path.join(self.banks_dir, f"{_key(blob_name)}-{_clean_etag(etag)}.feather")
+
+    def load_bank(self, blob_name, etag, loader):
+        """
+        Restituisce il DataFrame del database `blob_name` nella versione `etag`.
+        Se non è ancora in cache, `loader()` viene chiamato una sola volta per host per produrlo.
+        Il DataFrame restituito è condiviso: chi lo modifica deve prima farne una copia.
+        """
+        path = self._bank_path(blob_name, etag)
+        with self._lock:
+            df = self._banks.get(path)
+        if df is not None:
+            return df
+        return get_single_flight().do(('bank', path), lambda: self._load_bank(blob_name, path, loader))
+
+    def _load_bank(self, blob_name, path, loader):
+        with self._lock:
+            df = self._banks.get(path)
+        if df is not None:
+            return df
+
+        if not os.path.exists(path):
+            with file_lock(self._lock_path(_key(blob_name))):
+                if not os.path.exists(path):
+                    df = prepare_for_feather(loader())
+                    _write_atomic(path, lambda tmp: feather.write_feather(df, tmp, compression='uncompressed'))
+                    self._remove_old_banks(blob_name, path)
+
+        return self._open_bank(blob_name, path)
+
+    def _open_bank(self, blob_name, path):
+        table = feather.read_table(path, memory_map=True)
+        df = table.to_pandas(types_mapper=arrow_strings)
+        with self._lock:
+            # Le versioni precedenti dello stesso database non servono più a questo processo
+            prefix = os.path.join(self.banks_dir, _key(blob_name))
+            for old_path in [p for p in self._banks if p.startswith(prefix) and p != path]:
+                del self._banks[old_path]
+            return self._banks.setdefault(path, df)
+
+    def load_stale_bank(self, blob_name):
+        """
+        Restituisce l'ultima versione salvata del database `blob_name`, qualunque sia il suo ETag,
+        o None se non ce n'è nessuna. Usata quando lo storage non è disponibile.
+        """
+        path = _newest(glob.glob(os.path.join(self.banks_dir, f"{_key(blob_name)}-*.feather")))
+        if path is None:
+            return None
+        with self._lock:
+            df = self._banks.get(path)
+        return df if df is not None else self._open_bank(blob_name, path)
+
+    def _remove_old_banks(self, blob_name, current_path):
+        for old_path in glob.glob(os.path.join(self.banks_dir, f"{_key(blob_name)}-*.feather")):
+            if old_path != current_path:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass  # Su Windows un file mappato da un altro processo non può essere rimosso
+
+    def _content_path(self, content_md5):
+        return os.path.join(self.images_dir, f"md5-{content_md5}")
+
+    def _ref_path(self, blob_name, etag):
+        return os.path.join(self.images_dir, f"{_key(blob_name)}-{_clean_etag(etag)}.ref")
+
+    def _read_content(self, content_md5):
+        try:
+            with open(self._content_path(content_md5), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def get_image(self, blob_name, etag, loader, content_md5=None):
+        """
+        Restituisce i byte dell'immagine `blob_name` nella versione `etag`.
+        Se non è ancora in cache, `loader()` viene chiamato una sola volta per host per scaricarla.
+        Con `content_md5` (il Content-MD5 del blob, se lo storage lo fornisce) un contenuto già in cache
+        con un altro nome viene riusato senza scaricarlo.
+        """
+        ref_path = self._ref_path(blob_name, etag)
+        if content_md5 is None:
+            content_md5 = _read_text(ref_path)
+        if content_md5:
+            content = self._read_content(content_md5)
+            if content is not None:
+                if not os.path.exists(ref_path):
+                    _write_atomic(ref_path, lambda tmp: _write_bytes(tmp, content_md5.encode('ascii')))
+                return content
+
+        with file_lock(self._lock_path(content_md5 or _key(blob_name))):
+            known_md5 = content_md5 or _read_text(ref_path)
+            content = self._read_content(known_md5) if known_md5 else None
+            if content is None:
+                content = loader()
+                if content is None:
+                    return None
+                content = bytes(content)
+                known_md5 = hashlib.md5(content).hexdigest()
+                path = self._content_path(known_md5)
+                if not os.path.exists(path):
+                    _write_atomic(path, lambda tmp: _write_bytes(tmp, content))
+            _write_atomic(ref_path, lambda tmp: _write_bytes(tmp, known_md5.encode('ascii')))
+            return content
+
+    def get_stale_image(self, blob_name):
+        """
+        Restituisce l'ultima versione salvata dell'immagine `blob_name`, o None se non ce n'è nessuna.
+        """
+        ref_path = _newest(glob.glob(os.path.join(self.images_dir, f"{_key(blob_name)}-*.ref")))
+        content_md5 = _read_text(ref_path) if ref_path else None
+        return self._read_content(content_md5) if content_md5 else None
+
+
+def _newest(paths):
+    return max(paths, key=os.path.getmtime, default=None)
+
+
+def _read_text(path):
+    try:
+        with open(path, encoding='ascii') as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_bytes(path, content):
+    with open(path, 'wb') as file:
+        file.write(content)
+
+
+def get_shared_cache(root=None):
+    """
+    Restituisce la cache condivisa nella cartella indicata, o None se la cartella non è utilizzabile.
+    """
+    root = root or DEFAULT_CACHE_DIR
+    with _caches_lock:
+        if root not in _caches:
+            try:
+                _caches[root] = SharedCache(root)
+            except OSError as e:
+                print(f"Cache condivisa non disponibile in {root}: {e}")
+                _caches[root] = None
+        return _caches[root]
@@ -0,0 +1,165 @@
+"""
+Simulazione di uno storage lento o guasto per verificare i parametri di resilience.py.
+
+Uno storage locale in memoria (o una cartella con la struttura di data/) viene avvolto da FaultyStorage,
+che aggiunge latenza, richieste molto lente, errori casuali e un periodo di interruzione completa.
+Le letture passano da ResilientStorage con i parametri di config.json (chiave `resilience`). Come
+nell'applicazione, quando lo storage non è disponibile l'immagine viene servita dall'ultima versione salvata
+nella cache condivisa (SharedCache.get_stale_image), popolata prima delle letture con una quota delle immagini.
+Al termine vengono riportati i percentili di latenza, le richieste di copertura, gli errori e le risposte
+servite dalla cache durante l'interruzione.
+
+Esempio:
+    python simulate_storage_faults.py --reads 500 --slow-rate 0.05 --failure-rate 0.02 --outage 5
+"""
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from resilience import ResilientStorage, StorageHealth, StorageUnavailableError
+from shared_cache import SharedCache
+from storage import Storage, BlobInfo, BlobNotFoundError, LocalFolderStorage, parse_image_name
+
+
+class MemoryStorage(Storage):
+    """
+    Storage in memoria con `count` immagini fittizie di `size` byte.
+    """
+    remote = True
+
+    def __init__(self, count=200, size=50_000):
+        self.blobs = {
+            f"data/Simulazione/Domande/Topic{1 + n // 50}/{n % 50 + 1}.png": random.randbytes(size)
+            for n in range(count)
+        }
+
+    def list_blobs(self, prefix=""):
+        for name, content in self.blobs.items():
+            if name.startswith(prefix):
+                yield BlobInfo(name, "0x1", len(content), None)
+
+    def read(self, name):
+        if name not in self.blobs:
+            raise BlobNotFoundError(name)
+        return self.blobs[name]
+
+
+class FaultyStorage(Storage):
+    """
+    Inietta guasti nelle chiamate a un altro backend.
+    """
+    remote = True
+
+    def __init__(self, storage, latency, slow_rate, slow_latency, failure_rate, outage_start, outage_seconds):
+        self.storage = storage
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.failure_rate = failure_rate
+        self.outage_start = outage_start
+        self.outage_seconds = outage_seconds
+        self.started_at = time.monotonic()
+
+    def _inject(self):
+        elapsed = time.monotonic() - self.started_at
+        if self.outage_start <= elapsed < self.outage_start + self.outage_seconds:
+            time.sleep(self.latency)
+            raise ConnectionError("interruzione simulata")
+        time.sleep(self.slow_latency if random.random() < self.slow_rate else random.expovariate(1 / self.latency))
+        if random.random() < self.failure_rate:
+            raise ConnectionError("errore simulato")
+
+    def list_blobs(self, prefix=""):
+        self._inject()
+        return self.storage.list_blobs(prefix)
+
+    def read(self, name):
+        self._inject()
+        return self.storage.read(name)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula uno storage lento o guasto.")
+    parser.add_argument("--data-dir", help="Cartella con la struttura di data/ (default: immagini fittizie in memoria)")
+    parser.add_argument("--reads", type=int, default=500, help="Numero di letture di immagini")
+    parser.add_argument("--concurrency", type=int, default=8, help="Letture contemporanee")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latenza media in secondi")
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="Quota di richieste molto lente")
+    parser.add_argument("--slow-latency", type=float, default=2.0, help="Latenza delle richieste lente in secondi")
+    parser.add_argument("--failure-rate", type=float, default=0.02, help="Quota di richieste in errore")
+    parser.add_argument("--outage-start", type=float, default=3.0, help="Inizio dell'interruzione (secondi)")
+    parser.add_argument("--outage", type=float, default=0.0, help="Durata dell'interruzione (secondi)")
+    parser.add_argument("--stale-fraction", type=float, default=0.8,
+                        help="Quota di immagini con una versione precedente nella cache condivisa")
+    parser.add_argument("--cache-dir", help="Cartella della cache condivisa (default: cartella temporanea)")
+    parser.add_argument("--config", default="config.json", help="File di configurazione con la chiave 'resilience'")
+    args = parser.parse_args()
+
+    try:
+        with open(args.config, encoding="utf-8") as file:
+            settings = json.load(file).get('resilience')
+    except OSError:
+        settings = None
+
+    backend = LocalFolderStorage(args.data_dir) if args.data_dir else MemoryStorage()
+    faulty = FaultyStorage(backend, args.latency, args.slow_rate, args.slow_latency,
+                           args.failure_rate, args.outage_start, args.outage)
+    health = StorageHealth(settings)
+    storage = ResilientStorage(faulty, health)
+
+    # L'elenco passa dallo storage resiliente, che lo conserva per i periodi di interruzione
+    images = [blob.name for blob in storage.list_blobs("data/") if parse_image_name(blob.name)]
+    if not images:
+        raise SystemExit("Nessuna immagine trovata")
+
+    # Versione precedente di una parte delle immagini, come lasciata nella cache da un'esecuzione passata
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix="simulazione-cache-")
+    shared_cache = SharedCache(cache_dir)
+    for name in random.sample(images, int(len(images) * args.stale_fraction)):
+        shared_cache.get_image(name, "versione-precedente", lambda name=name: backend.read(name))
+
+    latencies = []
+    outcomes = {'ok': 0, 'cache': 0, 'errori': 0}
+    breaker_states = {}
+    lock = threading.Lock()
+
+    def read_one(_):
+        name = random.choice(images)
+        started = time.monotonic()
+        try:
+            storage.read(name)
+            outcome = 'ok'
+        except StorageUnavailableError:
+            # Stesso ripiego di CertificationQuizApp._fetch_image
+            outcome = 'cache' if shared_cache.get_stale_image(name) is not None else 'errori'
+        elapsed = time.monotonic() - started
+        with lock:
+            latencies.append(elapsed)
+            outcomes[outcome] += 1
+            breaker_states[health.breaker.state] = breaker_states.get(health.breaker.state, 0) + 1
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(read_one, range(args.reads)))
+    total = time.monotonic() - started
+
+    print(f"Letture: {args.reads} in {total:.1f} s")
+    print(f"Latenza p50 {percentile(latencies, 0.5) * 1000:.0f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.0f} ms, p99 {percentile(latencies, 0.99) * 1000:.0f} ms, "
+          f"max {max(latencies) * 1000:.0f} ms")
+    print(f"Riuscite: {outcomes['ok']}, servite dalla cache: {outcomes['cache']}, fallite: {outcomes['errori']}")
+    print(f"Richieste di copertura: {health.hedged_requests}")
+    print(f"Stato del circuito dopo le letture: {breaker_states}")
+    health.executor.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+"""
+Backend di accesso ai dati delle certificazioni.
+
+Tutti i backend espongono la stessa struttura del container `materiale-certificazioni`
+(nomi del tipo "data/<certificazione>/Domande/Topic<N>/<numero>.<ext>"):
+
+- AzureBlobStorage: il container Azure Blob Storage;
+- LocalFolderStorage: una cartella locale con la struttura di data/ (come in local_data.py);
+- PackStorage: un pacchetto offline prodotto da export_pack.py, letto con mmap.
+
+Formato del pacchetto (.pack):
+    8 byte   magic "TRRPACK1"
+    8 byte   lunghezza dell'intestazione (little endian)
+    N byte   intestazione JSON: elenco dei blob con offset e lunghezza, e per ogni certificazione
+             il database in formato colonnare (Arrow IPC), la configurazione e l'indice topic/numero delle immagini
+    ...      dati, allineati a 64 byte
+"""
+import hashlib
+import io
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from urllib.parse import quote
+import pyarrow as pa
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+from shared_cache import arrow_strings
+from ingest import read_question_bank
+
+PACK_MAGIC = b"TRRPACK1"
+PACK_EXTENSION = ".pack"
+PACK_ALIGNMENT = 64
+
+BlobInfo = namedtuple('BlobInfo', ['name', 'etag', 'size', 'content_md5'])
+
+
+class BlobNotFoundError(KeyError):
+    """
+    Il blob richiesto non esiste (a differenza degli errori di rete o di accesso, che vengono propagati).
+    """
+
+
+def parse_image_name(name):
+    """
+    Estrae (certificazione, topic, numero) dal nome di un'immagine delle domande
+    ("data/<cert>/Domande/Topic<topic>/<numero>.<ext>"), o None se il nome non corrisponde.
+    """
+    parts = name.split('/')
+    if len(parts) > 4 and parts[0] == "data" and parts[2] == "Domande" and parts[3].startswith("Topic"):
+        number_parts = parts[4].split('.')
+        if len(number_parts) >= 2:
+            try:
+                return parts[1], parts[3].replace("Topic", ""), int(number_parts[0])
+            except ValueError:
+                return None
+    return None
+
+
+class Storage:
+    """
+    Interfaccia comune dei backend.
+    """
+    # I backend remoti beneficiano della cache su disco condivisa tra i processi
+    remote = False
+
+    def list_blobs(self, prefix=""):
+        raise NotImplementedError
+
+    def list_prefixes(self, prefix=""):
+        """
+        Restituisce le "cartelle" direttamente sotto `prefix` (es. "data/" -> ["data/Microsoft DP-700/", ...]).
+        """
+        prefixes = {}
+        for blob in self.list_blobs(prefix):
+            rest = blob.name[len(prefix):]
+            if '/' in rest:
+                prefixes.setdefault(prefix + rest.split('/')[0] + '/', None)
+        return list(prefixes)
+
+    def read(self, name):
+        """
+        Restituisce il contenuto del blob (bytes o memoryview). Solleva BlobNotFoundError se non esiste.
+        """
+        raise NotImplementedError
+
+    def write(self, name, content):
+        """
+        Crea o sostituisce il blob `name`. Solleva NotImplementedError se il backend è in sola lettura.
+        """
+        raise NotImplementedError
+
+    def read_bank(self, name):
+        """
+        Restituisce il DataFrame del database delle domande `name`.
+        """
+        return read_question_bank(io.BytesIO(self.read(name)))
+
+    def image_url(self, name):
+        """
+        Restituisce un URL da cui il browser può scaricare direttamente il blob, o None se il backend non lo consente.
+        """
+        return None
+
+
+class AzureBlobStorage(Storage):
+    remote = True
+
+    def __init__(self, container_client, account_key=None, url_seconds=3600):
+        """
+        Con `account_key` il backend può firmare URL in sola lettura per i singoli blob (image_url),
+        validi per circa `url_seconds` secondi.
+        """
+        self.container_client = container_client
+        self.account_key = account_key
+        self.url_seconds = url_seconds
+        self._urls = {}
+        self._urls_expiry = None
+
+    def list_blobs(self, prefix=""):
+        for blob in self.container_client.list_blobs(name_starts_with=prefix or None):
+            yield BlobInfo(blob.name, blob.etag, blob.size, _content_md5(blob))
+
+    def list_prefixes(self, prefix=""):
+        # Elenco gerarchico con delimitatore: il servizio restituisce solo le "cartelle" del livello,
+        # senza elencare i blob che contengono
+        return [
+            item.name for item in self.container_client.walk_blobs(name_starts_with=prefix or None, delimiter='/')
+            if item.name.endswith('/')
+        ]
+
+    def read(self, name):
+        blob_client = self.container_client.get_blob_client(name)
+        try:
+            download_stream = blob_client.download_blob()
+        except ResourceNotFoundError:
+            raise BlobNotFoundError(name)
+        return download_stream.readall()
+
+    def write(self, name, content):
+        # Richiede un token SAS (o una credenziale) con permesso di scrittura
+        self.container_client.upload_blob(name, content, overwrite=True)
+
+    def image_url(self, name):
+        if not self.account_key:
+            return None
+        # La scadenza è allineata a intervalli fissi: nello stesso intervallo l'URL di un blob è sempre
+        # lo stesso, quindi il browser (e un eventuale proxy) lo riusa dalla propria cache
+        now = int(time.time())
+        expiry = now - now % self.url_seconds + 2 * self.url_seconds
+        if expiry != self._urls_expiry:
+            self._urls = {}
+            self._urls_expiry = expiry
+        url = self._urls.get(name)
+        if url is None:
+            sas = generate_blob_sas(
+                account_name=self.container_client.account_name,
+                container_name=self.container_client.container_name,
+                blob_name=name,
+                account_key=self.account_key,
+                permission=BlobSasPermissions(read=True),
+                expiry=datetime.fromtimestamp(expiry, timezone.utc),
+                cache_control=f"public, max-age={self.url_seconds}"
+            )
+            base_url = self.container_client.url.split('?')[0]
+            url = self._urls[name] = f"{base_url}/{quote(name)}?{sas}"
+        return url
+
+
+def _content_md5(blob):
+    settings = getattr(blob, 'content_settings', None)
+    md5 = getattr(settings, 'content_md5', None) if settings else None
+    return bytes(md5).hex() if md5 else None
+
+
+class LocalFolderStorage(Storage):
+    def __init__(self, data_dir, static_dir=None):
+        """
+        `data_dir` è la cartella che contiene le certificazioni (corrisponde a "data/" nel container).
+        Se si trova dentro `static_dir` (la cartella servita da Streamlit con server.enableStaticServing)
+        le immagini possono essere scaricate direttamente dal browser (image_url).
+        """
+        self.data_dir = data_dir
+        self.static_dir = static_dir
+
+    def _path(self, name):
+        if not name.startswith("data/"):
+            raise BlobNotFoundError(name)
+        return os.path.join(self.data_dir, *name[len("data/"):].split('/'))
+
+    def list_blobs(self, prefix=""):
+        # Si visita solo la cartella più interna che contiene il prefisso (es. data/<certificazione>/),
+        # non l'intera cartella dei dati
+        if prefix.startswith("data/"):
+            top = self._path(prefix[:prefix.rfind('/') + 1])
+        elif "data/".startswith(prefix):
+            top = self.data_dir
+        else:
+            return
+        for root, _, files in os.walk(top):
+            for file_name in sorted(files):
+                path = os.path.join(root, file_name)
+                name = "data/" + os.path.relpath(path, self.data_dir).replace(os.sep, '/')
+                if name.startswith(prefix):
+                    stat = os.stat(path)
+                    yield BlobInfo(name, f"{stat.st_mtime_ns}-{stat.st_size}", stat.st_size, None)
+
+    def list_prefixes(self, prefix=""):
+        if prefix != "data/":
+            return super().list_prefixes(prefix)
+        if not os.path.isdir(self.data_dir):
+            return []
+        return [
+            f"data/{entry.name}/" for entry in sorted(os.scandir(self.data_dir), key=lambda e: e.name) if entry.is_dir()
+        ]
+
+    def read(self, name):
+        try:
+            with open(self._path(name), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            raise BlobNotFoundError(name)
+
+    def read_bank(self, name):
+        return read_question_bank(self._path(name))
+
+    def write(self, name, content):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # File temporaneo e rename atomico: chi legge non vede mai un file scritto a metà
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def image_url(self, name):
+        if not self.static_dir:
+            return None
+        relative = os.path.relpath(os.path.abspath(self._path(name)), os.path.abspath(self.static_dir))
+        if relative.startswith(os.pardir):
+            return None
+        return "app/static/" + quote(relative.replace(os.sep, '/'))
+
+
+class PackStorage(Storage):
+    """
+    Backend in sola lettura su un pacchetto offline. Il file è mappato in memoria:
+    read() restituisce memoryview sul mapping senza copiare i byte.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        if bytes(self._view[:8]) != PACK_MAGIC:
+            raise ValueError(f"{path} non è un pacchetto valido")
+        header_length = struct.unpack('<Q', self._view[8:16])[0]
+        self.header = json.loads(bytes(self._view[16:16 + header_length]).decode('utf-8'))
+        self._data_start = _align(16 + header_length)
+        self._blobs = self.header['blobs']
+        # Nomi dei blob per certificazione, così gli elenchi di una certificazione non scorrono l'intero pacchetto
+        self._by_cert = {}
+        for name in self._blobs:
+            parts = name.split('/')
+            if len(parts) > 2 and parts[0] == "data":
+                self._by_cert.setdefault(parts[1], []).append(name)
+
+    def _slice(self, entry):
+        start = self._data_start + entry['offset']
+        return self._view[start:start + entry['length']]
+
+    def list_blobs(self, prefix=""):
+        parts = prefix.split('/')
+        if len(parts) > 2 and parts[0] == "data":
+            names = self._by_cert.get(parts[1], ())
+        else:
+            names = self._blobs
+        for name in names:
+            if name.startswith(prefix):
+                entry = self._blobs[name]
+                yield BlobInfo(name, entry.get('etag'), entry['length'], entry.get('md5'))
+
+    def list_prefixes(self, prefix=""):
+        if prefix != "data/":
+            return super().list_prefixes(prefix)
+        return [f"data/{cert}/" for cert in sorted(self._by_cert)]
+
+    def read(self, name):
+        if name not in self._blobs:
+            raise BlobNotFoundError(name)
+        return self._slice(self._blobs[name])
+
+    def read_bank(self, name):
+        cert = name.split('/')[1]
+        bank = self.header['certifications'][cert]['bank']
+        # Il buffer Arrow punta direttamente al mapping: le colonne di testo non vengono copiate
+        reader = pa.ipc.open_file(pa.py_buffer(self._slice(bank)))
+        table = reader.read_all()
+        return table.to_pandas(types_mapper=arrow_strings)
+
+    def image_index(self, cert):
+        """
+        Indice topic -> numero -> nome del blob dell'immagine, precalcolato nel pacchetto.
+        """
+        images = self.header['certifications'].get(cert, {}).get('images', {})
+        return {topic: {int(number): name for number, name in numbers.items()} for topic, numbers in images.items()}
+
+
+def _align(offset):
+    return (offset + PACK_ALIGNMENT - 1) // PACK_ALIGNMENT * PACK_ALIGNMENT
+
+
+def iter_certifications(storage):
+    """
+    Restituisce per ogni cartella di certificazione in data/ la coppia (certificazione, blob della certificazione).
+    I blob sono elencati con una richiesta per certificazione e restituiti come flusso, senza elencare l'intero container.
+    """
+    for prefix in storage.list_prefixes("data/"):
+        yield prefix.split('/')[1], storage.list_blobs(prefix)
+
+
+def open_local_storage(path, static_dir=None):
+    """
+    Apre il backend locale: un pacchetto offline se il percorso termina con .pack, altrimenti una cartella.
+    """
+    if path.endswith(PACK_EXTENSION):
+        return PackStorage(path)
+    return LocalFolderStorage(path, static_dir)
+
+
+class PackWriter:
+    """
+    Scrive un pacchetto offline. I dati vengono prima accodati in un file temporaneo
+    (le immagini non vengono mai tenute tutte in memoria) e l'intestazione viene scritta alla chiusura.
+    """
+
+    def __init__(self, path, source):
+        self.path = path
+        self.header = {'version': 1, 'source': source, 'blobs': {}, 'certifications': {}}
+        self._data = tempfile.TemporaryFile()
+        self._offset = 0
+        self._contents = {}  # MD5 del contenuto -> posizione dei dati già scritti
+
+    def _append(self, content):
+        content = bytes(content)
+        padding = _align(self._offset) - self._offset
+        self._data.write(b'\0' * padding)
+        self._offset += padding
+        entry = {'offset': self._offset, 'length': len(content)}
+        self._data.write(content)
+        self._offset += len(content)
+        return entry
+
+    def add_blob(self, blob, content):
+        # I blob con lo stesso contenuto (es. la stessa immagine in più certificazioni) condividono i dati
+        content = bytes(content)
+        digest = hashlib.md5(content).hexdigest()
+        if digest not in self._contents:
+            self._contents[digest] = self._append(content)
+        entry = dict(self._contents[digest])
+        entry.update({'etag': blob.etag, 'md5': blob.content_md5})
+        self.header['blobs'][blob.name] = entry
+
+    def add_certification(self, cert, database_blob, df, cert_config, images):
+        """
+        Aggiunge il database (in formato Arrow IPC), la configurazione e l'indice topic -> numero -> blob.
+        Il database resta elencato con il nome originale (database.xlsx), ma il suo contenuto è la tabella Arrow.
+        """
+        sink = pa.BufferOutputStream()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        bank = self._append(sink.getvalue().to_pybytes())
+        self.header['blobs'][database_blob.name] = dict(bank, etag=database_blob.etag, md5=database_blob.content_md5)
+        self.header['certifications'][cert] = {
+            'bank': bank,
+            'rows': len(df),
+            'config': cert_config,
+            'images': {topic: {str(number): name for number, name in numbers.items()} for topic, numbers in images.items()}
+        }
+
+    def close(self):
+        header = json.dumps(self.header, ensure_ascii=False).encode('utf-8')
+        with open(self.path, 'wb') as output:
+            output.write(PACK_MAGIC)
+            output.write(struct.pack('<Q', len(header)))
+            output.write(header)
+            output.write(b'\0' * (_align(16 + len(header)) - 16 - len(header)))
+            self._data.seek(0)
+            shutil.copyfileobj(self._data, output)
+        self._data.close()
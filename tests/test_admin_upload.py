@@ -0,0 +1,11 @@
+from admin_upload import is_valid_cert_name
+
+
+def test_cert_name_cannot_leave_data_folder():
+    for name in ("..", "../Altro", "Cert/..", "a\\b", "C:\\dati", "Cert\n", ""):
+        assert not is_valid_cert_name(name)
+
+
+def test_cert_name_accepts_usual_names():
+    for name in ("Microsoft DP-700", "AZ_104", "Databricks Data Engineer"):
+        assert is_valid_cert_name(name)
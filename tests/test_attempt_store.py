@@ -0,0 +1,35 @@
+import pandas as pd
+from attempt_store import AttemptStore
+from main import CertificationQuizApp
+from question_scheduler import AdaptiveScheduler
+
+
+def test_attempts_are_read_back_after_flush(tmp_path):
+    path = str(tmp_path / "attempts.sqlite")
+    store = AttemptStore(path)
+    store.record("anonimo:a", "Cert", 1, 1, "A", True)
+    store.record("anonimo:a", "Cert", 1, 2, "B", False)
+    store.record("anonimo:a", "Altra", 1, 1, "C", True)
+    store.record("anonimo:b", "Cert", 1, 1, "D", False)
+    assert store.flush()
+
+    # Un nuovo archivio sullo stesso file, come dopo il riavvio del processo
+    attempts = AttemptStore(path).read_user("anonimo:a", "Cert")
+    assert attempts[['topic', 'question_number', 'correct']].values.tolist() == [[1, 1, 1], [1, 2, 0]]
+
+
+def test_progress_is_rebuilt_from_attempts(tmp_path):
+    store = AttemptStore(str(tmp_path / "attempts.sqlite"))
+    for number, correct in ((2, True), (3, False), (3, False), (9, True)):
+        store.record("anonimo:a", "Cert", 1, number, "A", correct)
+
+    app = CertificationQuizApp({'data_path': str(tmp_path)})
+    app.df = pd.DataFrame({'Topic': [1, 1, 1], 'Numero': [1, 2, 3]}, index=[10, 11, 12])
+    app.restore_attempts(store.read_user("anonimo:a", "Cert"))
+
+    assert (app.correct_answers, app.total_questions) == (2, 4)
+    # La domanda 9 non esiste più: conta solo nel punteggio
+    assert app.seen_questions == {11, 12}
+    assert app.question_weights[12] == AdaptiveScheduler.DEFAULT_WEIGHT * 4
+    app.filter_questions("Topic 1")
+    assert app.get_random_question().name == 10
@@ -0,0 +1,52 @@
+import gc
+from catalog import Catalog
+
+
+class Owner:
+    pass
+
+
+def builder():
+    versions = []
+
+    def build():
+        versions.append(len(versions) + 1)
+        return {'build': versions[-1]}
+    return build
+
+
+def test_sessions_stay_on_pinned_version():
+    catalog = Catalog(builder())
+    owner = Owner()
+    snapshot, _ = catalog.pin(owner)
+
+    catalog.refresh()
+    assert catalog.has_newer(snapshot.version)
+    assert snapshot.contents == {'build': 1}
+    assert catalog.stats() == {1: 1, 2: 0}
+
+
+def test_version_is_released_when_owner_is_collected():
+    catalog = Catalog(builder())
+    owner = Owner()
+    catalog.pin(owner)
+    catalog.refresh()
+
+    del owner
+    gc.collect()
+    # La versione 1 non è più usata e non è la più recente: viene rilasciata
+    assert catalog.stats() == {2: 0}
+
+
+def test_repin_releases_previous_version():
+    catalog = Catalog(builder())
+    owner = Owner()
+    _, pin = catalog.pin(owner)
+    catalog.update(lambda contents: dict(contents, build='aggiornato'))
+
+    snapshot, pin = catalog.pin(owner, previous=pin)
+    assert snapshot.contents == {'build': 'aggiornato'}
+    assert catalog.stats() == {2: 1}
+
+    pin()
+    assert catalog.stats() == {2: 0}
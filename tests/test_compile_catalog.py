@@ -0,0 +1,26 @@
+import pandas as pd
+import pyarrow as pa
+from compile_catalog import compile_certification
+
+
+def arrow_bank(topics, numbers):
+    # Come i database letti dalla cache condivisa o dal pacchetto offline: colonne di testo Arrow
+    return pd.DataFrame({'Topic': topics, 'Numero': numbers}).astype(pd.ArrowDtype(pa.string()))
+
+
+def test_invalid_topic_in_arrow_bank_is_reported():
+    images = {'1': {1: "data/Cert/Domande/Topic1/1.png"}}
+    question_images, report = compile_certification(arrow_bank(['1', 'x', '1.5'], ['1', '2', '3']), images)
+
+    assert report['invalid_rows'] == [3, 4]
+    assert question_images == {(1, 1): "data/Cert/Domande/Topic1/1.png"}
+    assert report['missing_images'] == []
+
+
+def test_numeric_bank():
+    df = pd.DataFrame({'Topic': [1, 1, None], 'Numero': [1, 1, 2]})
+    _, report = compile_certification(df, {})
+
+    assert report['invalid_rows'] == [4]
+    assert report['duplicate_questions'] == [(1, 1)]
+    assert report['missing_images'] == [(1, 1)]
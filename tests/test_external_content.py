@@ -0,0 +1,118 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+import external_content
+
+PAGE = (
+    "<html><head><style>.x {{ color: red; }}</style></head>"
+    "<body><div class='discussion-header-container'>{text}</div></body></html>"
+)
+
+
+class StandIn(BaseHTTPRequestHandler):
+    # Sostituto locale della fonte esterna: conta le richieste e può simulare un guasto
+    hits = 0
+    failing = False
+    text = "dal sito"
+    delay = 0.0
+
+    def do_GET(self):
+        StandIn.hits += 1
+        time.sleep(StandIn.delay)
+        if StandIn.failing:
+            self.send_error(503)
+            return
+        body = PAGE.format(text=StandIn.text).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site(tmp_path):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StandIn.hits, StandIn.failing, StandIn.text, StandIn.delay = 0, False, "dal sito", 0.0
+    external_content._fragments.clear()
+    external_content._domain_styles.clear()
+    store = external_content.configure_store(str(tmp_path / "fragments.sqlite"))
+    yield f"http://127.0.0.1:{server.server_port}/discussion/1", store
+    server.shutdown()
+    server.server_close()
+    external_content.configure_store(None)
+    external_content._fragments.clear()
+    external_content._domain_styles.clear()
+
+
+def test_missing_fragment_is_fetched_and_stored(site):
+    url, store = site
+
+    fragment = external_content.get_fragment(url)
+
+    assert "dal sito" in fragment
+    assert StandIn.hits == 1
+    assert store.get(url, external_content.DEFAULT_SELECTOR)[0] == fragment
+
+
+def test_concurrent_misses_send_one_request(site):
+    url, _ = site
+    StandIn.delay = 0.3
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(external_content.get_fragment(url))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 10 and all("dal sito" in fragment for fragment in results)
+    assert StandIn.hits == 1
+
+
+def test_expired_memory_copy_prefers_prefetched_store(site):
+    url, store = site
+    selector = external_content.DEFAULT_SELECTOR
+    expired = time.time() - external_content.STALE_SECONDS - 60
+    external_content._fragments[(url, selector)] = ("<div>vecchio</div>", expired)
+    store.put(url, selector, "<div>dal prefetch</div>", time.time())
+
+    assert external_content.get_fragment(url) == "<div>dal prefetch</div>"
+    assert StandIn.hits == 0
+
+
+def test_stale_copy_is_served_and_revalidated(site):
+    url, store = site
+    selector = external_content.DEFAULT_SELECTOR
+    stale = time.time() - external_content.FRESH_SECONDS - 60
+    store.put(url, selector, "<div>stale</div>", stale)
+
+    assert external_content.get_fragment(url) == "<div>stale</div>"
+    deadline = time.time() + 5
+    while store.get(url, selector)[1] == stale and time.time() < deadline:
+        time.sleep(0.05)
+    assert "dal sito" in store.get(url, selector)[0]
+    assert StandIn.hits == 1
+
+
+def test_expired_copy_is_served_when_site_fails(site):
+    url, store = site
+    expired = time.time() - external_content.STALE_SECONDS - 60
+    store.put(url, external_content.DEFAULT_SELECTOR, "<div>scaduto</div>", expired)
+    StandIn.failing = True
+
+    assert external_content.get_fragment(url) == "<div>scaduto</div>"
+    assert StandIn.hits == 1
+
+
+def test_network_error_without_copy_is_raised(site):
+    url, _ = site
+    StandIn.failing = True
+
+    with pytest.raises(requests.HTTPError):
+        external_content.get_fragment(url)
@@ -0,0 +1,52 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import main
+
+
+class SlowGuide(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        SlowGuide.hits += 1
+        time.sleep(0.5)
+        body = "# Guida\ntesto".encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowGuide)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    SlowGuide.hits = 0
+    main._get_guide_cache()['entries'].clear()
+    yield f"http://127.0.0.1:{server.server_port}/guida.md"
+    server.shutdown()
+    server.server_close()
+
+
+def test_slow_guide_does_not_block_other_guides(slow_url, tmp_path):
+    local_guide = tmp_path / "guida.md"
+    local_guide.write_text("# Locale", encoding="utf-8")
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(main.load_markdown_content(slow_url))) for _ in range(5)]
+    for reader in readers:
+        reader.start()
+    time.sleep(0.1)
+
+    started = time.monotonic()
+    assert "Locale" in main.load_markdown_content(str(local_guide))
+    assert time.monotonic() - started < 0.3
+
+    for reader in readers:
+        reader.join()
+    assert len(results) == 5 and all("Guida" in html for html in results)
+    # Le richieste contemporanee della stessa guida sono unite
+    assert SlowGuide.hits == 1
@@ -0,0 +1,32 @@
+import threading
+from image_warmup import ImageWarmup
+
+
+def test_cancel_discards_downloads_not_started():
+    release = threading.Event()
+    fetched = []
+    lock = threading.Lock()
+
+    def fetch_image(topic, number):
+        with lock:
+            fetched.append(number)
+        release.wait(5)
+
+    warmup = ImageWarmup([(1, number) for number in range(20)], fetch_image, max_workers=2)
+    warmup.cancel()
+    release.set()
+    warmup._executor.shutdown(wait=True)
+
+    # Solo i download già partiti (uno per worker) arrivano in fondo
+    assert warmup.cancelled
+    assert len(fetched) <= 2
+    assert warmup.completed == len(fetched)
+
+
+def test_warmup_fetches_in_order():
+    fetched = []
+    warmup = ImageWarmup([(1, number) for number in range(5)], lambda topic, number: fetched.append(number), max_workers=1)
+    warmup._executor.shutdown(wait=True)
+
+    assert fetched == [0, 1, 2, 3, 4]
+    assert warmup.completed == warmup.total == 5
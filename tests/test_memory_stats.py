@@ -0,0 +1,68 @@
+import gc
+import threading
+import pandas as pd
+import memory_stats
+from catalog import CatalogDict
+
+
+class Owner:
+    pass
+
+
+def test_registered_objects_are_not_kept_alive():
+    owner = Owner()
+    contents = CatalogDict(blob_map=CatalogDict(a=b"x" * 100))
+    memory_stats.register_session("test-session", {'app': owner, 'blob_cache': contents})
+    assert memory_stats.session_report()['blob_cache'].iloc[-1] > 100
+
+    del owner, contents
+    gc.collect()
+    report = memory_stats.session_report()
+    row = report[report['sessione'] == "test-ses"].iloc[0]
+    assert pd.isna(row.get('app')) and pd.isna(row.get('blob_cache'))
+
+
+def test_deep_sizeof_handles_deep_and_cyclic_structures():
+    nested = []
+    for _ in range(10000):
+        nested = [nested]
+    cyclic = {}
+    cyclic['self'] = cyclic
+
+    assert memory_stats.deep_sizeof(nested) > 0
+    assert memory_stats.deep_sizeof(cyclic) > 0
+
+
+class ChangingDict(dict):
+    # Simula un dizionario modificato da un altro thread proprio mentre viene copiato
+    def items(self):
+        raise RuntimeError("dictionary changed size during iteration")
+
+
+def test_deep_sizeof_skips_objects_changed_during_measure():
+    skipped = []
+    changing = ChangingDict(a=b"x" * 100)
+
+    assert memory_stats.deep_sizeof({'cache': changing, 'other': b"y" * 1000}, skipped=skipped) > 1000
+    assert skipped == [changing]
+
+
+def test_deep_sizeof_while_another_thread_mutates():
+    shared = {}
+    stop = threading.Event()
+
+    def mutate():
+        n = 0
+        while not stop.is_set():
+            shared[n] = [b"x" * 10]
+            shared.pop(n - 50, None)
+            n += 1
+
+    writer = threading.Thread(target=mutate)
+    writer.start()
+    try:
+        for _ in range(200):
+            memory_stats.deep_sizeof({'cache': shared})
+    finally:
+        stop.set()
+        writer.join()
@@ -0,0 +1,51 @@
+import random
+import pandas as pd
+from main import CertificationQuizApp
+from mixed_pool import MixedPool
+
+
+def banks():
+    return {
+        'CertA': pd.DataFrame({'Topic': [1, 1, 2], 'Numero': [1, 2, 1]}, index=[5, 6, 7]),
+        'CertB': pd.DataFrame({'Topic': [1, 3], 'Numero': [1, 1]}),
+        'Vuota': pd.DataFrame({'Topic': [], 'Numero': []})
+    }
+
+
+def test_counts_follow_topic_selection():
+    pool = MixedPool(banks(), {'CertA': [2], 'CertB': None, 'Vuota': [], 'Assente': [1]})
+
+    assert pool.counts == {'CertA': 1, 'CertB': 2}
+    assert len(pool) == 3
+    assert pool.certs == ['CertA', 'CertB']
+    assert [pool.entry(index) for index in range(3)] == [('CertA', 2), ('CertB', 0), ('CertB', 1)]
+
+
+def test_every_question_is_seen_before_repeating():
+    pool = MixedPool(banks(), {'CertA': [], 'CertB': []})
+    rng = random.Random(3)
+
+    first_round = {(cert, question.name) for cert, question in (pool.next_question(rng) for _ in range(len(pool)))}
+    assert first_round == {('CertA', 5), ('CertA', 6), ('CertA', 7), ('CertB', 0), ('CertB', 1)}
+
+
+def test_image_is_looked_up_in_the_question_certification(tmp_path):
+    for cert in ('CertA', 'CertB'):
+        folder = tmp_path / cert / "Domande" / "Topic1"
+        folder.mkdir(parents=True)
+        (folder / "1.png").write_bytes(cert.encode())
+    app = CertificationQuizApp({'data_path': str(tmp_path)})
+    blob_cache = {
+        'image_content_cache': {},
+        'blob_map': {},
+        'question_images': {cert: {(1, 1): f"data/{cert}/Domande/Topic1/1.png"} for cert in ('CertA', 'CertB')}
+    }
+    pool = MixedPool(banks(), {'CertA': [1], 'CertB': [1]})
+
+    # Stesso topic e numero in entrambe le certificazioni: l'immagine è quella della certificazione della domanda
+    images = {}
+    for index in range(len(pool)):
+        cert, question = pool.question(index)
+        if (question['Topic'], question['Numero']) == (1, 1):
+            images[cert] = bytes(app.get_image_bytes(blob_cache, cert, question['Topic'], question['Numero']))
+    assert images == {'CertA': b'CertA', 'CertB': b'CertB'}
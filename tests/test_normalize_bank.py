@@ -0,0 +1,28 @@
+import pandas as pd
+import pyarrow as pa
+from main import normalize_bank
+from search_index import SearchIndex
+
+
+def arrow_bank():
+    # Come i database letti dalla cache condivisa o dal pacchetto offline: colonne di testo Arrow
+    return pd.DataFrame({
+        'Topic': ['1', 'x', None],
+        'Numero': ['2', '3', '4'],
+        'Commento': ['lakehouse', 'shortcut', 'warehouse']
+    }).astype(pd.ArrowDtype(pa.string()))
+
+
+def test_invalid_values_become_zero():
+    df = normalize_bank(arrow_bank())
+
+    assert df['Topic'].tolist() == [1, 0, 0]
+    assert df['Numero'].tolist() == [2, 3, 4]
+
+
+def test_search_index_metadata_of_invalid_topic():
+    index = SearchIndex()
+    index.index_certification("Cert", arrow_bank())
+
+    result = index.search("shortcut")[0]
+    assert (result['topic'], result['numero']) == (0, 3)
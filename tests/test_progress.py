@@ -0,0 +1,47 @@
+import pandas as pd
+from main import CertificationQuizApp
+
+
+def app_with_bank(tmp_path, version):
+    app = CertificationQuizApp({'data_path': str(tmp_path)})
+    app.df = pd.DataFrame({'Topic': [1, 1, 2], 'Numero': [1, 2, 1]}, index=[10, 11, 12])
+    app.catalog_version = version
+    return app
+
+
+def study(app):
+    app.filter_questions("Topic 1")
+    question = app.get_random_question()
+    app.record_answer(question, False)
+    return question
+
+
+def test_progress_is_restored_on_same_version(tmp_path):
+    app = app_with_bank(tmp_path, version=1)
+    question = study(app)
+    app.save_progress("CertA", "Topic 1", question)
+    assert (app.seen_questions, app.question_weights) == (set(), {})
+
+    progress = app.restore_progress("CertA")
+
+    assert (app.correct_answers, app.total_questions) == (0, 1)
+    assert app.seen_questions == {question.name}
+    assert app.question_weights == {question.name: 2.0}
+    assert progress.question_label == question.name
+    assert list(app.filtered_df.index) == [10, 11]
+    assert app.restore_progress("CertA") is None
+
+
+def test_only_score_is_restored_on_new_version(tmp_path):
+    app = app_with_bank(tmp_path, version=1)
+    question = study(app)
+    app.save_progress("CertA", "Topic 1", question)
+
+    # Nel frattempo la sessione è passata a una versione più recente del catalogo
+    app.catalog_version = 2
+    progress = app.restore_progress("CertA")
+
+    assert (app.correct_answers, app.total_questions) == (0, 1)
+    assert app.seen_questions == set() and app.question_weights == {}
+    assert progress.question_label is None
+    assert progress.topic == "Topic 1"
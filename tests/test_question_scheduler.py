@@ -0,0 +1,61 @@
+import random
+from question_scheduler import AdaptiveScheduler, FenwickSampler
+
+
+class FixedRandom:
+    # Restituisce sempre lo stesso valore: rende deterministico il punto di estrazione
+    def __init__(self, value):
+        self.value = value
+
+    def random(self):
+        return self.value
+
+
+def test_update_keeps_prefix_sums():
+    sampler = FenwickSampler([1, 2, 3, 4, 5])
+    assert sampler.total() == 15
+
+    sampler.update(2, 0)
+    sampler.update(4, 10)
+    assert sampler.total() == 17
+    assert sampler.weights == [1, 2, 0, 4, 10]
+
+
+def test_sample_picks_the_interval_containing_the_target():
+    sampler = FenwickSampler([1, 0, 3, 0, 4])
+
+    # Intervalli cumulati: [0, 1) -> 0, [1, 4) -> 2, [4, 8) -> 4
+    assert [sampler.sample(FixedRandom(value / 8)) for value in (0, 0.99, 1, 3.99, 4, 7.99)] == [0, 0, 2, 2, 4, 4]
+    # Gli elementi con peso nullo non vengono mai estratti, nemmeno agli estremi
+    assert sampler.sample(FixedRandom(0.999999999)) == 4
+
+
+def test_sample_follows_updated_weights():
+    sampler = FenwickSampler([1.0] * 7)
+    for position in range(6):
+        sampler.update(position, 0)
+    rng = random.Random(1)
+
+    assert {sampler.sample(rng) for _ in range(200)} == {6}
+    sampler.update(6, 0)
+    assert sampler.sample(rng) is None
+
+
+def test_sample_is_proportional_to_weights():
+    sampler = FenwickSampler([1, 3])
+    rng = random.Random(7)
+    counts = [0, 0]
+    for _ in range(20000):
+        counts[sampler.sample(rng)] += 1
+
+    assert 0.72 < counts[1] / 20000 < 0.78
+
+
+def test_scheduler_does_not_repeat_last_question():
+    weights = {}
+    scheduler = AdaptiveScheduler(['a', 'b'], weights)
+    scheduler.record('a', False)
+    assert weights['a'] == AdaptiveScheduler.DEFAULT_WEIGHT * 2
+
+    picks = [scheduler.pick() for _ in range(50)]
+    assert all(first != second for first, second in zip(picks, picks[1:]))
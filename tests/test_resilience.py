@@ -0,0 +1,65 @@
+import pytest
+import resilience
+from resilience import CircuitBreaker, ResilientStorage, StorageHealth, StorageUnavailableError
+from storage import BlobInfo, Storage
+
+
+class BrokenStorage(Storage):
+    remote = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def read(self, name):
+        self.calls += 1
+        raise ConnectionError("guasto simulato")
+
+
+def test_breaker_counts_one_failure_per_call():
+    health = StorageHealth({'retries': 2, 'backoff_base': 0.0, 'breaker_failures': 3, 'max_workers': 2})
+    backend = BrokenStorage()
+    storage = ResilientStorage(backend, health)
+
+    for _ in range(2):
+        with pytest.raises(StorageUnavailableError):
+            storage.read("data/Cert/database.xlsx")
+    # Sei tentativi ma due sole chiamate fallite: il circuito resta chiuso
+    assert backend.calls == 6
+    assert health.breaker.failures == 2
+    assert health.breaker.state == CircuitBreaker.CLOSED
+
+    with pytest.raises(StorageUnavailableError):
+        storage.read("data/Cert/database.xlsx")
+    assert health.breaker.state == CircuitBreaker.OPEN
+    health.executor.shutdown(wait=False)
+
+
+class ListingStorage(Storage):
+    remote = True
+
+    def __init__(self, count):
+        self.count = count
+        self.failing = False
+
+    def list_blobs(self, prefix=""):
+        if self.failing:
+            raise ConnectionError("guasto simulato")
+        for n in range(self.count):
+            yield BlobInfo(f"{prefix}{n}.png", "0x1", 1, None)
+
+
+def test_listing_is_streamed_and_last_one_kept_for_outages(monkeypatch):
+    monkeypatch.setattr(resilience, 'LIST_PAGE_SIZE', 3)
+    health = StorageHealth({'retries': 0, 'breaker_failures': 10, 'max_workers': 2})
+    backend = ListingStorage(7)
+    storage = ResilientStorage(backend, health)
+
+    blobs = storage.list_blobs("data/Cert/")
+    assert not isinstance(blobs, list)
+    assert "data/Cert/" not in health.listings
+    assert len(list(blobs)) == 7
+    assert len(health.listings["data/Cert/"]) == 7
+
+    backend.failing = True
+    assert len(list(storage.list_blobs("data/Cert/"))) == 7
+    health.executor.shutdown(wait=False)
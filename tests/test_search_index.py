@@ -0,0 +1,38 @@
+import pandas as pd
+from main import resolve_search_hit
+from search_index import SearchIndex
+
+
+def bank(numbers):
+    return pd.DataFrame({'Topic': [2, 2], 'Numero': numbers, 'Commento': ['lakehouse shortcut', 'warehouse']})
+
+
+def test_reindex_updates_moved_question():
+    index = SearchIndex()
+    index.index_certification("Cert", bank([1, 2]))
+
+    # Stesso testo, numero cambiato (es. dopo un caricamento incrementale)
+    assert index.index_certification("Cert", bank([5, 2])) == 1
+    result = index.search("lakehouse")[0]
+    assert (result['topic'], result['numero']) == (2, 5)
+
+
+def test_unchanged_bank_is_not_reindexed():
+    index = SearchIndex()
+    index.index_certification("Cert", bank([1, 2]))
+
+    assert index.index_certification("Cert", bank([1, 2])) == 0
+
+
+def test_search_hit_follows_topic_and_number_in_pinned_bank():
+    index = SearchIndex()
+    index.index_certification("Cert", bank([1, 2]))
+    hit = index.search("lakehouse")[0]
+
+    # Nella versione agganciata dalla sessione le righe sono in un altro ordine
+    pinned = bank([1, 2]).iloc[::-1].reset_index(drop=True)
+    label = resolve_search_hit(pinned, hit['label'], hit['topic'], hit['numero'])
+    assert pinned.loc[label, 'Commento'] == 'lakehouse shortcut'
+
+    assert resolve_search_hit(bank([7, 2]), hit['label'], hit['topic'], hit['numero']) is None
+    assert resolve_search_hit(bank([1, 2]), hit['label'], hit['topic'], hit['numero']) == hit['label']
@@ -0,0 +1,49 @@
+import os
+from storage import BlobInfo, LocalFolderStorage, PackStorage, PackWriter, iter_certifications
+
+
+def write_tree(root):
+    for cert in ("CertA", "CertB"):
+        folder = root / cert / "Domande" / "Topic1"
+        folder.mkdir(parents=True)
+        (folder / "1.png").write_bytes(cert.encode())
+        (root / cert / "config.json").write_text("{}")
+
+
+def test_local_listing_walks_only_the_certification(tmp_path, monkeypatch):
+    write_tree(tmp_path)
+    storage = LocalFolderStorage(str(tmp_path))
+    walked = []
+    real_walk = os.walk
+    monkeypatch.setattr(os, 'walk', lambda top: walked.append(top) or real_walk(top))
+
+    listing = dict(iter_certifications(storage))
+    names = {cert: sorted(blob.name for blob in blobs) for cert, blobs in listing.items()}
+
+    assert names == {
+        cert: [f"data/{cert}/Domande/Topic1/1.png", f"data/{cert}/config.json"] for cert in ("CertA", "CertB")
+    }
+    assert [os.path.basename(os.path.normpath(top)) for top in walked] == ["CertA", "CertB"]
+
+
+def test_local_listing_with_partial_prefix(tmp_path):
+    write_tree(tmp_path)
+    storage = LocalFolderStorage(str(tmp_path))
+
+    assert {blob.name.split('/')[1] for blob in storage.list_blobs("data/CertA")} == {"CertA"}
+    assert len(list(storage.list_blobs(""))) == 4
+    assert list(storage.list_blobs("altro/")) == []
+
+
+def test_pack_listing_uses_certification_index(tmp_path):
+    path = str(tmp_path / "dati.pack")
+    writer = PackWriter(path, "test")
+    for cert in ("CertB", "CertA"):
+        for name in (f"data/{cert}/config.json", f"data/{cert}/Domande/Topic1/1.png"):
+            writer.add_blob(BlobInfo(name, "0x1", 2, None), cert.encode())
+    writer.close()
+    storage = PackStorage(path)
+
+    assert storage.list_prefixes("data/") == ["data/CertA/", "data/CertB/"]
+    assert sorted(blob.name for blob in storage.list_blobs("data/CertA/Domande/")) == ["data/CertA/Domande/Topic1/1.png"]
+    assert len(list(storage.list_blobs("data/"))) == 4